@@ -1,19 +1,19 @@
-# agente_quindicolor_openai.py (v5 - Estable, Refactorizado para Gradio, SIN Streaming)
+# agente_quindicolor_openai.py (v6 - Estable, Refactorizado para Gradio, con y sin Streaming)
 
 import asyncio
+import json
 import os
 import sys
+import threading
+import time
 import logging
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, AsyncIterator, NamedTuple, Optional
 
-# --- Imports del SDK ---
-try:
-    from agents import Agent, Runner
-    from agents.mcp import MCPServerStdio
-except ImportError as e:
-    print(f"Error importando 'openai-agents'. ¿Instalado? Detalle: {e}")
-    exit(1)
+from planificador_sesiones import SessionScheduler, SchedulerSaturated
+
+# El SDK de openai-agents (~1,5 s de import) y la conexión MCP no se cargan al importar este
+# módulo: `startup()` los crea en el primer turno, o antes con `preload_in_background()`.
 
 # --- Configuración Logger ---
 agent_logger = logging.getLogger('openai_agent_logic')
@@ -29,108 +29,366 @@ if load_dotenv(dotenv_path=env_path):
     agent_logger.info(f".env cargado para la lógica del agente: {env_path}")
 else:
     agent_logger.warning(".env no encontrado. OPENAI_API_KEY debe estar definida.")
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    agent_logger.critical("Error: OPENAI_API_KEY no encontrada.")
 
 # --- Configuración Conexión MCP Odoo ---
-agent_logger.info("Configurando conexión al servidor MCP Odoo...")
 mcp_server_script_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "mcp_odoo_server.py"))
-if not os.path.exists(mcp_server_script_path):
-    agent_logger.critical(f"Script MCP no encontrado: {mcp_server_script_path}")
-    exit(1)
 odoo_server_params_dict = {
     "command": sys.executable,
     "args": [mcp_server_script_path],
     "cwd": os.path.dirname(mcp_server_script_path)
 }
-odoo_mcp_server = MCPServerStdio(params=odoo_server_params_dict)
-agent_logger.info(f"Conector MCPServerStdio configurado para: {sys.executable} {mcp_server_script_path}")
+# Si MCP_ODOO_URL está definida (p. ej. http://127.0.0.1:8000/sse) el agente se conecta a un
+# servidor MCP compartido por red en lugar de lanzar su propio subproceso stdio.
+mcp_odoo_url = os.getenv("MCP_ODOO_URL")
+# Llamadas de solo lectura de un mismo paso que se ejecutan a la vez (las escrituras van en orden)
+MCP_MAX_PARALLEL_READS = int(os.getenv("AGENTE_HERRAMIENTAS_PARALELAS", "4"))
 
 # --- Definición del Agente OpenAI ---
-agent_logger.info("Definiendo el Agente OpenAI 'AsistenteQuindicolor'...")
-agente_quindicolor = Agent(
-    name="AsistenteQuindicolor",
-    instructions=(
-        "Eres un asistente experto en ventas para QuindíColor que interactúa con Odoo.\n"
-        "Puedes usar las siguientes herramientas:\n"
-        "- 'buscar_cliente': Encuentra clientes por nombre.\n"
-        "- 'buscar_producto': Busca productos específicos por nombre.\n"
-        "- 'listar_productos': Muestra una lista inicial de productos vendibles (hasta 20).\n" # <-- Nueva herramienta añadida
-        "- 'crear_cotizacion': Crea una nueva cotización con cliente y líneas de producto (IDs y cantidades).\n"
-        "- 'confirmar_cotizacion': Confirma una cotización existente por su ID.\n"
-        "\n"
-        "Flujo para crear cotización:\n"
-        "1. Usa 'buscar_cliente' para obtener el ID.\n"
-        "2. Pregunta al usuario qué productos/cantidades añadir.\n"
-        "3. Usa 'buscar_producto' para obtener los IDs de esos productos.\n"
-        "4. Construye la lista de líneas JSON: [{'product_id': ID, 'product_uom_qty': QTY}, ...].\n"
-        "5. Llama a 'crear_cotizacion'.\n"
-        "\n"
-        "Si el usuario pide ver productos en general, usa 'listar_productos'.\n"
-        "Si un producto buscado no tiene stock, informa y pregunta antes de continuar.\n"
-        "Sé conciso e informa de tus acciones y resultados."
-    ),
-    model="gpt-4o-2024-11-20",
-    mcp_servers=[odoo_mcp_server]
+AGENT_NAME = "AsistenteQuindicolor"
+AGENT_MODEL = "gpt-4o-2024-11-20"
+AGENT_INSTRUCTIONS = (
+    "Eres un asistente experto en ventas para QuindíColor que interactúa con Odoo.\n"
+    "Puedes usar las siguientes herramientas:\n"
+    "- 'buscar_cliente': Encuentra clientes por nombre.\n"
+    "- 'buscar_producto': Busca productos específicos por nombre.\n"
+    "- 'buscar_varios_productos': Busca una lista de productos en una sola llamada (resultados agrupados por nombre).\n"
+    "- 'buscar_varios_clientes': Busca una lista de clientes en una sola llamada.\n"
+    "- 'listar_productos': Muestra productos vendibles por páginas; para la siguiente página pasa el 'siguiente_cursor' de la respuesta.\n"
+    "- 'crear_cotizacion': Crea una nueva cotización con cliente y líneas de producto (IDs y cantidades).\n"
+    "- 'crear_cotizaciones': Crea muchas cotizaciones de una vez (lista de {cliente_id, lineas}).\n"
+    "- 'confirmar_cotizacion': Confirma una cotización existente por su ID.\n"
+    "- 'confirmar_cotizaciones': Confirma varias cotizaciones a la vez (lista de IDs).\n"
+    "Las herramientas responden en JSON compacto: 'columnas' nombra los campos de cada fila de 'filas'\n"
+    "(p. ej. columnas [id, name, ...] y filas [[40, 'Pintura', ...]]). Nunca muestres el JSON al usuario: resúmelo.\n"
+    "\n"
+    "Flujo para crear cotización:\n"
+    "1. Usa 'buscar_cliente' para obtener el ID.\n"
+    "2. Pregunta al usuario qué productos/cantidades añadir.\n"
+    "3. Obtén los IDs de esos productos: si son varios, usa UNA llamada a 'buscar_varios_productos' con todos los nombres en lugar de llamar a 'buscar_producto' por cada uno.\n"
+    "4. Construye la lista de líneas JSON: [{'product_id': ID, 'product_uom_qty': QTY}, ...].\n"
+    "5. Llama a 'crear_cotizacion'.\n"
+    "\n"
+    "Si necesitas varias búsquedas independientes (p. ej. el cliente y los productos), pídelas en el mismo paso: se ejecutan en paralelo.\n"
+    "Si el usuario pide ver productos en general, usa 'listar_productos'.\n"
+    "Si un producto buscado no tiene stock, informa y pregunta antes de continuar.\n"
+    "Sé conciso e informa de tus acciones y resultados."
+)
+
+class AgentRuntime(NamedTuple):
+    """Lo que crea `startup()`: el agente y su conexión MCP persistente."""
+    agent: Any
+    mcp_server: Any
+
+_runtime: Optional[AgentRuntime] = None
+_runtime_lock = threading.Lock()
+
+def startup() -> AgentRuntime:
+    """
+    Crea (una sola vez por proceso) la conexión MCP y el Agente, importando el SDK en ese
+    momento. No conecta todavía: el subproceso o la conexión de red se abren en el primer
+    `ensure_connected()`. Thread-safe; las llamadas siguientes devuelven lo ya creado.
+
+    Raises:
+        RuntimeError: si falta openai-agents o el script del servidor MCP.
+    """
+    global _runtime
+    if _runtime is not None:
+        return _runtime
+    with _runtime_lock:
+        if _runtime is not None:
+            return _runtime
+        started = time.perf_counter()
+        try:
+            from agents import Agent, ModelSettings
+            from conexion_mcp import SupervisedMCPServerSse, SupervisedMCPServerStdio
+        except ImportError as e:
+            raise RuntimeError(f"Error importando 'openai-agents'. ¿Instalado? Detalle: {e}") from e
+        if not os.getenv("OPENAI_API_KEY"):
+            agent_logger.critical("Error: OPENAI_API_KEY no encontrada.")
+
+        if mcp_odoo_url:
+            mcp_server = SupervisedMCPServerSse(params={"url": mcp_odoo_url}, name=f"sse: {mcp_odoo_url}",
+                                                max_parallel_reads=MCP_MAX_PARALLEL_READS)
+            agent_logger.info(f"Conector MCP persistente configurado para servidor en red: {mcp_odoo_url}")
+        else:
+            if not os.path.exists(mcp_server_script_path):
+                raise RuntimeError(f"Script MCP no encontrado: {mcp_server_script_path}")
+            mcp_server = SupervisedMCPServerStdio(params=odoo_server_params_dict, max_parallel_reads=MCP_MAX_PARALLEL_READS)
+            agent_logger.info(f"Conector MCP persistente configurado para: {sys.executable} {mcp_server_script_path}")
+
+        # parallel_tool_calls: el modelo puede pedir varias herramientas en un mismo paso
+        agent = Agent(name=AGENT_NAME, instructions=AGENT_INSTRUCTIONS, model=AGENT_MODEL, mcp_servers=[mcp_server],
+                      model_settings=ModelSettings(parallel_tool_calls=True))
+        _runtime = AgentRuntime(agent=agent, mcp_server=mcp_server)
+        agent_logger.info(f"Agente OpenAI '{AGENT_NAME}' definido en {time.perf_counter() - started:.2f}s.")
+        return _runtime
+
+def preload_in_background() -> threading.Thread:
+    """
+    Ejecuta `startup()` en un hilo aparte, para que el import del SDK no retrase la
+    aparición de la interfaz ni el primer turno. Los errores quedan en el log y se
+    repiten (ya con mensaje al usuario) en el primer turno.
+    """
+    def preload() -> None:
+        try:
+            startup()
+        except Exception as e:
+            agent_logger.error(f"Precarga del agente fallida: {e}")
+    thread = threading.Thread(target=preload, name="agent-preload", daemon=True)
+    thread.start()
+    return thread
+
+async def _get_runtime() -> AgentRuntime:
+    # Si la precarga aún no terminó, se espera sin bloquear el event loop
+    return _runtime if _runtime is not None else await asyncio.to_thread(startup)
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidad: `agente_quindicolor`/`odoo_mcp_server` y las clases de conexión
+    # siguen importándose desde aquí, pero se crean (o importan) al pedirlos.
+    if name == "agente_quindicolor":
+        return startup().agent
+    if name == "odoo_mcp_server":
+        return startup().mcp_server
+    if name in ("SupervisedMCPServerStdio", "SupervisedMCPServerSse"):
+        import conexion_mcp
+        return getattr(conexion_mcp, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# --- Gestión del historial (presupuesto de tokens) ---
+class HistoryManager:
+    """
+    Mantiene acotado el historial que se envía al modelo en cada turno. El historial de la
+    sesión (el que guardan las apps y del que se dibuja el chat) se conserva completo: solo
+    se compacta la copia que recibe `Runner`.
+
+    - Los resultados de herramientas (llamada + salida) solo se conservan completos en los
+      últimos `detail_turns` turnos, y recortados a `max_output_tokens` cada uno.
+    - Antes de descartarlos, los IDs útiles (clientes, productos, cotizaciones) se anotan en
+      un bloc de notas: un único mensaje 'developer' al inicio del historial, con JSON compacto,
+      que conserva las entradas más recientes de cada tipo.
+    - Si aun así se supera `max_tokens`, se eliminan los turnos más antiguos (nunca el último).
+
+    Los tokens se estiman a ~4 caracteres por token; basta para presupuestar.
+    """
+
+    SCRATCHPAD_PREFIX = "IDs ya resueltos en esta conversación (úsalos sin volver a buscar): "
+    CHARS_PER_TOKEN = 4
+    # Herramienta -> tipo de nota que generan sus filas (id, name)
+    ROW_NOTES = {'buscar_cliente': 'clientes', 'buscar_varios_clientes': 'clientes',
+                 'buscar_producto': 'productos', 'buscar_varios_productos': 'productos',
+                 'listar_productos': 'productos'}
+
+    def __init__(self, max_tokens: int = 6000, detail_turns: int = 2, max_output_tokens: int = 600,
+                 notes_per_kind: int = 20):
+        self.max_tokens = max_tokens
+        self.detail_turns = detail_turns
+        self.max_output_tokens = max_output_tokens
+        self.notes_per_kind = notes_per_kind
+
+    # -- Estimación --
+    def estimate_tokens(self, items: list) -> int:
+        return sum(len(json.dumps(item, ensure_ascii=False, default=str)) for item in items) // self.CHARS_PER_TOKEN
+
+    # -- Bloc de notas --
+    def _is_scratchpad(self, item: dict) -> bool:
+        return item.get("role") == "developer" and str(item.get("content", "")).startswith(self.SCRATCHPAD_PREFIX)
+
+    def read_notes(self, history: list) -> Dict[str, Dict[str, Any]]:
+        for item in history:
+            if self._is_scratchpad(item):
+                try:
+                    return json.loads(item["content"][len(self.SCRATCHPAD_PREFIX):])
+                except ValueError:
+                    break
+        return {}
+
+    @staticmethod
+    def _tool_payload(output: Any) -> Any:
+        """JSON de la herramienta dentro de la salida MCP (`{"type":"text","text":...}`), o None."""
+        try:
+            wrapper = json.loads(output) if isinstance(output, str) else output
+            text = wrapper.get("text") if isinstance(wrapper, dict) and wrapper.get("type") == "text" else output
+            payload = json.loads(text)
+        except (TypeError, ValueError):
+            return None
+        return payload if isinstance(payload, dict) else None
+
+    def _note(self, notes: Dict[str, Dict[str, Any]], kind: str, key: Any, value: Any) -> None:
+        entries = notes.setdefault(kind, {})
+        entries.pop(str(key), None)  # La más reciente va al final
+        entries[str(key)] = value
+        while len(entries) > self.notes_per_kind:
+            del entries[next(iter(entries))]
+
+    def _collect_notes(self, notes: Dict[str, Dict[str, Any]], tool: str, payload: Dict[str, Any]) -> None:
+        kind = self.ROW_NOTES.get(tool)
+        columns = payload.get("columnas") or []
+        if kind and "id" in columns and "name" in columns:
+            id_pos, name_pos = columns.index("id"), columns.index("name")
+            groups = [payload] + [g for g in payload.get("resultados") or [] if isinstance(g, dict)]
+            for group in groups:
+                for row in group.get("filas") or []:
+                    self._note(notes, kind, row[id_pos], row[name_pos])
+        if tool in ('crear_cotizacion', 'confirmar_cotizacion') and payload.get("cotizacion_id"):
+            self._note(notes, 'cotizaciones', payload["cotizacion_id"], payload.get("state", 'draft'))
+        elif tool == 'crear_cotizaciones':
+            for _, cotizacion_id in payload.get("creadas") or []:
+                self._note(notes, 'cotizaciones', cotizacion_id, 'draft')
+        elif tool == 'confirmar_cotizaciones':
+            for cotizacion_id in payload.get("confirmadas") or []:
+                self._note(notes, 'cotizaciones', cotizacion_id, 'sale')
+
+    # -- Recorte de salidas --
+    def _shrink_output(self, output: str) -> str:
+        """Desenvuelve la salida MCP y la recorta (primero filas, luego texto) al máximo por salida."""
+        payload = self._tool_payload(output)
+        max_chars = self.max_output_tokens * self.CHARS_PER_TOKEN
+        if payload is None:
+            return output if len(output) <= max_chars else output[:max_chars] + "…(recortado)"
+        text = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        groups = [payload] + [g for g in payload.get("resultados") or [] if isinstance(g, dict)]
+        while len(text) > max_chars and any(len(g.get("filas") or []) > 1 for g in groups):
+            for group in groups:
+                rows = group.get("filas") or []
+                if len(rows) > 1:
+                    keep = len(rows) // 2
+                    group["filas_omitidas"] = group.get("filas_omitidas", 0) + len(rows) - keep
+                    group["filas"] = rows[:keep]
+                    if "similitud" in group:
+                        group["similitud"] = group["similitud"][:keep]
+            text = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        return text if len(text) <= max_chars else text[:max_chars] + "…(recortado)"
+
+    # -- Compactación --
+    def _take_notes(self, notes: Dict[str, Dict[str, Any]], items: list) -> None:
+        tool_names = {item.get("call_id"): item.get("name") for item in items if item.get("type") == "function_call"}
+        for item in items:
+            if item.get("type") == "function_call_output":
+                payload = self._tool_payload(item.get("output"))
+                if payload is not None:
+                    self._collect_notes(notes, tool_names.get(item.get("call_id"), ""), payload)
+
+    def _scratchpad(self, notes: Dict[str, Dict[str, Any]]) -> list:
+        if not notes:
+            return []
+        return [{"role": "developer", "content": self.SCRATCHPAD_PREFIX + json.dumps(notes, ensure_ascii=False, separators=(',', ':'))}]
+
+    def compact(self, history: list) -> list:
+        """
+        Devuelve la versión del historial que se envía al modelo. Las salidas de herramientas de
+        turnos que dejan de ser recientes se eliminan tras anotar sus IDs (así no se duplican
+        en el bloc mientras siguen completas); las recientes se recortan. Si aun así no cabe
+        en `max_tokens`, se descartan turnos antiguos (anotando antes sus IDs).
+        """
+        notes = self.read_notes(history)
+        # Un turno empieza en cada mensaje del usuario
+        turns: List[list] = []
+        for item in history:
+            if self._is_scratchpad(item):
+                continue
+            if item.get("role") == "user" or not turns:
+                turns.append([])
+            turns[-1].append(item)
+        for pos, turn in enumerate(turns):
+            if pos < len(turns) - self.detail_turns:
+                self._take_notes(notes, turn)
+                turns[pos] = [item for item in turn if item.get("type") not in ("function_call", "function_call_output")]
+            else:
+                turns[pos] = [dict(item, output=self._shrink_output(item["output"]))
+                              if item.get("type") == "function_call_output" and isinstance(item.get("output"), str) else item
+                              for item in turn]
+
+        sizes = [self.estimate_tokens(turn) for turn in turns]
+        while len(turns) > 1 and sum(sizes) + self.estimate_tokens(self._scratchpad(notes)) > self.max_tokens:
+            self._take_notes(notes, turns.pop(0))
+            sizes.pop(0)
+        return self._scratchpad(notes) + [item for turn in turns for item in turn]
+
+history_manager = HistoryManager(
+    max_tokens=int(os.getenv("AGENTE_HISTORIAL_MAX_TOKENS", "6000")),
+    detail_turns=int(os.getenv("AGENTE_HISTORIAL_TURNOS_DETALLE", "2")),
+    max_output_tokens=int(os.getenv("AGENTE_HISTORIAL_MAX_TOKENS_HERRAMIENTA", "600")),
+)
+
+# --- Control de admisión (turnos simultáneos de todas las sesiones de la app) ---
+session_scheduler = SessionScheduler(
+    max_in_flight=int(os.getenv("AGENTE_MAX_CONCURRENTES", "4")),
+    max_per_session=int(os.getenv("AGENTE_MAX_POR_SESION", "1")),
+    max_queue=int(os.getenv("AGENTE_MAX_COLA", "16")),
+    max_wait=float(os.getenv("AGENTE_MAX_ESPERA", "30")),
 )
-agent_logger.info("Agente OpenAI definido.")
 
-# --- FUNCIÓN ASÍNCRONA PARA PROCESAR UN TURNO (SIN STREAMING) ---
+# --- PROCESAMIENTO DE UN TURNO ---
+def _finish_turn(result, current_history_for_agent: list) -> Tuple[list, str, Any | None]:
+    """
+    A partir del resultado de `Runner.run` o `Runner.run_streamed` (ya consumido), extrae el
+    texto de respuesta y construye el historial actualizado (completo, sin compactar).
+    """
+    response_text = "(El agente no generó respuesta en texto)"
+    assistant_content_for_history = None
+
+    # Procesar respuesta
+    if result.final_output:
+        response_text = str(result.final_output)
+        assistant_content_for_history = response_text # Guardar texto simple
+    else:
+        # Reconstruir texto y contenido completo si no hubo final_output
+        text_parts = []
+        raw_content_to_save = None
+        for item in result.new_items:
+            if item.type == "message_output_item":
+                content = getattr(item.raw, 'content', None)
+                if content:
+                     raw_content_to_save = content
+                     if isinstance(content, list):
+                          text_parts.extend([part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text"])
+                     elif isinstance(content, dict) and content.get("type") == "text":
+                          text_parts.append(content.get("text", ""))
+
+        response_text = "\n".join(filter(None, text_parts)).strip()
+        assistant_content_for_history = raw_content_to_save # Guardar contenido completo
+        if not response_text and any(item.type == "tool_call_item" for item in result.new_items):
+             response_text = "(Acción interna realizada...)"
+
+    # Crear historial actualizado: llamadas/salidas de herramientas del turno (para que el
+    # gestor anote sus IDs) y la respuesta final del asistente
+    tool_items = [item.to_input_item() for item in result.new_items
+                  if item.type in ("tool_call_item", "tool_call_output_item")]
+    updated_history = current_history_for_agent + tool_items
+    if assistant_content_for_history is not None:
+        updated_history = updated_history + [{"role": "assistant", "content": assistant_content_for_history}]
+    else:
+        # Si no hubo respuesta del asistente, añadir placeholder o texto acumulado
+        updated_history = updated_history + [{"role": "assistant", "content": response_text or "(Sin respuesta final)"}]
+        agent_logger.warning("No se encontró contenido estructurado del asistente.")
+    return updated_history, response_text, assistant_content_for_history
+
 async def process_agent_turn(user_input: str, history: list) -> Tuple[list, str, Any | None]:
     """
     Procesa un turno: recibe input y historial previo, ejecuta agente, devuelve
     historial actualizado, texto de respuesta y contenido completo de la respuesta del asistente.
+    El historial devuelto es completo (incluye las llamadas a herramientas del turno); al
+    modelo solo se envía su versión compactada (`model_input`: bloc de notas de IDs +
+    presupuesto de tokens).
     """
     agent_logger.info(f"Procesando turno v2 (No Stream). Historial previo: {len(history)} msgs. Input: '{user_input}'")
     current_history_for_agent = history + [{"role": "user", "content": user_input}]
-
-    response_text = "(El agente no generó respuesta en texto)"
-    assistant_content_for_history = None
+    model_input = history_manager.compact(history) + [{"role": "user", "content": user_input}]
 
     try:
-        # Usamos async with para asegurar que la conexión MCP esté activa durante el run
-        async with odoo_mcp_server:
-            agent_logger.info(f"Contexto MCP activo. Llamando a Runner.run con {len(current_history_for_agent)} mensajes.")
-            result = await Runner.run(
-                starting_agent=agente_quindicolor,
-                input=current_history_for_agent
-            )
-            agent_logger.info(f"Runner.run completado. Items nuevos: {len(result.new_items)}")
-
-            # Procesar respuesta
-            if result.final_output:
-                response_text = str(result.final_output)
-                assistant_content_for_history = response_text # Guardar texto simple
-            else:
-                # Reconstruir texto y contenido completo si no hubo final_output
-                last_assistant_message_parts = []
-                text_parts = []
-                raw_content_to_save = None
-                for item in result.new_items:
-                    if item.type == "message_output_item":
-                        content = getattr(item.raw, 'content', None)
-                        if content:
-                             raw_content_to_save = content
-                             if isinstance(content, list):
-                                  text_parts.extend([part.get("text", "") for part in content if isinstance(part, dict) and part.get("type") == "text"])
-                             elif isinstance(content, dict) and content.get("type") == "text":
-                                  text_parts.append(content.get("text", ""))
-                
-                response_text = "\n".join(filter(None, text_parts)).strip()
-                assistant_content_for_history = raw_content_to_save # Guardar contenido completo
-                if not response_text and any(item.type == "tool_call_item" for item in result.new_items):
-                     response_text = "(Acción interna realizada...)"
-
-        # Crear historial actualizado fuera del 'async with'
-        updated_history = current_history_for_agent
-        if assistant_content_for_history is not None:
-            updated_history = updated_history + [{"role": "assistant", "content": assistant_content_for_history}]
-        else:
-            # Si no hubo respuesta del asistente, añadir placeholder o texto acumulado
-            updated_history = updated_history + [{"role": "assistant", "content": response_text or "(Sin respuesta final)"}]
-            agent_logger.warning("No se encontró contenido estructurado del asistente.")
+        runtime = await _get_runtime()
+        from agents import Runner
+        # El servidor MCP es persistente: solo se arranca en el primer turno (o tras una caída)
+        await runtime.mcp_server.ensure_connected()
+        agent_logger.info(f"Servidor MCP activo. Llamando a Runner.run con {len(model_input)} mensajes "
+                          f"(~{history_manager.estimate_tokens(model_input)} tokens de historial).")
+        result = await Runner.run(
+            starting_agent=runtime.agent,
+            input=model_input
+        )
+        agent_logger.info(f"Runner.run completado. Items nuevos: {len(result.new_items)}")
 
+        updated_history, response_text, assistant_content_for_history = _finish_turn(result, current_history_for_agent)
         agent_logger.info(f"Turno v2 procesado. Respuesta: '{response_text[:50]}...'. Historial nuevo: {len(updated_history)} msgs.")
         return updated_history, response_text, assistant_content_for_history
 
@@ -140,6 +398,55 @@ async def process_agent_turn(user_input: str, history: list) -> Tuple[list, str,
         # Devolvemos historial ANTES del input del usuario que causó el error
         return history, error_message, None
 
+async def process_agent_turn_streamed(user_input: str, history: list) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Versión con streaming de `process_agent_turn` (sobre `Runner.run_streamed`). Es un
+    generador asíncrono que emite tuplas (tipo, dato) en cuanto llegan:
+      - ("delta", texto): fragmento del texto de respuesta del asistente.
+      - ("tool_call", nombre): el agente ha llamado a una herramienta.
+      - ("tool_output", nombre): la herramienta ha respondido.
+      - ("done", (historial, texto, contenido)): siempre el último; mismo resultado que
+        `process_agent_turn` (en caso de error, el historial previo y el mensaje de error).
+    """
+    agent_logger.info(f"Procesando turno (Stream). Historial previo: {len(history)} msgs. Input: '{user_input}'")
+    current_history_for_agent = history + [{"role": "user", "content": user_input}]
+    model_input = history_manager.compact(history) + [{"role": "user", "content": user_input}]
+    started = time.perf_counter()
+    first_delta_at = None
+    try:
+        runtime = await _get_runtime()
+        from agents import Runner
+        await runtime.mcp_server.ensure_connected()
+        agent_logger.info(f"Servidor MCP activo. Llamando a Runner.run_streamed con {len(model_input)} mensajes "
+                          f"(~{history_manager.estimate_tokens(model_input)} tokens de historial).")
+        result = Runner.run_streamed(starting_agent=runtime.agent, input=model_input)
+        tool_names: Dict[str, str] = {}
+        async for event in result.stream_events():
+            if event.type == "raw_response_event":
+                if getattr(event.data, "type", None) == "response.output_text.delta" and event.data.delta:
+                    if first_delta_at is None:
+                        first_delta_at = time.perf_counter() - started
+                    yield ("delta", event.data.delta)
+            elif event.type == "run_item_stream_event":
+                raw = getattr(event.item, "raw_item", None)
+                if event.name == "tool_called":
+                    name = getattr(raw, "name", None) or "herramienta"
+                    tool_names[getattr(raw, "call_id", "")] = name
+                    yield ("tool_call", name)
+                elif event.name == "tool_output":
+                    call_id = raw.get("call_id") if isinstance(raw, dict) else getattr(raw, "call_id", "")
+                    yield ("tool_output", tool_names.get(call_id, "herramienta"))
+
+        updated_history, response_text, assistant_content_for_history = _finish_turn(result, current_history_for_agent)
+        agent_logger.info(f"Turno (Stream) procesado en {time.perf_counter() - started:.2f}s (primer texto a los "
+                          f"{first_delta_at if first_delta_at is not None else float('nan'):.2f}s). Historial nuevo: {len(updated_history)} msgs.")
+        yield ("done", (updated_history, response_text, assistant_content_for_history))
+
+    except Exception as e:
+        agent_logger.error(f"Error en process_agent_turn_streamed: {type(e).__name__} - {e}", exc_info=True)
+        error_message = f"Error procesando la solicitud: {type(e).__name__} ({e})"
+        yield ("done", (history, error_message, None))
+
 # --- Bloque Principal ---
 if __name__ == "__main__":
     agent_logger.warning("Este script ('agente_quindicolor_openai.py') contiene la lógica del agente.")
@@ -0,0 +1,120 @@
+# almacen_audio.py
+
+import asyncio
+import atexit
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger('openai_agent_logic')
+
+
+class AudioStore:
+    """
+    Almacén de los audios TTS que se entregan a Gradio, con tamaño y antigüedad acotados.
+
+    - Cada audio va a un archivo con nombre único (uuid4) dentro de un directorio propio,
+      así las sesiones concurrentes no colisionan y la limpieza no toca archivos ajenos.
+      Sin `directory`, cada proceso crea el suyo (`<tmp>/quindicolor_tts_*`) y lo borra al
+      salir: dos apps en la misma máquina nunca se limpian los audios entre sí.
+    - Los clips de hasta `inline_max_bytes` no se escriben: `save()` devuelve los bytes y
+      Gradio los sirve directamente.
+    - `cleanup()` borra los archivos con más de `max_age` segundos y, si aún se superan
+      `max_bytes` o `max_files`, los más antiguos primero. Se ejecuta tras cada escritura que
+      rebasa los límites y periódicamente en segundo plano (`ensure_started`).
+
+    Gradio copia cada audio de salida (archivo o bytes) a su propia caché al devolverlo, así
+    que basta con conservarlos unos minutos; esa caché la limpia Gradio con la misma
+    política si se crea `gr.Blocks(delete_cache=audio_store.gradio_delete_cache)`.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 50 * 1024 * 1024, max_age: float = 900.0,
+                 max_files: int = 200, inline_max_bytes: int = 0, cleanup_interval: float = 60.0):
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="quindicolor_tts_")
+            atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_files = max_files
+        self.inline_max_bytes = inline_max_bytes
+        self.cleanup_interval = cleanup_interval
+        self._bytes = 0
+        self._files = 0
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {'saved_files': 0, 'inline': 0, 'evicted': 0, 'evicted_bytes': 0, 'errors': 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self.cleanup()  # Restos de ejecuciones anteriores si el directorio es fijo
+
+    @property
+    def gradio_delete_cache(self) -> Tuple[int, int]:
+        """(frecuencia, antigüedad máxima) en segundos para `gr.Blocks(delete_cache=...)`."""
+        return max(1, int(self.cleanup_interval)), max(1, int(self.max_age))
+
+    def save(self, data: bytes, suffix: str = ".mp3") -> Union[str, bytes]:
+        """Guarda un audio y devuelve su ruta, o los propios bytes si es un clip corto."""
+        if len(data) <= self.inline_max_bytes:
+            self._stats['inline'] += 1
+            return data
+        path = os.path.join(self.directory, f"tts_{uuid.uuid4().hex}{suffix}")
+        with open(path, "xb") as f:
+            f.write(data)
+        self._stats['saved_files'] += 1
+        self._bytes += len(data)
+        self._files += 1
+        if self._bytes > self.max_bytes or self._files > self.max_files:
+            self.cleanup()
+        return path
+
+    def cleanup(self) -> int:
+        """Aplica la política de expulsión sobre el directorio. Devuelve cuántos archivos borró."""
+        try:
+            entries = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in os.scandir(self.directory) if e.is_file()]
+        except OSError as e:
+            self._stats['errors'] += 1
+            logger.error(f"No se pudo listar el directorio de audio {self.directory}: {e}")
+            return 0
+        entries.sort()  # Más antiguos primero
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        removed = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes and count <= self.max_files:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self._stats['errors'] += 1
+                logger.warning(f"No se pudo borrar el audio {path}: {e}")
+                continue
+            total -= size
+            count -= 1
+            removed += 1
+            self._stats['evicted_bytes'] += size
+        self._bytes, self._files = total, count
+        self._stats['evicted'] += removed
+        if removed:
+            logger.debug(f"Almacén de audio: {removed} archivo(s) eliminados; quedan {count} ({total / 1e6:.1f} MB).")
+        return removed
+
+    async def run(self) -> None:
+        """Limpieza periódica (hasta que se cancele la tarea)."""
+        while True:
+            self.cleanup()
+            await asyncio.sleep(self.cleanup_interval)
+
+    def ensure_started(self) -> None:
+        """Arranca la limpieza periódica en el event loop actual (idempotente)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self.run(), name="almacen-audio-cleanup")
+
+    def stats(self) -> Dict[str, Any]:
+        return {'directory': self.directory, 'files': self._files, 'bytes': self._bytes, **self._stats}
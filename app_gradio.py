@@ -1,9 +1,8 @@
-# app_gradio.py (v7 - Doble Entrada + Chatbot + TTS)
+# app_gradio.py (v8 - Doble Entrada + Chatbot con Streaming + TTS)
 
 import gradio as gr
 import asyncio
 import logging
-import tempfile
 import os
 import time
 
@@ -18,15 +17,32 @@ except ImportError:
 # Lógica del Agente
 try:
     from agente_quindicolor_openai import (
-        agente_quindicolor,
-        odoo_mcp_server,
-        process_agent_turn, # La función refactorizada
+        preload_in_background, # Importa el SDK y crea el agente en segundo plano
+        process_agent_turn_streamed, # Versión con streaming (generador asíncrono)
+        session_scheduler,
+        SchedulerSaturated,
         agent_logger
     )
 except ImportError:
     print("Error importando desde agente_quindicolor_openai.py.")
     exit(1)
 
+# El SDK del agente se importa mientras se construye la interfaz (no retrasa su aparición)
+preload_in_background()
+
+from sintesis_voz import OpenAITTSClient, StubTTSClient, SpeechPipeline, merge_streams
+from almacen_audio import AudioStore
+
+# TTS por frases en paralelo con la generación del agente (0 = un único mp3 al final)
+TTS_STREAMING = os.getenv("TTS_STREAMING", "1") != "0"
+TTS_PARALELO = int(os.getenv("TTS_PARALELO", "3"))  # Frases sintetizadas a la vez
+# 'stub' = TTS local simulado (sin red), para medir latencias sin gastar cuota
+tts_client = StubTTSClient() if os.getenv("TTS_CLIENTE", "openai") == "stub" else OpenAITTSClient(oai_client)
+# Audios TTS completos: directorio propio acotado en tamaño/antigüedad; los cortos no tocan disco
+audio_store = AudioStore(max_bytes=int(os.getenv("AUDIO_MAX_MB", "50")) * 1024 * 1024,
+                         max_age=float(os.getenv("AUDIO_MAX_EDAD", "900")),
+                         inline_max_bytes=int(os.getenv("AUDIO_INLINE_KB", "256")) * 1024)
+
 # --- Funciones Auxiliares (STT, TTS, Conversión Historial) ---
 
 async def transcribe_audio(filepath: str | None) -> str:
@@ -41,16 +57,12 @@ async def transcribe_audio(filepath: str | None) -> str:
         agent_logger.error(f"Error Whisper: {e}", exc_info=True)
         return f"(Error transcripción: {type(e).__name__})"
 
-async def text_to_speech(text: str) -> str | None:
-    # (Misma función que antes)
+async def text_to_speech(text: str) -> str | bytes | None:
+    # Audio completo de la respuesta (sin TTS_STREAMING): ruta en el almacén o bytes si es corto
     if not text or text.startswith("(") or text.strip() == "": return None
     try:
-        temp_dir = tempfile.gettempdir()
-        output_filename = f"gradio_tts_output_{int(time.time()*1000)}.mp3"
-        speech_file_path = os.path.join(temp_dir, output_filename)
-        response = await oai_client.audio.speech.create(model="tts-1", voice="nova", input=text, response_format="mp3")
-        await response.astream_to_file(speech_file_path)
-        return speech_file_path
+        audio_store.ensure_started()
+        return audio_store.save(await tts_client.synthesize(text))
     except Exception as e:
         agent_logger.error(f"Error TTS: {e}", exc_info=True)
         return None
@@ -92,59 +104,111 @@ def agent_history_to_gradio(agent_history: list) -> list:
 
 # --- Lógica Principal de Gradio ---
 
-# Función núcleo que maneja un turno, independientemente de si vino de texto o voz
-async def handle_turn_core(user_text: str, history_state_agent: list | None):
+STREAM_UI_INTERVAL = 0.05  # Segundos mínimos entre refrescos del chatbot mientras llega el texto
+
+# Función núcleo que maneja un turno, independientemente de si vino de texto o voz.
+# Generador: va emitiendo (state, chatbot, audio) a medida que llega la respuesta del agente.
+# Con TTS_STREAMING cada frase se sintetiza en cuanto está completa y su audio se envía al
+# navegador (componente de audio en streaming) mientras el agente sigue escribiendo.
+async def handle_turn_core(user_text: str, history_state_agent: list | None, session_id: str):
     if history_state_agent is None: history_state_agent = []
     if not user_text or user_text.startswith("(Error"):
         error_msg = user_text or "(Input vacío o inválido)"
         agent_logger.warning(f"Input inválido para procesar: {error_msg}")
         # Devolver historial sin cambios, historial display con error, sin audio
-        return history_state_agent, agent_history_to_gradio(history_state_agent + [{"role":"assistant", "content":error_msg}]), None
-
-    # Llamar al agente
-    updated_agent_history, response_text, _ = await process_agent_turn(
-        user_input=user_text,
-        history=history_state_agent # Pasamos historial ANTES del input actual
-    )
-
-    # Generar TTS
-    tts_audio_path = await text_to_speech(response_text)
-
-    # Convertir historial para display
-    gradio_display_history = agent_history_to_gradio(updated_agent_history)
-
-    return updated_agent_history, gradio_display_history, tts_audio_path
-
-
-# Funciones wrapper para los eventos de Gradio
-
-async def handle_text_input(text_message: str, history_state_agent: list | None):
+        yield history_state_agent, agent_history_to_gradio(history_state_agent + [{"role":"assistant", "content":error_msg}]), None
+        return
+
+    # Mostrar el mensaje del usuario al instante y la respuesta a medida que llega
+    previous_display = agent_history_to_gradio(history_state_agent)
+    state, display = history_state_agent, previous_display + [[user_text, "…"]]
+    partial_text, tool_status, last_update = "", "", 0.0
+    response_text = ""
+    yield state, display, None
+
+    # Admisión: como máximo N turnos simultáneos en la app y uno por sesión; el resto espera
+    # su turno (rotando entre sesiones) o recibe un aviso si el servicio está saturado
+    try:
+        async with session_scheduler.slot(session_id) as waited:
+            if waited >= 1.0:
+                agent_logger.info(f"Turno de la sesión {session_id[:8]} admitido tras {waited:.1f}s en cola.")
+            pipeline = SpeechPipeline(tts_client, max_parallel=TTS_PARALELO) if TTS_STREAMING else None
+            streams = [process_agent_turn_streamed(user_input=user_text, history=history_state_agent)]
+            if pipeline:
+                streams.append(pipeline.audio_chunks())
+            try:
+                async for source, event in merge_streams(*streams):
+                    if source == 1:  # Audio de la siguiente frase
+                        yield state, display, event
+                        continue
+                    kind, data = event
+                    if kind == "delta":
+                        partial_text += data
+                        if pipeline: pipeline.feed(data)
+                    elif kind == "tool_call":
+                        tool_status = f"_(Consultando Odoo: {data}…)_"
+                    elif kind == "tool_output":
+                        tool_status = ""
+                    elif kind == "done":
+                        state, response_text, _ = data
+                        display = agent_history_to_gradio(state)
+                        if state is history_state_agent:  # Error: el turno no se añadió al historial
+                            display = previous_display + [[user_text, response_text]]
+                        if pipeline:
+                            if not partial_text and not response_text.startswith("("):
+                                pipeline.feed(response_text)  # Sin deltas (p. ej. error): se lee el texto final
+                            pipeline.finish()
+                        yield state, display, None
+                        continue
+                    now = time.monotonic()
+                    if now - last_update >= STREAM_UI_INTERVAL:
+                        last_update = now
+                        display = previous_display + [[user_text, "\n\n".join(filter(None, [partial_text, tool_status])) or "…"]]
+                        yield state, display, None
+            finally:
+                if pipeline:
+                    await pipeline.aclose()
+                    agent_logger.info(f"TTS por frases: {pipeline.sentences} frase(s), primer audio a los "
+                                      f"{pipeline.first_audio_latency if pipeline.first_audio_latency is not None else float('nan'):.2f}s.")
+
+            if not pipeline:
+                # Sin streaming de voz: un único mp3 con la respuesta completa
+                yield state, display, await text_to_speech(response_text)
+    except SchedulerSaturated as e:
+        yield history_state_agent, previous_display + [[user_text, str(e)]], None
+
+
+# Funciones wrapper para los eventos de Gradio (generadores: Gradio refresca la UI en cada yield)
+
+def session_key(request: gr.Request | None) -> str:
+    """Identidad para el control de admisión: usuario autenticado o, si no hay, la sesión del navegador."""
+    if request is None: return "anonimo"
+    return getattr(request, "username", None) or request.session_hash or "anonimo"
+
+async def handle_text_input(text_message: str, history_state_agent: list | None, request: gr.Request):
     agent_logger.info("Evento: Texto enviado.")
-    # El último elemento del historial display será el input de texto, lo añadimos al state
     # Nota: Gradio Chatbot no pasa el historial en el input, usamos el state
-    # if history_state_agent is None: history_state_agent = []
+    async for updated_state, display_hist, audio_path in handle_turn_core(text_message, history_state_agent, session_key(request)):
+        # Nuevo estado, historial para el chatbot, ruta del audio TTS y textbox limpio
+        yield updated_state, display_hist, audio_path, ""
 
-    updated_state, display_hist, audio_path = await handle_turn_core(text_message, history_state_agent)
-    # Devolvemos el nuevo estado, el historial para el chatbot, y la ruta del audio TTS
-    # También limpiamos la caja de texto
-    return updated_state, display_hist, audio_path, "" # Limpiar textbox
 
-
-async def handle_audio_input(audio_path: str | None, history_state_agent: list | None):
+async def handle_audio_input(audio_path: str | None, history_state_agent: list | None, request: gr.Request):
     agent_logger.info("Evento: Audio grabado.")
     if audio_path is None:
-         return history_state_agent, agent_history_to_gradio(history_state_agent), None # No hacer nada si no hay audio
+         yield history_state_agent, agent_history_to_gradio(history_state_agent or []), None # No hacer nada si no hay audio
+         return
 
     transcribed_text = await transcribe_audio(audio_path)
     # Llamar a la lógica central con el texto transcrito
-    updated_state, display_hist, audio_path = await handle_turn_core(transcribed_text, history_state_agent)
-    # Devolvemos el nuevo estado, el historial para el chatbot, y la ruta del audio TTS
-    return updated_state, display_hist, audio_path
+    async for updated_state, display_hist, tts_path in handle_turn_core(transcribed_text, history_state_agent, session_key(request)):
+        yield updated_state, display_hist, tts_path
 
 
 # --- Construcción de la Interfaz Gradio ---
 agent_logger.info("Construyendo la interfaz Gradio completa...")
-with gr.Blocks(theme=gr.themes.Soft(), title="Asistente QuindíColor") as demo: # Usamos Soft theme
+with gr.Blocks(theme=gr.themes.Soft(), title="Asistente QuindíColor", # Usamos Soft theme
+               delete_cache=audio_store.gradio_delete_cache) as demo: # Audios servidos desde la caché de Gradio
     gr.Markdown("## Asistente Inteligente QuindíColor (Odoo + MCP + OpenAI + Voz)")
     gr.Markdown("Interactúa escribiendo o usando el micrófono.")
 
@@ -157,7 +221,8 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Asistente QuindíColor") as demo:
             chatbot_display = gr.Chatbot(label="Conversación", height=550, bubble_full_width=False)
 
              # Salida de audio TTS
-            audio_output = gr.Audio(label="Respuesta (Voz)", type="filepath", autoplay=True, interactive=False)
+            audio_output = gr.Audio(label="Respuesta (Voz)", type="filepath", autoplay=True, interactive=False,
+                                    streaming=TTS_STREAMING, format="mp3")
 
         with gr.Column(scale=1):
             gr.Markdown("### Entradas")
@@ -167,6 +232,10 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Asistente QuindíColor") as demo:
             mic_input = gr.Audio(sources=["microphone"], type="filepath", label="O habla aquí:")
             # Botón Limpiar
             clear_button = gr.Button("🗑️ Limpiar Chat")
+            # Métricas de admisión (turnos en curso, cola, esperas, rechazos)
+            with gr.Accordion("📊 Estado del servicio", open=False):
+                metrics_display = gr.JSON(label="Planificador de turnos")
+                metrics_button = gr.Button("Actualizar")
 
 
     # --- Conexiones de Eventos ---
@@ -188,9 +257,13 @@ with gr.Blocks(theme=gr.themes.Soft(), title="Asistente QuindíColor") as demo:
     # Al hacer clic en Limpiar
     clear_button.click(lambda: ([], [], None, ""), None, [agent_history_state, chatbot_display, audio_output, text_input], queue=False)
 
+    metrics_button.click(session_scheduler.stats, None, metrics_display, queue=False)
+
 
 # --- Lanzar la aplicación ---
 agent_logger.info("Lanzando la interfaz Gradio completa...")
 print("Accede a la interfaz en la URL que aparecerá a continuación.")
-demo.queue().launch(share=False)
+# La admisión la hace session_scheduler: la cola de Gradio no limita la concurrencia por evento
+# (por defecto 1, que serializaría a todos los usuarios) y solo acota las peticiones pendientes.
+demo.queue(default_concurrency_limit=None, max_size=session_scheduler.max_in_flight + session_scheduler.max_queue + 8).launch(share=False)
 agent_logger.info("Interfaz Gradio cerrada.")
\ No newline at end of file
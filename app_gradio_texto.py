@@ -1,16 +1,18 @@
-# app_gradio_texto.py (v13 - Corregido NameError + UI Alto Contraste)
+# app_gradio_texto.py (v14 - Streaming + UI Alto Contraste)
 
 import gradio as gr
 import asyncio
 import logging
+import time
 from typing import List, Dict, Any, Tuple
 
 # Lógica del Agente
 try:
     from agente_quindicolor_openai import (
-        agente_quindicolor,
-        odoo_mcp_server,
-        process_agent_turn, # Usamos la versión SIN streaming
+        preload_in_background, # Importa el SDK y crea el agente en segundo plano
+        process_agent_turn_streamed, # Versión con streaming (generador asíncrono)
+        session_scheduler,
+        SchedulerSaturated,
         agent_logger
     )
     # Función de conversión de historial
@@ -39,6 +41,9 @@ except Exception as e:
      print(f"Error importando dependencias: {e}")
      exit(1)
 
+# El SDK del agente se importa mientras se construye la interfaz (no retrasa su aparición)
+preload_in_background()
+
 
 # --- CSS para Alto Contraste ---
 high_contrast_dark_css = """
@@ -46,27 +51,52 @@ body, .gradio-container { background-color: #1a1a1a !important; color: #e0e0e0 !
 .gr-button { background-color: #505050; color: white; border: 1px solid #888; font-weight: bold; } .gr-button:hover { background-color: #6a6a6a; border-color: #aaa;} .gr-input input, .gr-input textarea, .gr-textbox { background-color: #2a2a2a !important; color: #e0e0e0 !important; border: 1px solid #555 !important; } .gr-chatbot { background-color: #252525 !important; } .gr-chatbot .message-bubble { border-radius: 15px; max-width: 90%; box-shadow: 1px 1px 3px rgba(0,0,0,0.3);} .gr-chatbot .message-bubble.user { background-color: #4a4e88 !important; color: white !important; border-bottom-right-radius: 5px !important; align-self: flex-end; } .gr-chatbot .message-bubble.bot { background-color: #383838 !important; color: #f0f0f0 !important; border-bottom-left-radius: 5px !important; align-self: flex-start; } .gr-label > span, label span { color: #b0b0b0 !important; } .gr-markdown h2, .gr-markdown h3 { color: #ffffff; border-bottom: 1px solid #444; padding-bottom: 5px;} .gr-markdown p, .gr-markdown li { color: #d0d0d0; line-height: 1.6;} .gradio-container .contain { gap: 0 !important; }
 """
 
-# --- Lógica de Gradio para Texto (SIN Streaming) ---
-async def handle_text_ui_update(text_message: str, history_state_agent: list | None):
-    """Maneja input/output de texto con historial y chatbot (sin streaming)."""
+# --- Lógica de Gradio para Texto (con Streaming) ---
+STREAM_UI_INTERVAL = 0.05  # Segundos mínimos entre refrescos del chatbot mientras llega el texto
+
+async def handle_text_ui_update(text_message: str, history_state_agent: list | None, request: gr.Request):
+    """Maneja input/output de texto con historial y chatbot, mostrando la respuesta a medida que llega."""
     agent_logger.info(f"handle_text_ui_update recibido: '{text_message}'")
     if history_state_agent is None: history_state_agent = []
 
     if not text_message:
         agent_logger.warning("Input vacío (Texto).")
-        return history_state_agent, agent_history_to_gradio(history_state_agent), ""
-
-    # Llamar al agente (versión no-streaming)
-    updated_agent_history, response_text, _ = await process_agent_turn(
-        user_input=text_message,
-        history=history_state_agent
-    )
+        yield history_state_agent, agent_history_to_gradio(history_state_agent), ""
+        return
 
-    # Convertir historial completo para display
-    gradio_display_history = agent_history_to_gradio(updated_agent_history)
+    # Se muestra el mensaje del usuario al instante y la respuesta se va completando
+    previous_display = agent_history_to_gradio(history_state_agent)
+    partial_text, tool_status, last_update = "", "", 0.0
+    yield history_state_agent, previous_display + [[text_message, "…"]], ""
 
-    agent_logger.info(f"Gradio Texto -> Turno procesado. Respuesta: '{response_text[:50]}...'. Historial: {len(updated_agent_history)} msgs.")
-    return updated_agent_history, gradio_display_history, ""
+    # Admisión: como máximo N turnos simultáneos en la app y uno por sesión (usuario o navegador)
+    session_id = getattr(request, "username", None) or getattr(request, "session_hash", None) or "anonimo"
+    try:
+        async with session_scheduler.slot(session_id) as waited:
+            if waited >= 1.0:
+                agent_logger.info(f"Turno de la sesión {session_id[:8]} admitido tras {waited:.1f}s en cola.")
+            async for kind, data in process_agent_turn_streamed(user_input=text_message, history=history_state_agent):
+                if kind == "delta":
+                    partial_text += data
+                elif kind == "tool_call":
+                    tool_status = f"_(Consultando Odoo: {data}…)_"
+                elif kind == "tool_output":
+                    tool_status = ""
+                elif kind == "done":
+                    updated_agent_history, response_text, _ = data
+                    gradio_display_history = agent_history_to_gradio(updated_agent_history)
+                    if updated_agent_history is history_state_agent:  # Error: el turno no se añadió al historial
+                        gradio_display_history = previous_display + [[text_message, response_text]]
+                    agent_logger.info(f"Gradio Texto -> Turno procesado. Respuesta: '{response_text[:50]}...'. Historial: {len(updated_agent_history)} msgs.")
+                    yield updated_agent_history, gradio_display_history, ""
+                    return
+                now = time.monotonic()
+                if now - last_update >= STREAM_UI_INTERVAL:
+                    last_update = now
+                    shown = "\n\n".join(filter(None, [partial_text, tool_status])) or "…"
+                    yield history_state_agent, previous_display + [[text_message, shown]], ""
+    except SchedulerSaturated as e:
+        yield history_state_agent, previous_display + [[text_message, str(e)]], ""
 
 # --- Construcción de la Interfaz Gradio ---
 agent_logger.info("Construyendo interfaz Gradio (Solo Texto - UI Alto Contraste)...")
@@ -85,6 +115,9 @@ with gr.Blocks(css=high_contrast_dark_css, title="Asistente QuindíColor (Texto)
             label="Escribe aquí:", placeholder="Ej: Busca cliente ACME...", show_label=False
         )
         clear_button_texto = gr.Button("🗑️ Limpiar Chat")
+        with gr.Accordion("📊 Estado del servicio", open=False):
+            metrics_display_texto = gr.JSON(label="Planificador de turnos")
+            metrics_button_texto = gr.Button("Actualizar")
 
     # --- Conectar Eventos ---
     text_input_texto.submit(
@@ -93,11 +126,13 @@ with gr.Blocks(css=high_contrast_dark_css, title="Asistente QuindíColor (Texto)
         outputs=[agent_history_state_texto, chatbot_display_texto, text_input_texto]
     )
     clear_button_texto.click(lambda: ([], [], ""), None, [agent_history_state_texto, chatbot_display_texto, text_input_texto], queue=False)
+    metrics_button_texto.click(session_scheduler.stats, None, metrics_display_texto, queue=False)
 
 # --- Lanzar la aplicación ---
 if __name__ == "__main__":
     # La validación de la API Key la maneja la librería openai o la lógica importada
     agent_logger.info("Lanzando interfaz Gradio (Solo Texto - UI Alto Contraste)...")
     print("Accede a la interfaz de TEXTO en la URL (Puerto 7861 por defecto):")
-    demo_texto.queue().launch(server_name="0.0.0.0", server_port=7861)
+    # La admisión la hace session_scheduler; la cola de Gradio no serializa los turnos (límite por defecto 1)
+    demo_texto.queue(default_concurrency_limit=None, max_size=session_scheduler.max_in_flight + session_scheduler.max_queue + 8).launch(server_name="0.0.0.0", server_port=7861)
     agent_logger.info("Interfaz Gradio (Texto) cerrada.")
\ No newline at end of file
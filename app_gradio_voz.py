@@ -3,9 +3,7 @@
 import gradio as gr
 import asyncio
 import logging
-import tempfile
 import os
-import time
 
 # Cliente OpenAI (asume variable de entorno OPENAI_API_KEY)
 try:
@@ -18,15 +16,26 @@ except ImportError:
 # Lógica del Agente (importar funciones/variables necesarias)
 try:
     from agente_quindicolor_openai import (
-        agente_quindicolor,
-        odoo_mcp_server,
+        preload_in_background, # Importa el SDK y crea el agente en segundo plano
         process_agent_turn,
+        session_scheduler,
+        SchedulerSaturated,
         agent_logger
     )
 except ImportError:
     print("Error: No se pudo importar desde agente_quindicolor_openai.py.")
     exit(1)
 
+# El SDK del agente se importa mientras se construye la interfaz (no retrasa su aparición)
+preload_in_background()
+
+from almacen_audio import AudioStore
+
+# Audios TTS: directorio propio acotado en tamaño/antigüedad; los clips cortos no tocan disco
+audio_store = AudioStore(max_bytes=int(os.getenv("AUDIO_MAX_MB", "50")) * 1024 * 1024,
+                         max_age=float(os.getenv("AUDIO_MAX_EDAD", "900")),
+                         inline_max_bytes=int(os.getenv("AUDIO_INLINE_KB", "256")) * 1024)
+
 # --- Lógica de Transcripción (STT - igual que antes) ---
 async def transcribe_audio(filepath: str | None) -> str:
     """Transcribe un archivo de audio usando OpenAI Whisper."""
@@ -52,32 +61,32 @@ async def transcribe_audio(filepath: str | None) -> str:
         return f"(Error en transcripción: {type(e).__name__})"
 
 # --- Lógica de Texto a Voz (TTS - igual que antes) ---
-async def text_to_speech(text: str) -> str | None:
-    """Convierte texto a audio MP3 usando OpenAI TTS y devuelve la ruta a un archivo temporal."""
+async def text_to_speech(text: str) -> str | bytes | None:
+    """
+    Convierte texto a audio MP3 usando OpenAI TTS. Devuelve la ruta en el almacén de audio
+    (nombre único, limpieza por tamaño/antigüedad) o los bytes directamente si el clip es corto.
+    """
     if not text or text.startswith("(") or text.strip() == "":
         agent_logger.warning(f"No se generará TTS para texto vacío o de error: '{text}'")
         return None
     try:
         agent_logger.info(f"Generando TTS para: '{text[:50]}...'")
-        temp_dir = tempfile.gettempdir()
-        output_filename = f"gradio_tts_output_{int(time.time()*1000)}.mp3"
-        speech_file_path = os.path.join(temp_dir, output_filename)
-
         response = await oai_client.audio.speech.create(
             model="tts-1",
             voice="nova",
             input=text,
             response_format="mp3"
         )
-        await response.astream_to_file(speech_file_path)
-        agent_logger.info(f"Audio TTS guardado en: {speech_file_path}")
-        return speech_file_path
+        audio_store.ensure_started()
+        audio = audio_store.save(response.content)
+        agent_logger.info(f"Audio TTS listo: {audio if isinstance(audio, str) else f'{len(audio)} bytes en memoria'}")
+        return audio
     except Exception as e:
         agent_logger.error(f"Error durante generación TTS: {e}", exc_info=True)
         return None
 
 # --- Lógica de la Interfaz Gradio (Adaptada para TTS) ---
-async def handle_audio_input_with_tts(audio_input_path: str | None, history_state_agent: list | None):
+async def handle_audio_input_with_tts(audio_input_path: str | None, history_state_agent: list | None, request: gr.Request):
     """
     Maneja entrada de audio, transcribe, llama al agente, genera TTS y devuelve ruta de audio y estado.
     """
@@ -100,20 +109,20 @@ async def handle_audio_input_with_tts(audio_input_path: str | None, history_stat
          return history_state_agent, None
 
 
-    # 2. Llamar al agente con el historial que YA incluye el último input del usuario
-    # Nota: pasamos history_state_agent directamente porque ya lo actualizamos
-    updated_agent_history, response_text = await process_agent_turn(
-        # user_input ya no se pasa aquí, va dentro del historial
-        user_input=user_text, # AUNQUE process_agent_turn lo añade de nuevo, revisar esa lógica
-        history=history_state_agent[:-1] # Pasar historial SIN el último input añadido arriba
-                                        # Corrección: process_agent_turn espera el historial *antes* del último input
-                                        # y el input por separado. ¡Hay que ajustar eso!
-                                        # -> Ajustaremos process_agent_turn para aceptar solo historial y añadir el input dentro
-                                        # -> O ajustamos aquí para no añadir user_text a history_state_agent todavía
-                                        # -> Vamos a ajustar aquí por simplicidad ahora:
-                                        # NO añadimos user_text a history_state_agent aquí.
-                                        # process_agent_turn lo hará.
-    )
+    # 2. Llamar al agente con el historial previo y el texto transcrito por separado
+    # Admisión: como máximo N turnos simultáneos en la app y uno por sesión (usuario o navegador)
+    session_id = getattr(request, "username", None) or getattr(request, "session_hash", None) or "anonimo"
+    try:
+        async with session_scheduler.slot(session_id) as waited:
+            if waited >= 1.0:
+                agent_logger.info(f"Turno de la sesión {session_id[:8]} admitido tras {waited:.1f}s en cola.")
+            updated_agent_history, response_text, _ = await process_agent_turn(
+                user_input=user_text,
+                history=history_state_agent[:-1] # Historial previo: process_agent_turn añade user_input
+            )
+    except SchedulerSaturated as e:
+        # Sin turno: se avisa por voz y el historial queda como estaba antes de este audio
+        return history_state_agent[:-1], await text_to_speech(str(e))
     # La función process_agent_turn devuelve el historial YA actualizado con user y assistant
     history_state_agent = updated_agent_history # Actualizamos el state con lo devuelto
 
@@ -128,7 +137,8 @@ async def handle_audio_input_with_tts(audio_input_path: str | None, history_stat
 # --- Construcción de la Interfaz Gradio con Blocks (con Salida de Audio) ---
 agent_logger.info("Construyendo la interfaz Gradio con Salida de Audio...")
 # Eliminado el argumento 'theme'
-with gr.Blocks(title="Asistente QuindíColor (Voz)") as demo:
+with gr.Blocks(title="Asistente QuindíColor (Voz)",
+               delete_cache=audio_store.gradio_delete_cache) as demo: # Audios servidos desde la caché de Gradio
     gr.Markdown("# Asistente Inteligente QuindíColor (Voz)")
     gr.Markdown("Usa el micrófono para hablar con el asistente Odoo y escucha su respuesta.")
 
@@ -159,5 +169,6 @@ with gr.Blocks(title="Asistente QuindíColor (Voz)") as demo:
 # --- Lanzar la aplicación Gradio ---
 agent_logger.info("Lanzando la interfaz Gradio con TTS...")
 print("Accede a la interfaz en la URL que aparecerá a continuación.")
-demo.queue().launch(share=False)
+# La admisión la hace session_scheduler: la cola de Gradio no serializa los turnos (límite por defecto 1)
+demo.queue(default_concurrency_limit=None, max_size=session_scheduler.max_in_flight + session_scheduler.max_queue + 8).launch(share=False)
 agent_logger.info("Interfaz Gradio cerrada.")
\ No newline at end of file
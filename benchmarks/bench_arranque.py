@@ -0,0 +1,131 @@
+# benchmarks/bench_arranque.py
+#
+# Coste de arranque en frío, en procesos nuevos (sin módulos ya importados):
+#   - import: `python -X importtime -c "import <módulo>"` de mcp_odoo_server y de
+#     agente_quindicolor_openai; muestra el tiempo acumulado del módulo, el del proceso
+#     completo y sus dependencias directas más pesadas.
+#   - stdio: lanza `mcp_odoo_server.py` como lo hace el agente y mide hasta que responde a
+#     `initialize`, a `list_tools` y a la primera herramienta (contra el Odoo falso de
+#     benchmarks/odoo_falso.py, con la latencia indicada por RPC).
+# Cada medida es el mínimo de `--repeticiones`. Sale con código 1 si alguna supera su límite
+# (LIMITES, con holgura para máquinas lentas: el import del agente se dispara a ~1,7 s si
+# vuelve a cargar el SDK al importarse), así sirve como comprobación de regresiones.
+# `--limite nombre=ms` cambia un límite y `--sin-limites` solo mide.
+#
+# Uso: python benchmarks/bench_arranque.py [--repeticiones 3] [--latencia-ms 50] [--limite nombre=ms ...] [--sin-limites]
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RAIZ)
+
+from odoo_falso import CLAVE, DB, USUARIO, FakeOdoo, serve
+
+MODULOS = ('mcp_odoo_server', 'agente_quindicolor_openai')
+# Límites por defecto en ms (referencia: ~500, ~50, ~620 y ~710 ms con RPC de 50 ms)
+LIMITES = {'mcp_odoo_server': 1500, 'agente_quindicolor_openai': 400, 'initialize': 2000, 'primera_herramienta': 2500}
+
+def _args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Tiempo de arranque del servidor MCP y del módulo del agente.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--latencia-ms', type=float, default=50.0, help="Latencia simulada de cada RPC a Odoo.")
+    parser.add_argument('--top', type=int, default=6, help="Dependencias directas a mostrar por módulo.")
+    parser.add_argument('--limite', action='append', default=[], metavar='NOMBRE=MS',
+                        help="Máximo admitido para una medida (módulo, 'initialize', 'list_tools' o 'primera_herramienta').")
+    parser.add_argument('--sin-limites', action='store_true', help="Solo medir, sin comprobar límites.")
+    return parser.parse_args()
+
+def _entorno(url: str) -> Dict[str, str]:
+    # Sin credenciales reales ni log en el repositorio: el .env local no cambia las medidas
+    return {**os.environ, 'ODOO_URL': url, 'ODOO_DB': DB, 'ODOO_USER': USUARIO, 'ODOO_PASSWORD': CLAVE,
+            'OPENAI_API_KEY': os.environ.get('OPENAI_API_KEY', 'sk-bench'),
+            'MCP_LOG_ARCHIVO': os.path.join(tempfile.gettempdir(), 'bench_arranque_mcp.log')}
+
+def _importtime(modulo: str, env: Dict[str, str]) -> Tuple[float, float, List[Tuple[str, float]]]:
+    """(ms acumulados del módulo, ms del proceso completo, [(dependencia directa, ms)])."""
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modulo}'], cwd=RAIZ, env=env,
+                          capture_output=True, text=True)
+    total = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"'import {modulo}' falló:\n{proc.stderr[-2000:]}")
+    acumulado, hijos, pendientes = 0.0, [], []
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith('import time:') or 'cumulative' in linea:
+            continue
+        _, cumulative, nombre = linea[len('import time:'):].split('|')
+        profundidad = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        nombre, ms = nombre.strip(), int(cumulative) / 1000
+        if profundidad == 1:
+            pendientes.append((nombre, ms))
+        elif profundidad == 0:
+            if nombre == modulo:
+                acumulado, hijos = ms, pendientes
+            pendientes = []
+    return acumulado, total, sorted(hijos, key=lambda kv: -kv[1])
+
+async def _arranque_stdio(env: Dict[str, str]) -> Dict[str, float]:
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    params = StdioServerParameters(command=sys.executable, args=[os.path.join(RAIZ, 'mcp_odoo_server.py')], cwd=RAIZ, env=env)
+    started = time.perf_counter()
+    marcas = {}
+    with open(os.devnull, 'w') as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                marcas['initialize'] = time.perf_counter() - started
+                await session.list_tools()
+                marcas['list_tools'] = time.perf_counter() - started
+                await session.call_tool('buscar_cliente', {'nombre_cliente': 'Cliente'})
+                marcas['primera_herramienta'] = time.perf_counter() - started
+    return {k: v * 1000 for k, v in marcas.items()}
+
+def main(args: argparse.Namespace) -> int:
+    odoo = FakeOdoo(clientes=200, productos=500, latency=args.latencia_ms / 1000)
+    servidor, url = serve(odoo)
+    env = _entorno(url)
+    medidas: Dict[str, float] = {}
+
+    print(f"Import en un proceso nuevo (mínimo de {args.repeticiones}):")
+    for modulo in MODULOS:
+        runs = [_importtime(modulo, env) for _ in range(args.repeticiones)]
+        acumulado, total, hijos = min(runs, key=lambda r: r[0])
+        medidas[modulo] = acumulado
+        print(f"  {modulo:<28} {acumulado:>7.0f} ms import, {total:>6.0f} ms proceso completo")
+        for nombre, ms in hijos[:args.top]:
+            print(f"      {nombre:<30} {ms:>7.1f} ms")
+
+    print(f"\nServidor stdio (subproceso nuevo, RPC de {args.latencia_ms:.0f} ms, desde el lanzamiento):")
+    runs = [asyncio.run(_arranque_stdio(env)) for _ in range(args.repeticiones)]
+    for marca in ('initialize', 'list_tools', 'primera_herramienta'):
+        medidas[marca] = min(r[marca] for r in runs)
+        print(f"  {marca:<28} {medidas[marca]:>7.0f} ms")
+    servidor.shutdown()
+
+    if args.sin_limites:
+        return 0
+    limites = dict(LIMITES)
+    for limite in args.limite:
+        nombre, _, ms = limite.partition('=')
+        if nombre not in medidas:
+            print(f"Límite desconocido: {nombre} (medidas: {', '.join(medidas)})")
+            return 2
+        limites[nombre] = float(ms)
+    excedidos = [f"{nombre}: {medidas[nombre]:.0f} ms > {ms:.0f} ms" for nombre, ms in limites.items() if medidas[nombre] > ms]
+    if excedidos:
+        print("\nREGRESIÓN: " + "; ".join(excedidos))
+        return 1
+    print("\nDentro de los límites: " + ", ".join(f"{nombre} ≤ {ms:.0f} ms" for nombre, ms in limites.items()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(_args()))
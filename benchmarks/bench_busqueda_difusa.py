@@ -0,0 +1,96 @@
+# benchmarks/bench_busqueda_difusa.py
+#
+# Índice de trigramas (indice_difuso.TrigramIndex) frente a la búsqueda por subcadena que
+# equivale al `ilike` de Odoo (la que hace la réplica local en memoria), sobre catálogos
+# sintéticos de distintos tamaños. Mide, sin red ni Odoo:
+#   - tiempo de construcción del índice y de una actualización incremental,
+#   - latencia media y p95 por consulta de cada método,
+#   - acierto (el producto buscado aparece en el top-5) con consultas exactas, sin tildes,
+#     con erratas típicas de transcripción de voz y genéricas (sin el número que distingue
+#     al producto: vale cualquiera con las mismas palabras).
+#
+# Uso: python benchmarks/bench_busqueda_difusa.py [consultas]
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from indice_difuso import TrigramIndex, normalize
+
+_TIPOS = ['Pintura', 'Esmalte', 'Vinilo', 'Laca', 'Sellador', 'Imprimante', 'Barniz', 'Estuco']
+_ACABADOS = ['Acrílica', 'Sintético', 'Epóxica', 'Poliuretano', 'Anticorrosivo', 'Térmica', 'Látex']
+_COLORES = ['Blanco', 'Marfil', 'Azul Océano', 'Verde Limón', 'Rojo Óxido', 'Gris Perla', 'Café', 'Negro Mate']
+_ENVASES = ['Galón', 'Cuñete', 'Cuarto', 'Octavo', 'Litro']
+
+def _catalogo(n: int, rnd: random.Random) -> list:
+    return [{'id': i, 'name': f"{rnd.choice(_TIPOS)} {rnd.choice(_ACABADOS)} {rnd.choice(_COLORES)} {rnd.choice(_ENVASES)} {i}",
+             'default_code': f"QC-{i:06d}"} for i in range(1, n + 1)]
+
+def _sin_numero(texto: str) -> str:
+    return texto.rsplit(' ', 1)[0]
+
+def _errata(texto: str, rnd: random.Random) -> str:
+    """Quita tildes y altera una letra de dos palabras (como un error de transcripción)."""
+    palabras = normalize(texto).split()
+    for pos in rnd.sample(range(len(palabras) - 1), 2):
+        palabra = palabras[pos]
+        if len(palabra) > 3:
+            k = rnd.randrange(1, len(palabra) - 1)
+            palabras[pos] = palabra[:k] + rnd.choice('aeiourslnt') + palabra[k + 1:]
+    return ' '.join(palabras)
+
+def _ilike(productos: dict, folded: dict, consulta: str, limit: int = 5) -> list:
+    needle = consulta.casefold()
+    return [pid for pid, nombre in folded.items() if needle in nombre][:limit]
+
+def _medir(fn, consultas: list) -> tuple:
+    tiempos = []
+    aciertos = 0
+    for consulta, objetivos in consultas:
+        started = time.perf_counter()
+        resultado = fn(consulta)
+        tiempos.append((time.perf_counter() - started) * 1e6)
+        aciertos += not objetivos.isdisjoint(resultado)
+    tiempos.sort()
+    return statistics.mean(tiempos), tiempos[int(len(tiempos) * 0.95) - 1], aciertos / len(consultas)
+
+def main(n_consultas: int) -> None:
+    rnd = random.Random(42)
+    print(f"{'productos':>9} {'consulta':>9} {'método':>9} {'media µs':>10} {'p95 µs':>9} {'top-5':>6}")
+    for n in (1000, 10000, 50000):
+        productos = {p['id']: p for p in _catalogo(n, rnd)}
+        folded = {pid: p['name'].casefold() for pid, p in productos.items()}
+
+        started = time.perf_counter()
+        indice = TrigramIndex()
+        for p in productos.values():
+            indice.add(p['id'], [p['name'], p['default_code']])
+        construccion = time.perf_counter() - started
+        started = time.perf_counter()
+        indice.add(1, [productos[1]['name'] + ' Edición', productos[1]['default_code']])
+        actualizacion = (time.perf_counter() - started) * 1e6
+        print(f"{n:>9} índice: construcción {construccion:.2f}s, actualización {actualizacion:.0f}µs, {indice.stats()}")
+
+        objetivos = rnd.sample(list(productos), n_consultas)
+        por_base: dict = {}
+        for pid, p in productos.items():
+            por_base.setdefault(_sin_numero(p['name']), set()).add(pid)
+        casos = {
+            'exacta': [(productos[pid]['name'], {pid}) for pid in objetivos],
+            'sin tilde': [(normalize(productos[pid]['name']), {pid}) for pid in objetivos],
+            'errata': [(_errata(productos[pid]['name'], rnd), {pid}) for pid in objetivos],
+            'genérica': [(_errata(_sin_numero(productos[pid]['name']) + ' x', rnd).rsplit(' ', 1)[0],
+                          por_base[_sin_numero(productos[pid]['name'])]) for pid in objetivos],
+        }
+        for caso, consultas in casos.items():
+            for metodo, fn in (('ilike', lambda q: _ilike(productos, folded, q)),
+                               ('trigram', lambda q: [pid for pid, _ in indice.search(q, 5)])):
+                media, p95, acierto = _medir(fn, consultas)
+                print(f"{n:>9} {caso:>9} {metodo:>9} {media:>10.1f} {p95:>9.1f} {acierto:>6.0%}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,184 @@
+# benchmarks/bench_carga_herramientas.py
+#
+# Prueba de carga reproducible de todas las herramientas MCP contra el Odoo falso
+# (benchmarks/odoo_falso.py), sin Odoo real ni red externa. El servidor es el
+# mcp_odoo_server real, conectado en memoria a un ClientSession de MCP (mismo camino
+# que una llamada del agente: validación de argumentos, FastMCP, herramienta, Odoo).
+#
+# Para cada herramienta lanza `peticiones` llamadas con `concurrencia` en vuelo y muestra
+# latencia p50/p95/p99, llamadas por segundo y RPCs a Odoo por llamada (contadas por el
+# Odoo falso). Los argumentos salen de los datos sembrados con una semilla fija, así
+# que dos ejecuciones con los mismos parámetros son comparables. Antes de medir se
+# calientan la sesión Odoo y las réplicas locales (sus RPCs no se cuentan).
+#
+# Uso: python benchmarks/bench_carga_herramientas.py [--concurrencia 8] [--peticiones 200]
+#          [--latencia-ms 20] [--protocolo xmlrpc|jsonrpc] [--sin-replica] [--herramientas a,b]
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from odoo_falso import CLAVE, DB, USUARIO, FakeOdoo, serve
+
+def _args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Carga de las herramientas MCP contra el Odoo falso.")
+    parser.add_argument('--concurrencia', type=int, default=8)
+    parser.add_argument('--peticiones', type=int, default=200, help="Llamadas por herramienta (exportar_productos: 1/20).")
+    parser.add_argument('--latencia-ms', type=float, default=20.0, help="Latencia simulada de cada RPC a Odoo.")
+    parser.add_argument('--protocolo', choices=['xmlrpc', 'jsonrpc'], default='xmlrpc')
+    parser.add_argument('--sin-replica', action='store_true', help="Desactiva las réplicas locales de catálogo y clientes.")
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--productos', type=int, default=5000)
+    parser.add_argument('--herramientas', default='', help="Lista separada por comas (por defecto, todas).")
+    parser.add_argument('--semilla', type=int, default=7)
+    return parser.parse_args()
+
+def _con_errata(rnd: random.Random, texto: str) -> str:
+    """Cambia una letra: búsquedas sin coincidencia exacta (camino de sugerencias difusas)."""
+    i = rnd.randrange(len(texto))
+    return texto[:i] + rnd.choice('aeiourstn') + texto[i + 1:]
+
+class Escenario:
+    """Genera los argumentos de cada herramienta a partir de los datos del Odoo falso."""
+
+    def __init__(self, odoo: FakeOdoo, seed: int):
+        self.odoo = odoo
+        self.rnd = random.Random(seed)
+        self.clientes = [p for p in odoo.partners if p['active'] and p['pricelist']]
+        self.productos = [p for p in odoo.products if p['active'] and p['sale_ok']]
+        self._usados: set = set()  # Borradores ya repartidos (cada uno se confirma una sola vez)
+
+    def _nombre(self, registros: list) -> str:
+        # Como un vendedor: casi siempre parte del nombre, a veces con una errata
+        palabras = self.rnd.choice(registros)['name'].split()
+        consulta = ' '.join(palabras[:self.rnd.randint(1, min(3, len(palabras)))])
+        return _con_errata(self.rnd, consulta) if self.rnd.random() < 0.15 else consulta
+
+    def _lineas(self) -> list:
+        return [{'product_id': p['id'], 'product_uom_qty': self.rnd.randint(1, 3)}
+                for p in self.rnd.sample(self.productos, self.rnd.randint(1, 4))]
+
+    def _borradores(self, n: int) -> list:
+        ids = [i for i in self.odoo.draft_order_ids() if i not in self._usados]
+        elegidos = self.rnd.sample(ids, min(n, len(ids)))
+        self._usados.update(elegidos)
+        return elegidos
+
+    def argumentos(self, herramienta: str) -> dict:
+        if herramienta == 'buscar_cliente':
+            return {'nombre_cliente': self._nombre(self.clientes)}
+        if herramienta == 'buscar_producto':
+            return {'nombre_producto': self._nombre(self.productos)}
+        if herramienta == 'buscar_varios_clientes':
+            return {'nombres_clientes': [self._nombre(self.clientes) for _ in range(self.rnd.randint(2, 6))]}
+        if herramienta == 'buscar_varios_productos':
+            return {'nombres_productos': [self._nombre(self.productos) for _ in range(self.rnd.randint(2, 8))]}
+        if herramienta == 'crear_cotizacion':
+            return {'cliente_id': self.rnd.choice(self.clientes)['id'], 'lineas': self._lineas()}
+        if herramienta == 'crear_cotizaciones':
+            return {'cotizaciones': [{'cliente_id': self.rnd.choice(self.odoo.partners)['id'], 'lineas': self._lineas()}
+                                     for _ in range(self.rnd.randint(3, 10))]}
+        if herramienta == 'confirmar_cotizacion':
+            # Sin borradores libres se confirma uno cualquiera: la herramienta informa del estado
+            ids = self._borradores(1) or [self.rnd.randint(1, len(self.odoo.orders))]
+            return {'cotizacion_id': ids[0]}
+        if herramienta == 'confirmar_cotizaciones':
+            return {'cotizacion_ids': self._borradores(5) + [self.rnd.randint(1, len(self.odoo.orders) + 50)]}
+        if herramienta == 'listar_productos':
+            return {'cursor': self.rnd.choice([0, 0, self.rnd.randint(1, len(self.odoo.products))]), 'limite': 20}
+        if herramienta == 'exportar_productos':
+            return {'tamano_pagina': 500}
+        raise ValueError(f"Herramienta sin escenario: {herramienta}")
+
+    def preparar(self, herramienta: str, peticiones: int) -> None:
+        """Asegura borradores suficientes para las herramientas de confirmación."""
+        necesarios = {'confirmar_cotizacion': peticiones, 'confirmar_cotizaciones': peticiones * 5}.get(herramienta, 0)
+        faltan = necesarios - len([i for i in self.odoo.draft_order_ids() if i not in self._usados])
+        for _ in range(max(0, faltan)):
+            self.odoo.execute_kw(DB, 2, CLAVE, 'sale.order', 'create',
+                                 [{'partner_id': self.rnd.choice(self.clientes)['id'],
+                                   'order_line': [(0, 0, l) for l in self._lineas()]}])
+
+def _percentil(ordenadas: list, p: float) -> float:
+    return ordenadas[min(len(ordenadas) - 1, max(0, round(p / 100 * len(ordenadas)) - 1))]
+
+async def _medir(session, herramienta: str, argumentos: list, concurrencia: int) -> dict:
+    latencias = []
+    errores = 0
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def llamada(args: dict) -> None:
+        nonlocal errores
+        async with semaforo:
+            started = time.perf_counter()
+            result = await session.call_tool(herramienta, args)
+            latencias.append(time.perf_counter() - started)
+            texto = result.content[0].text if result.content else ''
+            if result.isError or texto.startswith('Error'):
+                errores += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(llamada(a) for a in argumentos))
+    total = time.perf_counter() - started
+    ordenadas = sorted(latencias)
+    return {'llamadas': len(latencias), 'errores': errores, 'p50': _percentil(ordenadas, 50) * 1000,
+            'p95': _percentil(ordenadas, 95) * 1000, 'p99': _percentil(ordenadas, 99) * 1000,
+            'rps': len(latencias) / total, 'media': statistics.fmean(ordenadas) * 1000}
+
+async def main(args: argparse.Namespace) -> None:
+    odoo = FakeOdoo(clientes=args.clientes, productos=args.productos, latency=args.latencia_ms / 1000)
+    servidor, url = serve(odoo)
+    os.environ.update({'ODOO_URL': url, 'ODOO_DB': DB, 'ODOO_USER': USUARIO, 'ODOO_PASSWORD': CLAVE,
+                       'ODOO_PROTOCOL': args.protocolo})
+    if args.sin_replica:
+        os.environ.update({'ODOO_CATALOGO_LOCAL': '0', 'ODOO_CLIENTES_LOCAL': '0'})
+    # El servidor lee la configuración al importarse; su log (y el de FastMCP/httpx) se
+    # limita a avisos para no medir el coste del logging ni ensuciar el registro de depuración.
+    import mcp_odoo_server as srv
+    from mcp.shared.memory import create_connected_server_and_client_session
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('mcp_odoo_server').setLevel(logging.WARNING)
+
+    herramientas = [h for h in args.herramientas.split(',') if h] or [t.name for t in await srv.app.list_tools()]
+    escenario = Escenario(odoo, args.semilla)
+    print(f"Odoo falso en {url}: {args.clientes} clientes, {args.productos} productos, RPC de {args.latencia_ms:.0f} ms "
+          f"({args.protocolo}); réplicas locales {'desactivadas' if args.sin_replica else 'activas'}")
+    print(f"{args.peticiones} llamadas por herramienta con concurrencia {args.concurrencia}\n")
+
+    async with create_connected_server_and_client_session(srv.app._mcp_server) as session:
+        # Calentamiento: autenticación, pool de conexiones y carga de las réplicas
+        await session.call_tool('buscar_cliente', {'nombre_cliente': 'calentamiento'})
+        await session.call_tool('buscar_producto', {'nombre_producto': 'calentamiento'})
+        if not args.sin_replica:
+            for _ in range(600):
+                if srv.catalog_mirror.is_fresh() and srv.partner_mirror.is_fresh():
+                    break
+                await asyncio.sleep(0.05)
+
+        print(f"{'herramienta':<24} {'llamadas':>8} {'errores':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'llam./s':>8} {'RPCs/llam.':>10}")
+        for herramienta in herramientas:
+            peticiones = max(1, args.peticiones // 20) if herramienta == 'exportar_productos' else args.peticiones
+            escenario.preparar(herramienta, peticiones)
+            argumentos = [escenario.argumentos(herramienta) for _ in range(peticiones)]
+            odoo.reset_stats()
+            r = await _medir(session, herramienta, argumentos, args.concurrencia)
+            rpcs = odoo.stats()['rpcs']
+            print(f"{herramienta:<24} {r['llamadas']:>8} {r['errores']:>7} {r['p50']:>8.1f} {r['p95']:>8.1f} "
+                  f"{r['p99']:>8.1f} {r['rps']:>8.1f} {rpcs / r['llamadas']:>10.2f}")
+
+        cache = json.loads((await session.read_resource('odoo://cache/estadisticas')).contents[0].text)
+        print(f"\nCaché de lecturas: {cache.get('hits', 0)} aciertos, {cache.get('misses', 0)} fallos; "
+              f"single-flight: {cache.get('single_flight')}")
+    servidor.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main(_args()))
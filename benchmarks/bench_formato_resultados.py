@@ -0,0 +1,51 @@
+# benchmarks/bench_formato_resultados.py
+#
+# Tamaño (caracteres y tokens aproximados) y coste de construcción de los resultados de
+# búsqueda con el formato anterior (texto concatenado línea a línea) frente al JSON compacto
+# por columnas de mcp_odoo_server.resultado(). El tamaño del resultado es lo que el modelo
+# vuelve a leer en cada turno del agente.
+#
+# Tokens aproximados: ~4 caracteres por token (regla habitual de los tokenizadores BPE).
+#
+# Uso: python benchmarks/bench_formato_resultados.py
+
+import json
+import time
+
+CAMPOS_PRODUCTO = ['id', 'name', 'default_code', 'list_price', 'qty_available']
+
+def _productos(n: int) -> list:
+    return [{'id': 1000 + i, 'name': f"Pintura Acrílica Mate Blanco Galón {i}", 'default_code': f"QC-{i:06d}",
+             'list_price': 85000.0 + i, 'qty_available': i % 7} for i in range(n)]
+
+def _prosa(nombre: str, productos: list) -> str:
+    """Formato anterior de buscar_producto."""
+    respuesta = f"Productos encontrados para '{nombre}':\n"
+    for p in productos:
+        respuesta += (f"  - ID: {p['id']}, Nombre: {p['name']}, Código: {p.get('default_code', 'N/A')}, "
+                      f"Precio: {p.get('list_price', 0.0):.2f}, Cant. Disponible: {p.get('qty_available', 0.0)}\n")
+    return respuesta
+
+def _compacto(nombre: str, productos: list) -> str:
+    """Mismo cuerpo que mcp_odoo_server.resultado() + filas() (sin importar el servidor)."""
+    return json.dumps({'resumen': f"{len(productos)} producto(s) para '{nombre}'.", 'columnas': CAMPOS_PRODUCTO,
+                       'filas': [[p.get(c) for c in CAMPOS_PRODUCTO] for p in productos]},
+                      ensure_ascii=False, separators=(',', ':'), default=str)
+
+def _medir(fn, nombre: str, productos: list, repeticiones: int = 2000) -> tuple:
+    texto = fn(nombre, productos)
+    started = time.perf_counter()
+    for _ in range(repeticiones):
+        fn(nombre, productos)
+    return len(texto), (time.perf_counter() - started) / repeticiones * 1e6
+
+def main() -> None:
+    print(f"{'filas':>6} {'formato':>9} {'caracteres':>11} {'~tokens':>8} {'µs':>8}")
+    for n in (5, 50, 250):
+        productos = _productos(n)
+        for formato, fn in (('prosa', _prosa), ('compacto', _compacto)):
+            caracteres, micros = _medir(fn, 'pintura blanca', productos)
+            print(f"{n:>6} {formato:>9} {caracteres:>11} {caracteres // 4:>8} {micros:>8.1f}")
+
+if __name__ == "__main__":
+    main()
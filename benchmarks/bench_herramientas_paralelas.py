@@ -0,0 +1,92 @@
+# benchmarks/bench_herramientas_paralelas.py
+#
+# Un paso del agente con varias llamadas a herramientas independientes (un buscar_cliente,
+# varios buscar_producto y dos escrituras), contra el servidor MCP por stdio y el Odoo falso:
+#   - secuencial: una llamada detrás de otra (lo que costaría un despacho en serie),
+#   - paralelo:   todas a la vez, como las lanza el SDK; SupervisedMCPServerStdio deja correr
+#                 las lecturas en paralelo (máx. --paralelas) y serializa las escrituras.
+# Muestra la mediana del tiempo del paso y de la llamada más lenta (medida en serie, sin esperas),
+# y comprueba que las escrituras terminan en el orden en que se pidieron.
+# Por defecto sin réplicas locales, para que cada lectura sea un RPC a Odoo.
+#
+# Uso: python benchmarks/bench_herramientas_paralelas.py [--pasos 10] [--latencia-ms 80]
+#          [--productos-por-paso 5] [--paralelas 4] [--con-replica]
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bench_carga_herramientas import Escenario
+from odoo_falso import CLAVE, DB, USUARIO, FakeOdoo, serve
+from agente_quindicolor_openai import odoo_server_params_dict
+from conexion_mcp import READ_ONLY_TOOLS, SupervisedMCPServerStdio
+
+def _args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Llamadas a herramientas de un mismo paso: en serie frente a en paralelo.")
+    parser.add_argument('--pasos', type=int, default=10)
+    parser.add_argument('--latencia-ms', type=float, default=80.0, help="Latencia simulada de cada RPC a Odoo.")
+    parser.add_argument('--productos-por-paso', type=int, default=5)
+    parser.add_argument('--paralelas', type=int, default=4, help="Lecturas simultáneas (AGENTE_HERRAMIENTAS_PARALELAS).")
+    parser.add_argument('--con-replica', action='store_true', help="Búsquedas servidas por las réplicas locales.")
+    return parser.parse_args()
+
+def _paso(escenario: Escenario, productos: int) -> list:
+    """Lo que el modelo pediría de una vez: cliente, productos y dos escrituras sobre Odoo."""
+    llamadas = [('buscar_cliente', escenario.argumentos('buscar_cliente'))]
+    llamadas += [('buscar_producto', escenario.argumentos('buscar_producto')) for _ in range(productos)]
+    llamadas += [('crear_cotizacion', escenario.argumentos('crear_cotizacion')),
+                 ('confirmar_cotizacion', escenario.argumentos('confirmar_cotizacion'))]
+    return llamadas
+
+async def _llamada(server, nombre: str, argumentos: dict, fines: list) -> float:
+    started = time.perf_counter()
+    await server.call_tool(nombre, argumentos)
+    fines.append(nombre)
+    return time.perf_counter() - started
+
+async def main(args: argparse.Namespace) -> None:
+    odoo = FakeOdoo(latency=args.latencia_ms / 1000)
+    servidor, url = serve(odoo)
+    env = {**os.environ, 'ODOO_URL': url, 'ODOO_DB': DB, 'ODOO_USER': USUARIO, 'ODOO_PASSWORD': CLAVE,
+           'MCP_LOG_NIVEL': 'INFO', 'MCP_LOG_ARCHIVO': os.path.join(tempfile.gettempdir(), 'bench_herramientas_paralelas.log')}
+    if not args.con_replica:
+        env.update({'ODOO_CATALOGO_LOCAL': '0', 'ODOO_CLIENTES_LOCAL': '0'})
+    escenario = Escenario(odoo, seed=11)
+    escenario.preparar('confirmar_cotizacion', args.pasos * 2)
+    server = SupervisedMCPServerStdio(params={**odoo_server_params_dict, 'env': env}, max_parallel_reads=args.paralelas)
+    await server.ensure_connected()
+    await server.call_tool('buscar_cliente', {'nombre_cliente': 'calentamiento'})  # Autenticación y pool
+
+    print(f"Paso: 1 buscar_cliente + {args.productos_por_paso} buscar_producto + crear_cotizacion + confirmar_cotizacion; "
+          f"RPC de {args.latencia_ms:.0f} ms, {args.paralelas} lecturas simultáneas, "
+          f"réplicas {'activas' if args.con_replica else 'desactivadas'}\n")
+    resultados = {'secuencial': [], 'paralelo': []}
+    maximo, desordenados = [], 0
+    for _ in range(args.pasos):
+        for modo in ('secuencial', 'paralelo'):
+            llamadas = _paso(escenario, args.productos_por_paso)
+            fines: list = []
+            started = time.perf_counter()
+            if modo == 'secuencial':
+                maximo.append(max([await _llamada(server, n, a, fines) for n, a in llamadas]))
+            else:
+                await asyncio.gather(*(_llamada(server, n, a, fines) for n, a in llamadas))
+                escrituras = [n for n, _ in llamadas if n not in READ_ONLY_TOOLS]
+                desordenados += [n for n in fines if n not in READ_ONLY_TOOLS] != escrituras
+            resultados[modo].append(time.perf_counter() - started)
+
+    for modo, tiempos in resultados.items():
+        print(f"{modo:<11} paso p50 = {statistics.median(tiempos) * 1000:7.1f} ms")
+    print(f"{'':<11} llamada más lenta p50 = {statistics.median(maximo) * 1000:7.1f} ms")
+    print(f"Escrituras fuera de orden: {desordenados} de {args.pasos} pasos")
+    await server.shutdown()
+    servidor.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main(_args()))
@@ -0,0 +1,102 @@
+# benchmarks/bench_historial_agente.py
+#
+# Tamaño del historial que se envía al modelo en cada turno de una sesión sintética de 50
+# turnos (búsquedas, listados y cotizaciones con salidas de herramientas realistas), sin
+# OpenAI ni Odoo. Compara:
+#   - texto:      solo mensajes usuario/asistente (los IDs de las herramientas se pierden),
+#   - completo:   todo lo que produce Runner (`to_input_list`) acumulado turno a turno,
+#   - gestionado: HistoryManager.compact del historial completo (notas de IDs + salidas
+#                 recientes recortadas + presupuesto), que es lo que envía el agente.
+#
+# Tokens aproximados: ~4 caracteres por token.
+#
+# Uso: python benchmarks/bench_historial_agente.py [turnos]
+
+import json
+import logging
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+logging.disable(logging.CRITICAL)
+
+from agente_quindicolor_openai import HistoryManager
+
+_PRODUCTOS = [f"Pintura Acrílica Mate Blanco Galón {i}" for i in range(1, 400)]
+
+def _salida_mcp(payload: dict) -> str:
+    """Salida de herramienta tal como la entrega el SDK (contenido MCP serializado)."""
+    texto = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+    return json.dumps({'type': 'text', 'text': texto, 'annotations': None}, ensure_ascii=False)
+
+def _filas_productos(ids: list) -> list:
+    return [[pid, _PRODUCTOS[pid - 1], f"QC-{pid:06d}", 85000.0 + pid, pid % 7] for pid in ids]
+
+def _turno(n: int, rnd: random.Random) -> tuple:
+    """(mensaje del usuario, [(herramienta, argumentos, payload)], respuesta del asistente)."""
+    tipo = n % 5
+    if tipo == 0:
+        cid = rnd.randint(1, 500)
+        llamadas = [('buscar_cliente', {'nombre_cliente': f"Cliente {cid}"},
+                     {'resumen': "1 cliente(s).", 'columnas': ['id', 'name', 'email', 'phone'],
+                      'filas': [[cid, f"Ferretería Cliente {cid}", f"c{cid}@x.co", "3001234567"]]})]
+        return f"Busca al cliente {cid}", llamadas, f"El cliente Ferretería Cliente {cid} tiene el ID {cid}."
+    if tipo == 1:
+        ids = rnd.sample(range(1, 400), 15)
+        llamadas = [('buscar_varios_productos', {'nombres_productos': [f"pintura {i}" for i in ids[:3]]},
+                     {'resumen': "3 de 3 nombre(s).", 'columnas': ['id', 'name', 'default_code', 'list_price', 'qty_available'],
+                      'resultados': [{'nombre': f"pintura {i}", 'filas': _filas_productos(ids[k * 5:k * 5 + 5])}
+                                     for k, i in enumerate(ids[:3])]})]
+        return "Necesito tres pinturas", llamadas, "Encontré estas opciones: ..." + " bla" * 30
+    if tipo == 2:
+        ids = list(range(n, n + 100))
+        llamadas = [('listar_productos', {'cursor': n, 'limite': 100},
+                     {'resumen': "100 producto(s).", 'columnas': ['id', 'name', 'default_code', 'list_price'],
+                      'filas': [f[:4] for f in _filas_productos([i % 399 + 1 for i in ids])], 'siguiente_cursor': n + 100})]
+        return "Muéstrame el catálogo", llamadas, "Aquí tienes 100 productos del catálogo." + " bla" * 40
+    if tipo == 3:
+        cot = 1000 + n
+        llamadas = [('crear_cotizacion', {'cliente_id': 7, 'lineas': [{'product_id': 40, 'product_uom_qty': 2}]},
+                     {'resumen': f"Cotización creada con ID {cot}.", 'cotizacion_id': cot})]
+        return "Crea la cotización", llamadas, f"Cotización {cot} creada."
+    cot = 1000 + n - 1
+    llamadas = [('confirmar_cotizacion', {'cotizacion_id': cot},
+                 {'resumen': f"Cotización {cot} confirmada.", 'cotizacion_id': cot, 'state': 'sale'})]
+    return "Confírmala", llamadas, f"La cotización {cot} quedó confirmada."
+
+def _items_turno(n: int, llamadas: list) -> list:
+    items = []
+    for k, (herramienta, argumentos, payload) in enumerate(llamadas):
+        call_id = f"call_{n}_{k}"
+        items.append({'type': 'function_call', 'call_id': call_id, 'name': herramienta,
+                      'arguments': json.dumps(argumentos, ensure_ascii=False), 'id': f"fc_{n}_{k}", 'status': 'completed'})
+        items.append({'type': 'function_call_output', 'call_id': call_id, 'output': _salida_mcp(payload)})
+    return items
+
+def main(turnos: int) -> None:
+    rnd = random.Random(7)
+    gestor = HistoryManager()
+    historiales = {'texto': [], 'completo': []}
+    maximos = dict.fromkeys(['texto', 'completo', 'gestionado'], 0)
+    print(f"{'turno':>5} {'texto':>8} {'completo':>9} {'gestionado':>11}  (tokens enviados al modelo en el turno)")
+    for n in range(1, turnos + 1):
+        usuario, llamadas, respuesta = _turno(n, rnd)
+        mensaje = {'role': 'user', 'content': usuario}
+        # Lo que recibe Runner.run en este turno (el modelo lo relee en cada llamada a herramienta)
+        enviado = {nombre: gestor.estimate_tokens(h + [mensaje]) for nombre, h in historiales.items()}
+        enviado['gestionado'] = gestor.estimate_tokens(gestor.compact(historiales['completo']) + [mensaje])
+        for nombre in maximos:
+            maximos[nombre] = max(maximos[nombre], enviado[nombre])
+        if n in (1, 2, 5) or n % 10 == 0:
+            print(f"{n:>5} {enviado['texto']:>8} {enviado['completo']:>9} {enviado['gestionado']:>11}")
+        asistente = {'role': 'assistant', 'content': respuesta}
+        items = _items_turno(n, llamadas)
+        historiales['texto'] = historiales['texto'] + [mensaje, asistente]
+        historiales['completo'] = historiales['completo'] + [mensaje] + items + [asistente]
+    print(f"{'máx':>5} {maximos['texto']:>8} {maximos['completo']:>9} {maximos['gestionado']:>11}")
+    notas = gestor.read_notes(gestor.compact(historiales['completo']))
+    print(f"Notas de IDs conservadas por el gestor: { {tipo: len(v) for tipo, v in notas.items()} }")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
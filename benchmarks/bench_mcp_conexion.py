@@ -0,0 +1,77 @@
+# benchmarks/bench_mcp_conexion.py
+#
+# Compara la latencia por turno de:
+#   A) lanzar un subproceso MCP nuevo en cada turno (`async with MCPServerStdio`), y
+#   B) reutilizar el servidor persistente (`SupervisedMCPServerStdio`).
+#
+# Cada "turno" hace lo mismo que el Runner del agente: list_tools + una llamada a
+# herramienta. Se usa `buscar_cliente('')`, que responde sin tocar Odoo, para medir
+# solo el coste de proceso/handshake MCP.
+#
+# Uso: python benchmarks/bench_mcp_conexion.py [turnos]
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.mcp import MCPServerStdio
+from agente_quindicolor_openai import odoo_server_params_dict
+from conexion_mcp import SupervisedMCPServerStdio
+
+def _params() -> dict:
+    # El servidor exige las variables Odoo aunque la herramienta medida no las use
+    env = dict(os.environ)
+    for var, default in (('ODOO_URL', 'http://127.0.0.1:9'), ('ODOO_DB', 'bench'),
+                         ('ODOO_USER', 'bench'), ('ODOO_PASSWORD', 'bench')):
+        env.setdefault(var, default)
+    return {**odoo_server_params_dict, 'env': env}
+
+async def _turn(server) -> None:
+    await server.list_tools()
+    await server.call_tool('buscar_cliente', {'nombre_cliente': ''})
+
+async def bench_por_turno(turns: int) -> list:
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        async with MCPServerStdio(params=_params()) as server:
+            await _turn(server)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+async def bench_persistente(turns: int) -> tuple:
+    server = SupervisedMCPServerStdio(params=_params())
+    started = time.perf_counter()
+    await server.ensure_connected()
+    arranque = time.perf_counter() - started
+    samples = []
+    try:
+        for _ in range(turns):
+            started = time.perf_counter()
+            await server.ensure_connected()
+            await _turn(server)
+            samples.append(time.perf_counter() - started)
+    finally:
+        await server.shutdown()
+    return arranque, samples
+
+def _resumen(nombre: str, samples: list) -> str:
+    ms = [s * 1000 for s in samples]
+    return f"{nombre:<28} media={statistics.mean(ms):8.2f} ms  p50={statistics.median(ms):8.2f} ms  max={max(ms):8.2f} ms"
+
+async def main(turns: int) -> None:
+    por_turno = await bench_por_turno(turns)
+    arranque, persistente = await bench_persistente(turns)
+    print(f"Turnos medidos: {turns}")
+    print(_resumen("Subproceso por turno", por_turno))
+    print(_resumen("Servidor persistente", persistente))
+    print(f"{'Arranque único persistente':<28} {arranque * 1000:8.2f} ms")
+    ahorro = statistics.mean(por_turno) - statistics.mean(persistente)
+    print(f"Ahorro medio por turno: {ahorro * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,55 @@
+# benchmarks/bench_protocolo_rpc.py
+#
+# Micro-benchmark XML-RPC vs JSON-RPC para resultados grandes de `search_read`.
+# Para cada tamaño de resultado mide, sin red ni Odoo:
+#   - codificación de la petición (cliente),
+#   - codificación de la respuesta (lo que haría el servidor Odoo),
+#   - decodificación de la respuesta (cliente, con el mismo código que usa AsyncOdooSession),
+#   - bytes en el cable de la respuesta.
+#
+# Uso: python benchmarks/bench_protocolo_rpc.py [repeticiones]
+
+import json
+import os
+import sys
+import time
+import xmlrpc.client
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from odoo_rpc import XmlRpcProtocol, JsonRpcProtocol
+
+def _filas(n: int) -> list:
+    """Filas con la forma de product.product.search_read en buscar_producto/listar_productos."""
+    return [{'id': i, 'name': f"Pintura Vinilo Tipo {i % 3 + 1} Blanco Galón {i}",
+             'default_code': f"PV-{i:06d}", 'list_price': round(15000 + i * 1.37, 2),
+             'qty_available': float(i % 40), 'sale_ok': True} for i in range(1, n + 1)]
+
+def _respuesta(protocol, filas: list) -> bytes:
+    if isinstance(protocol, XmlRpcProtocol):
+        return xmlrpc.client.dumps((filas,), methodresponse=True, allow_none=True).encode('utf-8')
+    return json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': filas}).encode('utf-8')
+
+def _medir(fn, repeticiones: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - started) / repeticiones * 1000
+
+def main(repeticiones: int) -> None:
+    params = ('db', 2, 'clave', 'product.product', 'search_read', [[['sale_ok', '=', True]]],
+              {'fields': ['id', 'name', 'default_code', 'list_price', 'qty_available'], 'limit': 0})
+    print(f"{'filas':>7} {'protocolo':>9} {'enc. pet. ms':>13} {'enc. resp. ms':>14} {'dec. resp. ms':>14} {'bytes resp.':>12}")
+    for n in (20, 500, 5000, 20000):
+        filas = _filas(n)
+        for protocol in (XmlRpcProtocol(), JsonRpcProtocol()):
+            cuerpo = _respuesta(protocol, filas)
+            reps = max(1, repeticiones * 20 // n)
+            enc_pet = _medir(lambda: protocol.encode('object', 'execute_kw', params), reps)
+            enc_resp = _medir(lambda: _respuesta(protocol, filas), reps)
+            dec_resp = _medir(lambda: protocol.decode(cuerpo), reps)
+            assert protocol.decode(cuerpo) == filas
+            print(f"{n:>7} {protocol.name:>9} {enc_pet:>13.3f} {enc_resp:>14.3f} {dec_resp:>14.3f} {len(cuerpo):>12,}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,73 @@
+# benchmarks/bench_registro.py
+#
+# Coste del logging en el camino de una herramienta MCP (lo que espera la petición), sin Odoo:
+# cada "llamada" registra lo mismo que crear_cotizacion (un INFO y dos DEBUG con el dominio y
+# los valores de la cotización). Compara:
+#   - síncrono:  FileHandler + f-strings (configuración anterior),
+#   - cola:      registro.start_queue_logging con formateo diferido (%-style), DEBUG activo,
+#   - muestreo:  igual, con MCP_LOG_MUESTREO_DEBUG=0.1,
+#   - INFO:      igual, con MCP_LOG_NIVEL=INFO (los DEBUG ni siquiera crean el registro).
+# Mide microsegundos por llamada en el hilo que registra; el archivo va a un directorio temporal.
+#
+# Uso: python benchmarks/bench_registro.py [llamadas]
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from registro import rotating_file_handler, start_queue_logging, stop_queue_logging
+
+_FORMATO = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+_VALORES = {'partner_id': 57, 'order_line': [(0, 0, {'product_id': 1000 + i, 'product_uom_qty': i % 4 + 1}) for i in range(12)]}
+_DOMINIO = [['id', 'in', list(range(1000, 1012))]]
+
+def _llamada_fstring(logger: logging.Logger) -> None:
+    logger.info(f"Ejecutando herramienta 'crear_cotizacion' para cliente ID: {57}")
+    logger.debug(f"Odoo Call: model='product.product', method='search_read', domain={_DOMINIO} (validación)")
+    logger.debug(f"Odoo Call: model='sale.order', method='create', values={_VALORES}")
+
+def _llamada_diferida(logger: logging.Logger) -> None:
+    logger.info("Ejecutando herramienta 'crear_cotizacion' para cliente ID: %s", 57)
+    logger.debug("Odoo Call: model='product.product', method='search_read', domain=%s (validación)", _DOMINIO)
+    logger.debug("Odoo Call: model='sale.order', method='create', values=%s", _VALORES)
+
+def _medir(nombre: str, llamada, logger: logging.Logger, llamadas: int) -> float:
+    started = time.perf_counter()
+    for _ in range(llamadas):
+        llamada(logger)
+    return (time.perf_counter() - started) / llamadas * 1e6
+
+def main(llamadas: int) -> None:
+    directorio = tempfile.mkdtemp(prefix='bench_registro_')
+    print(f"{llamadas} llamadas (1 INFO + 2 DEBUG), log en {directorio}")
+    print(f"{'modo':>10} {'µs/llamada':>11} {'vaciado ms':>11}")
+
+    logger = logging.getLogger('bench.sincrono')
+    logger.propagate = False
+    handler = logging.FileHandler(os.path.join(directorio, 'sincrono.log'), encoding='utf-8')
+    handler.setFormatter(_FORMATO)
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    print(f"{'síncrono':>10} {_medir('síncrono', _llamada_fstring, logger, llamadas):>11.1f} {'-':>11}")
+    handler.close()
+
+    for modo, nivel, muestreo in (('cola', 'DEBUG', 1.0), ('muestreo', 'DEBUG', 0.1), ('INFO', 'INFO', 1.0)):
+        logger = logging.getLogger(f'bench.{modo}')
+        logger.propagate = False
+        handler = rotating_file_handler(os.path.join(directorio, f'{modo}.log'))
+        handler.setFormatter(_FORMATO)
+        handler.setLevel(nivel)
+        listener = start_queue_logging(logger, [handler], debug_sample_rate=muestreo)
+        coste = _medir(modo, _llamada_diferida, logger, llamadas)
+        started = time.perf_counter()
+        stop_queue_logging(listener)  # Espera a que el hilo escritor vacíe la cola
+        vaciado = (time.perf_counter() - started) * 1000
+        handler.close()
+        print(f"{modo:>10} {coste:>11.1f} {vaciado:>11.1f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,67 @@
+# benchmarks/bench_single_flight.py
+#
+# RPCs ahorrados por odoo_cache.SingleFlight con varios vendedores consultando a la vez
+# productos y clientes populares (popularidad tipo Zipf), sin Odoo: cada "RPC" es una
+# espera con la latencia indicada. Compara el número de RPCs y la latencia media con y
+# sin agrupación; las escrituras (create) nunca se agrupan.
+#
+# Uso: python benchmarks/bench_single_flight.py [usuarios] [latencia_ms]
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from odoo_cache import OdooReadCache, SingleFlight
+
+_CONSULTAS_POR_USUARIO = 40
+
+async def _simular(usuarios: int, latencia: float, agrupar: bool) -> dict:
+    rnd = random.Random(1)
+    flights = SingleFlight()
+    rpcs = 0
+    tiempos = []
+
+    async def rpc(model: str, method: str, args: list) -> list:
+        nonlocal rpcs
+        rpcs += 1
+        await asyncio.sleep(latencia * rnd.uniform(0.8, 1.2))
+        return [{'id': 1, 'name': str(args)}]
+
+    async def vendedor() -> None:
+        for _ in range(_CONSULTAS_POR_USUARIO):
+            if rnd.random() < 0.05:
+                model, method, args = 'sale.order', 'create', [{'partner_id': 7}]
+            else:
+                model = rnd.choice(['product.product', 'res.partner'])
+                popular = min(int(rnd.paretovariate(1.2)), 50)  # Pocos nombres concentran las consultas
+                model, method, args = model, 'search_read', [[['name', 'ilike', f"item {popular}"]]]
+            started = time.perf_counter()
+            if agrupar:
+                key = OdooReadCache.make_key(model, method, args, {'limit': 5})
+                await flights.do(key, model, method, lambda: rpc(model, method, args))
+            else:
+                await rpc(model, method, args)
+            tiempos.append(time.perf_counter() - started)
+            await asyncio.sleep(rnd.uniform(0, latencia))  # El agente piensa entre llamadas
+
+    await asyncio.gather(*(vendedor() for _ in range(usuarios)))
+    return {'rpcs': rpcs, 'latencia_ms': statistics.mean(tiempos) * 1000, 'stats': flights.stats()}
+
+async def main(usuarios: int, latencia_ms: float) -> None:
+    latencia = latencia_ms / 1000
+    total = usuarios * _CONSULTAS_POR_USUARIO
+    print(f"{usuarios} usuarios x {_CONSULTAS_POR_USUARIO} consultas, RPC de {latencia_ms:.0f} ms")
+    sin = await _simular(usuarios, latencia, agrupar=False)
+    con = await _simular(usuarios, latencia, agrupar=True)
+    print(f"{'modo':>14} {'llamadas':>9} {'RPCs':>6} {'media ms':>9}")
+    print(f"{'sin agrupar':>14} {total:>9} {sin['rpcs']:>6} {sin['latencia_ms']:>9.1f}")
+    print(f"{'single-flight':>14} {total:>9} {con['rpcs']:>6} {con['latencia_ms']:>9.1f}")
+    print(f"Contadores: {con['stats']}")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 30, float(sys.argv[2]) if len(sys.argv) > 2 else 150))
@@ -0,0 +1,72 @@
+# benchmarks/bench_tts_pipeline.py
+#
+# Latencia de la voz en un turno del agente, sin red: el texto llega por deltas a la
+# velocidad típica de un modelo y el TTS es sintesis_voz.StubTTSClient (latencia fija +
+# proporcional al texto, como un servicio remoto). Compara:
+#   - completo: esperar la respuesta entera y sintetizarla de una vez (comportamiento anterior),
+#   - frases:   SpeechPipeline, frase a frase mientras llega el texto, con N peticiones en paralelo.
+# Mide el tiempo hasta el primer audio (lo que el usuario espera en silencio) y hasta el último.
+#
+# Uso: python benchmarks/bench_tts_pipeline.py [tokens_por_segundo]
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sintesis_voz import SpeechPipeline, StubTTSClient, merge_streams
+
+_RESPUESTA = (
+    "Listo, encontré al cliente Ferretería El Tornillo con el ID 57. "
+    "Para la cotización tengo tres productos disponibles: Pintura Acrílica Mate Blanco Galón a 85.000 pesos, "
+    "Esmalte Sintético Rojo Óxido Cuarto a 32.500 pesos y Sellador Térmico Gris Perla Cuñete a 410.000 pesos. "
+    "Del esmalte solo quedan dos unidades en bodega, así que te sugiero confirmar la cantidad antes de continuar. "
+    "¿Quieres que cree la cotización con dos galones de pintura, dos cuartos de esmalte y un cuñete de sellador? "
+    "Si me confirmas, la dejo en borrador para que la revises."
+)
+_PRIMER_TOKEN = 0.8  # Segundos hasta el primer delta (herramientas + primer token del modelo)
+
+async def _deltas(tokens_por_segundo: float):
+    await asyncio.sleep(_PRIMER_TOKEN)
+    palabras = _RESPUESTA.split(' ')
+    for i, palabra in enumerate(palabras):
+        yield palabra + (' ' if i < len(palabras) - 1 else '')
+        await asyncio.sleep(1.0 / tokens_por_segundo * 1.3)  # ~1,3 tokens por palabra
+
+async def _completo(tokens_por_segundo: float) -> tuple:
+    started = time.perf_counter()
+    texto = ''.join([d async for d in _deltas(tokens_por_segundo)])
+    await StubTTSClient().synthesize(texto)
+    total = time.perf_counter() - started
+    return total, total, 1
+
+async def _frases(tokens_por_segundo: float, paralelo: int) -> tuple:
+    started = time.perf_counter()
+    pipeline = SpeechPipeline(StubTTSClient(), max_parallel=paralelo)
+
+    async def agente():
+        async for delta in _deltas(tokens_por_segundo):
+            pipeline.feed(delta)
+            yield delta
+        pipeline.finish()
+
+    primero = ultimo = None
+    async for fuente, _ in merge_streams(agente(), pipeline.audio_chunks()):
+        if fuente == 1:
+            ultimo = time.perf_counter() - started
+            primero = primero if primero is not None else ultimo
+    return primero, ultimo, pipeline.sentences
+
+async def main(tokens_por_segundo: float) -> None:
+    print(f"Respuesta de {len(_RESPUESTA)} caracteres a {tokens_por_segundo:.0f} tokens/s, primer token a {_PRIMER_TOKEN}s")
+    print(f"{'modo':>12} {'primer audio s':>15} {'último audio s':>15} {'peticiones':>11}")
+    primero, ultimo, n = await _completo(tokens_por_segundo)
+    print(f"{'completo':>12} {primero:>15.2f} {ultimo:>15.2f} {n:>11}")
+    for paralelo in (1, 3):
+        primero, ultimo, n = await _frases(tokens_por_segundo, paralelo)
+        print(f"{f'frases x{paralelo}':>12} {primero:>15.2f} {ultimo:>15.2f} {n:>11}")
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 60))
@@ -0,0 +1,356 @@
+# benchmarks/odoo_falso.py
+#
+# Odoo falso para benchmarks y pruebas locales, sin base de datos ni red externa.
+# Habla XML-RPC ('/xmlrpc/2/common', '/xmlrpc/2/object') y JSON-RPC ('/jsonrpc') con
+# los métodos que usan mcp_odoo_server y las réplicas locales:
+#   - common: version, authenticate
+#   - object: execute_kw con search_read, read, search, search_count, create,
+#             action_confirm, check_access_rights y fields_get
+# sobre `res.partner`, `product.product`, `product.template` (una por producto;
+# `FakeOdoo.edit_template` simula editar nombre o precio desde la ficha), `stock.quant` (un quant
+# por producto almacenable; `FakeOdoo.move_stock` simula entradas y salidas) y `sale.order` generados con una semilla fija
+# (mismos datos en cada ejecución). Cada petición espera la latencia configurada
+# (más un jitter) para simular un Odoo remoto, y se cuentan las llamadas por
+# modelo.método para calcular RPCs por herramienta (método 'stats' o FakeOdoo.stats()).
+#
+# Uso: python benchmarks/odoo_falso.py [--puerto 8069] [--latencia-ms 20] [--clientes 2000] [--productos 5000]
+#      (credenciales: base 'bench', usuario 'bench', clave 'bench')
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import xmlrpc.client
+from collections import Counter
+from datetime import datetime, timedelta
+from socketserver import ThreadingMixIn
+from typing import Any, Dict, List, Optional, Tuple
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+DB = 'bench'
+USUARIO = 'bench'
+CLAVE = 'bench'
+UID = 2
+
+_NOMBRES = ['Ferretería', 'Pinturas', 'Depósito', 'Distribuidora', 'Almacén', 'Construcciones', 'Acabados', 'Color']
+_APELLIDOS = ['El Tornillo', 'La Esquina', 'Del Valle', 'San José', 'Quindío', 'Armenia', 'Los Andes', 'El Progreso',
+              'Santa Fe', 'La Montaña', 'El Roble', 'Central', 'Del Café', 'La Palma', 'Norte', 'Sur']
+_TIPOS = ['Pintura Acrílica', 'Vinilo', 'Esmalte Sintético', 'Anticorrosivo', 'Sellador', 'Laca', 'Impermeabilizante',
+          'Estuco', 'Barniz', 'Thinner']
+_ACABADOS = ['Mate', 'Satinado', 'Brillante', 'Semimate']
+_COLORES = ['Blanco', 'Negro', 'Rojo Óxido', 'Gris Perla', 'Azul Cielo', 'Verde Bosque', 'Amarillo', 'Marfil', 'Terracota']
+_PRESENTACIONES = [('Cuarto', 0.3), ('Galón', 1.0), ('Cuñete', 4.5)]
+
+_FECHA_BASE = datetime(2025, 1, 1)
+
+def _fecha(segundos: int) -> str:
+    """write_date distinta por registro: la sincronización incremental solo trae lo nuevo."""
+    return (_FECHA_BASE + timedelta(seconds=segundos)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class FakeOdoo:
+    """
+    Datos y lógica del Odoo falso (independiente del transporte).
+
+    - `clientes` partners (uno de cada 50 archivado, uno de cada 97 sin tarifa: crear una
+      cotización para él falla como en Odoo real), `productos` productos (uno de cada 20 no
+      vendible, uno de cada 40 archivado, algunos servicios y consumibles sin stock) y
+      `cotizaciones` pedidos iniciales.
+    - `latency` segundos por petición (+/- `jitter` relativo), incluida la autenticación.
+    - Los dominios se evalúan en notación polaca como Odoo ('|', '&', '!'); `active_test`
+      oculta los archivados salvo que el contexto lo desactive o el dominio filtre por 'active'.
+    """
+
+    def __init__(self, clientes: int = 2000, productos: int = 5000, cotizaciones: int = 200,
+                 latency: float = 0.0, jitter: float = 0.2, seed: int = 42):
+        self.latency = latency
+        self.jitter = jitter
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._calls: Counter = Counter()
+        self.partners = self._seed_partners(clientes)
+        self.products = self._seed_products(productos)
+        # Una plantilla por producto: nombre y precio se editan en ella sin tocar el write_date de la variante
+        self.templates = [{'id': p['id'], 'name': p['name'], 'list_price': p['list_price'], 'active': p['active'],
+                           'write_date': p['write_date']} for p in self.products]
+        self.quants = [{'id': p['id'], 'product_id': [p['id'], p['name']], 'quantity': p['qty_available'],
+                        'write_date': p['write_date']} for p in self.products if p['type'] == 'product']
+        self.orders: Dict[int, Dict[str, Any]] = {}
+        facturables = [p for p in self.partners if p['active'] and p['pricelist']]
+        for _ in range(cotizaciones):
+            partner = self._rnd.choice(facturables)
+            lines = [(0, 0, {'product_id': self._rnd.choice(self.products)['id'], 'product_uom_qty': self._rnd.randint(1, 5)})
+                     for _ in range(self._rnd.randint(1, 4))]
+            self._create_order({'partner_id': partner['id'], 'order_line': lines},
+                               state=self._rnd.choice(['draft', 'draft', 'sent', 'sale', 'cancel']))
+
+    # -- Datos --
+    def _seed_partners(self, n: int) -> List[Dict[str, Any]]:
+        rows = []
+        for i in range(1, n + 1):
+            name = f"{self._rnd.choice(_NOMBRES)} {self._rnd.choice(_APELLIDOS)} {i}"
+            rows.append({'id': i, 'name': name, 'email': f"cliente{i}@ejemplo.co" if i % 7 else False,
+                         'phone': f"+57 3{self._rnd.randint(100000000, 199999999)}" if i % 5 else False,
+                         'active': i % 50 != 0, 'pricelist': i % 97 != 0, 'write_date': _fecha(i)})
+        return rows
+
+    def _seed_products(self, n: int) -> List[Dict[str, Any]]:
+        rows = []
+        for i in range(1, n + 1):
+            tipo = self._rnd.choice(_TIPOS)
+            presentacion, factor = self._rnd.choice(_PRESENTACIONES)
+            name = f"{tipo} {self._rnd.choice(_ACABADOS)} {self._rnd.choice(_COLORES)} {presentacion}"
+            rows.append({'id': i, 'name': name, 'default_code': f"{tipo[:2].upper()}-{i:05d}",
+                         'list_price': round(self._rnd.uniform(18000, 95000) * factor, -2),
+                         'qty_available': float(self._rnd.choice([0, 0, 2, 5, 12, 40, 120])),
+                         'sale_ok': i % 20 != 0, 'active': i % 40 != 0,
+                         'type': 'service' if i % 250 == 0 else 'consu' if i % 125 == 0 else 'product',
+                         'product_tmpl_id': [i, name],
+                         'write_date': _fecha(i)})
+            if rows[-1]['type'] == 'consu':
+                rows[-1]['qty_available'] = 0.0  # Sin stock controlado, como en Odoo
+        return rows
+
+    def _table(self, model: str) -> List[Dict[str, Any]]:
+        if model == 'res.partner':
+            return self.partners
+        if model == 'product.product':
+            return self.products
+        if model == 'sale.order':
+            return list(self.orders.values())
+        if model == 'stock.quant':
+            return self.quants
+        if model == 'product.template':
+            return self.templates
+        raise xmlrpc.client.Fault(2, f"Object {model} doesn't exist")
+
+    def _create_order(self, vals: Dict[str, Any], state: str = 'draft') -> int:
+        partner = next((p for p in self.partners if p['id'] == vals.get('partner_id')), None)
+        if partner is None:
+            raise xmlrpc.client.Fault(2, f"Record does not exist or has been deleted. (Record: res.partner({vals.get('partner_id')},))")
+        if not partner['pricelist']:
+            raise xmlrpc.client.Fault(2, "Not possible to determine the pricelist for this customer.")
+        order_id = len(self.orders) + 1
+        lines = [cmd[2] for cmd in vals.get('order_line') or []]
+        self.orders[order_id] = {'id': order_id, 'name': f"S{order_id:05d}", 'partner_id': partner['id'],
+                                 'state': state, 'order_line': lines,
+                                 'write_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+        return order_id
+
+    # -- Dominios --
+    @staticmethod
+    def _leaf(record: Dict[str, Any], leaf: List[Any]) -> bool:
+        field, op, value = leaf
+        current = record.get(field, False)
+        if isinstance(current, list) and current and op in ('=', '!=', 'in', 'not in'):
+            current = current[0]  # many2one [id, nombre]: se compara el id
+        if op == 'ilike':
+            return str(value).lower() in str(current).lower()
+        if op == 'not ilike':
+            return str(value).lower() not in str(current).lower()
+        if op == '=':
+            return current == value
+        if op == '!=':
+            return current != value
+        if op == 'in':
+            return current in value
+        if op == 'not in':
+            return current not in value
+        if op in ('>', '>=', '<', '<='):
+            if current is False:
+                return False
+            return {'>': current > value, '>=': current >= value, '<': current < value, '<=': current <= value}[op]
+        raise xmlrpc.client.Fault(2, f"Invalid leaf {leaf}")
+
+    def _match(self, record: Dict[str, Any], domain: List[Any]) -> bool:
+        stack: List[bool] = []
+        for term in reversed(domain):
+            if term == '!':
+                stack.append(not stack.pop())
+            elif term in ('|', '&'):
+                a, b = stack.pop(), stack.pop()
+                stack.append(a or b if term == '|' else a and b)
+            else:
+                stack.append(self._leaf(record, term))
+        return all(stack)  # '&' implícito entre los términos sueltos
+
+    def _search(self, model: str, domain: List[Any], kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        active_test = (kwargs.get('context') or {}).get('active_test', True)
+        filters_active = any(isinstance(t, (list, tuple)) and t[0] == 'active' for t in domain)
+        rows = [r for r in self._table(model)
+                if (not active_test or filters_active or r.get('active', True)) and self._match(r, domain)]
+        if kwargs.get('order'):
+            key = kwargs['order'].split()[0]
+            rows.sort(key=lambda r: r.get(key) or 0, reverse='desc' in kwargs['order'].lower())
+        offset = kwargs.get('offset') or 0
+        limit = kwargs.get('limit') or None
+        return rows[offset:offset + limit if limit else None]
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], fields: Optional[List[str]]) -> List[Dict[str, Any]]:
+        keys = fields or ([k for k in rows[0] if k != 'pricelist'] if rows else [])
+        return [{'id': r['id'], **{k: r.get(k, False) for k in keys}} for r in rows]
+
+    # -- Servicios RPC --
+    def _wait(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency * self._rnd.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def version(self) -> Dict[str, Any]:
+        self._calls['common.version'] += 1
+        self._wait()
+        return {'server_version': '17.0', 'server_version_info': [17, 0, 0, 'final', 0, ''], 'protocol_version': 1}
+
+    def authenticate(self, db: str, login: str, password: str, user_agent_env: Any = None) -> Any:
+        self._calls['common.authenticate'] += 1
+        self._wait()
+        return UID if (db, login, password) == (DB, USUARIO, CLAVE) else False
+
+    def execute_kw(self, db: str, uid: int, password: str, model: str, method: str,
+                   args: List[Any], kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        self._calls[f"{model}.{method}"] += 1
+        self._wait()
+        if (db, uid, password) != (DB, UID, CLAVE):
+            raise xmlrpc.client.Fault(3, 'Access Denied')
+        kwargs = kwargs or {}
+        with self._lock:
+            if method == 'search_read':
+                return self._project(self._search(model, args[0] if args else [], kwargs), kwargs.get('fields'))
+            if method == 'search':
+                return [r['id'] for r in self._search(model, args[0] if args else [], kwargs)]
+            if method == 'search_count':
+                return len(self._search(model, args[0] if args else [], {'context': kwargs.get('context')}))
+            if method == 'read':
+                ids = set(args[0])
+                return self._project([r for r in self._table(model) if r['id'] in ids], kwargs.get('fields'))
+            if method == 'check_access_rights':
+                return True
+            if method == 'fields_get':
+                # Como Odoo 17: sin `is_storable`; solo se informa de los campos pedidos que existen
+                table = self._table(model)
+                known = set(table[0]) if table else set()
+                return {f: {} for f in (args[0] if args else known) if f in known}
+            if model == 'sale.order' and method == 'create':
+                # Como Odoo, un create con lista es atómico: si un registro falla no se crea ninguno
+                vals = args[0] if isinstance(args[0], list) else [args[0]]
+                snapshot = dict(self.orders)
+                try:
+                    ids = [self._create_order(v) for v in vals]
+                except xmlrpc.client.Fault:
+                    self.orders = snapshot
+                    raise
+                return ids if isinstance(args[0], list) else ids[0]
+            if model == 'sale.order' and method == 'action_confirm':
+                for order_id in args[0]:
+                    if order_id not in self.orders:
+                        raise xmlrpc.client.Fault(2, f"Record does not exist or has been deleted. (Record: sale.order({order_id},))")
+                    if self.orders[order_id]['state'] not in ('draft', 'sent'):
+                        raise xmlrpc.client.Fault(2, "Some orders are not in a state requiring confirmation.")
+                for order_id in args[0]:
+                    self.orders[order_id]['state'] = 'sale'
+                return True
+        raise xmlrpc.client.Fault(2, f"The method '{method}' does not exist on the model '{model}'")
+
+    # -- Utilidades para los benchmarks --
+    def move_stock(self, product_id: int, delta: float) -> None:
+        """Entrada o salida de stock (como validar un albarán): cambia qty_available y el write_date de su quant."""
+        with self._lock:
+            product = next(p for p in self.products if p['id'] == product_id)
+            product['qty_available'] += delta
+            quant = next((q for q in self.quants if q['id'] == product_id), None)
+            if quant is not None:
+                quant['quantity'] = product['qty_available']
+                quant['write_date'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def edit_template(self, template_id: int, **vals: Any) -> None:
+        """Edición desde la ficha del producto: cambia la plantilla y sus variantes, pero solo el write_date de la plantilla."""
+        with self._lock:
+            template = next(t for t in self.templates if t['id'] == template_id)
+            template.update(vals, write_date=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            for product in self.products:
+                if product['product_tmpl_id'][0] == template_id:
+                    product.update(vals)
+                    product['product_tmpl_id'] = [template_id, template['name']]
+
+    def draft_order_ids(self) -> List[int]:
+        with self._lock:
+            return [o['id'] for o in self.orders.values() if o['state'] in ('draft', 'sent')]
+
+    def stats(self) -> Dict[str, int]:
+        """Llamadas recibidas por 'modelo.método' (y 'common.*'), más el total en 'rpcs'."""
+        calls = dict(self._calls)
+        return {'rpcs': sum(calls.values()), **calls}
+
+    def reset_stats(self) -> None:
+        self._calls.clear()
+
+
+# --- Transporte ---
+class _Handler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ('/xmlrpc/2/common', '/xmlrpc/2/object')
+    protocol_version = 'HTTP/1.1'  # Keep-alive, como Odoo detrás de werkzeug/nginx
+
+    def do_POST(self):
+        if self.path != '/jsonrpc':
+            return super().do_POST()
+        request = json.loads(self.rfile.read(int(self.headers['content-length'])))
+        params = request.get('params') or {}
+        fake: FakeOdoo = self.server.fake
+        try:
+            method = {'version': fake.version, 'authenticate': fake.authenticate, 'execute_kw': fake.execute_kw}[params.get('method')]
+            payload = {'result': method(*params.get('args', []))}
+        except xmlrpc.client.Fault as e:
+            name = 'odoo.exceptions.AccessDenied' if e.faultCode == 3 else 'odoo.exceptions.UserError'
+            payload = {'error': {'code': 200, 'message': 'Odoo Server Error', 'data': {'name': name, 'message': e.faultString}}}
+        except (KeyError, TypeError) as e:
+            payload = {'error': {'code': 200, 'message': 'Odoo Server Error', 'data': {'name': type(e).__name__, 'message': str(e)}}}
+        body = json.dumps({'jsonrpc': '2.0', 'id': request.get('id'), **payload}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Un cliente que cierra a mitad de respuesta (p. ej. un servidor MCP que termina) no es un error del Odoo falso
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def serve(fake: FakeOdoo, host: str = '127.0.0.1', port: int = 0) -> Tuple[_Server, str]:
+    """
+    Arranca el servidor en un hilo en segundo plano y devuelve (servidor, url).
+    Con `port=0` elige un puerto libre. Se detiene con `servidor.shutdown()`.
+    """
+    server = _Server((host, port), requestHandler=_Handler, allow_none=True, logRequests=False)
+    server.fake = fake
+    server.register_function(fake.version, 'version')
+    server.register_function(fake.authenticate, 'authenticate')
+    server.register_function(fake.execute_kw, 'execute_kw')
+    server.register_function(fake.stats, 'stats')
+    threading.Thread(target=server.serve_forever, name='odoo-falso', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Odoo falso para benchmarks locales.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8069)
+    parser.add_argument('--latencia-ms', type=float, default=20.0)
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--productos', type=int, default=5000)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+    odoo = FakeOdoo(clientes=args.clientes, productos=args.productos, latency=args.latencia_ms / 1000, seed=args.semilla)
+    servidor, url = serve(odoo, args.host, args.puerto)
+    print(f"Odoo falso en {url} (base '{DB}', usuario '{USUARIO}', clave '{CLAVE}'); Ctrl+C para salir.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
@@ -0,0 +1,417 @@
+# catalogo_local.py
+
+import asyncio
+import heapq
+import time
+import logging
+import xmlrpc.client
+from typing import Dict, Any, Optional, List, Tuple, Callable, Awaitable
+
+from indice_difuso import TrigramIndex
+
+logger = logging.getLogger('mcp_odoo_server.catalogo')
+
+
+class OdooModelMirror:
+    """
+    Réplica local de un modelo de Odoo mantenida por sondeo incremental.
+
+    - Carga inicial paginada por keyset (`id > último`) con una sola pasada.
+    - Sondeo incremental de `write_date >= última sincronización` (incluye archivados, que
+      se retiran de la réplica).
+    - Una resincronización completa periódica elimina registros borrados en Odoo.
+    - Un índice de trigramas (`indice_difuso.TrigramIndex`) sobre `INDEX_FIELDS` se
+      actualiza a la vez que la réplica para las búsquedas aproximadas.
+
+    Las búsquedas por nombre se resuelven en memoria mientras la réplica esté fresca; si no
+    lo está, `search()` devuelve None y el llamador debe consultar a Odoo.
+    """
+
+    MODEL = ''
+    SYNC_FIELDS: List[str] = []
+    INDEX_FIELDS: List[str] = ['name']
+    LABEL = 'registros'
+
+    def __init__(self, page_size: int = 2000, poll_interval: float = 30.0, full_resync_interval: float = 3600.0,
+                 max_staleness: float = 300.0, fuzzy_min_score: float = 0.3):
+        self.page_size = page_size
+        self.poll_interval = poll_interval
+        self.full_resync_interval = full_resync_interval
+        self.max_staleness = max_staleness
+        self.fuzzy_min_score = fuzzy_min_score
+
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._folded_names: Dict[int, str] = {}
+        self._index = TrigramIndex(min_score=fuzzy_min_score)
+        self._last_write_date: Optional[str] = None
+        self._last_sync = 0.0           # monotonic de la última sincronización
+        self._last_full_load = 0.0
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats: Dict[str, Any] = {'full_loads': 0, 'incremental_syncs': 0, 'local_searches': 0,
+                                       'fuzzy_searches': 0, 'fallbacks': 0, 'sync_errors': 0,
+                                       'last_full_load_s': None}
+
+    @staticmethod
+    def _sort_key(record: Dict[str, Any]):
+        return (record.get('name') or '', record['id'])
+
+    # -- Mantenimiento de la réplica --
+    def _store(self, row: Dict[str, Any], records: Optional[Dict[int, Dict[str, Any]]] = None,
+               folded_names: Optional[Dict[int, str]] = None, index: Optional[TrigramIndex] = None) -> None:
+        records = self._records if records is None else records
+        folded_names = self._folded_names if folded_names is None else folded_names
+        index = self._index if index is None else index
+        if row.get('active') is False:
+            records.pop(row['id'], None)
+            folded_names.pop(row['id'], None)
+            index.remove(row['id'])
+            return
+        records[row['id']] = {k: row.get(k) for k in self.SYNC_FIELDS if k not in ('write_date', 'active')}
+        folded_names[row['id']] = (row.get('name') or '').casefold()
+        index.add(row['id'], [row.get(f) for f in self.INDEX_FIELDS])
+        write_date = row.get('write_date')
+        if write_date and (self._last_write_date is None or write_date > self._last_write_date):
+            self._last_write_date = write_date
+
+    async def _paginate(self, conn, domain: List[Any], fields: List[str], context: Optional[Dict[str, Any]] = None,
+                        model: Optional[str] = None):
+        """Recorre `search_read` (de `MODEL` u otro modelo) en páginas por keyset de id (sin OFFSET)."""
+        last_id = 0
+        while True:
+            kwargs: Dict[str, Any] = {'fields': fields, 'limit': self.page_size, 'order': 'id'}
+            if context:
+                kwargs['context'] = context
+            page = await conn.execute_kw(model or self.MODEL, 'search_read', [domain + [['id', '>', last_id]]], kwargs)
+            if not page:
+                return
+            yield page
+            if len(page) < self.page_size:
+                return
+            last_id = page[-1]['id']
+
+    async def full_load(self, conn) -> None:
+        """Carga (o recarga) completa de los registros activos."""
+        started = time.perf_counter()
+        # Se construye aparte y se sustituye al final: las búsquedas nunca ven una carga a medias
+        records: Dict[int, Dict[str, Any]] = {}
+        folded_names: Dict[int, str] = {}
+        index = TrigramIndex(min_score=self.fuzzy_min_score)
+        previous_write_date, self._last_write_date = self._last_write_date, None
+        try:
+            async for page in self._paginate(conn, [], self.SYNC_FIELDS):
+                for row in page:
+                    self._store(row, records, folded_names, index)
+        except Exception:
+            self._last_write_date = previous_write_date
+            raise
+        self._records, self._folded_names, self._index = records, folded_names, index
+        self._last_sync = self._last_full_load = time.monotonic()
+        self._loaded = True
+        elapsed = time.perf_counter() - started
+        self._stats['full_loads'] += 1
+        self._stats['last_full_load_s'] = round(elapsed, 3)
+        logger.info("Réplica local de %s cargada: %s %s en %.2fs.", self.MODEL, len(self._records), self.LABEL, elapsed)
+
+    async def sync_incremental(self, conn) -> int:
+        """Trae los registros modificados desde la última sincronización (incluye archivados)."""
+        if self._last_write_date is None:
+            await self.full_load(conn)
+            return len(self._records)
+        changed = 0
+        # '>=' en lugar de '>' para no perder escrituras del mismo segundo; se sobrescriben igual
+        domain = [['write_date', '>=', self._last_write_date]]
+        async for page in self._paginate(conn, domain, self.SYNC_FIELDS, context={'active_test': False}):
+            for row in page:
+                self._store(row)
+            changed += len(page)
+        self._last_sync = time.monotonic()
+        self._stats['incremental_syncs'] += 1
+        if changed:
+            logger.debug("Réplica de %s: %s %s actualizados desde %s.", self.MODEL, changed, self.LABEL, self._last_write_date)
+        return changed
+
+    async def _after_sync(self, conn, now: float) -> None:
+        """Gancho para refrescos adicionales tras cada sondeo incremental."""
+
+    async def run(self, get_session: Callable[[], Awaitable[Any]]) -> None:
+        """Bucle de sincronización en segundo plano."""
+        while True:
+            try:
+                conn = await get_session()
+                if conn is not None:
+                    now = time.monotonic()
+                    if not self._loaded or now - self._last_full_load >= self.full_resync_interval:
+                        await self.full_load(conn)
+                    else:
+                        await self.sync_incremental(conn)
+                        await self._after_sync(conn, now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats['sync_errors'] += 1
+                logger.warning("Error sincronizando la réplica de %s: %s - %s", self.MODEL, type(e).__name__, e)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def ensure_started(self, get_session: Callable[[], Awaitable[Any]]) -> None:
+        """Arranca el bucle de sincronización en el event loop actual (idempotente)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self.run(get_session), name=f"replica-{self.MODEL}-sync")
+
+    # -- Consultas --
+    def is_fresh(self) -> bool:
+        return self._loaded and time.monotonic() - self._last_sync <= self.max_staleness
+
+    def search(self, name: str, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """
+        Equivalente local de `[['name', 'ilike', name]]`.
+
+        Returns:
+            Lista de registros (como filas de search_read) o None si la réplica no está fresca.
+        """
+        if not self.is_fresh():
+            self._stats['fallbacks'] += 1
+            return None
+        self._stats['local_searches'] += 1
+        needle = name.casefold()
+        matches = (self._records[rid] for rid, folded in self._folded_names.items() if needle in folded)
+        return [dict(r) for r in heapq.nsmallest(limit, matches, key=self._sort_key)]
+
+    def fuzzy_search(self, query: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """
+        Búsqueda aproximada (sin tildes, tolerante a erratas) sobre `INDEX_FIELDS`.
+
+        Returns:
+            Pares (id, puntuación) de mejor a peor. Funciona aunque la réplica no esté fresca
+            (solo hace falta que se haya cargado); vacío si aún no hay datos.
+        """
+        if not self._loaded:
+            return []
+        self._stats['fuzzy_searches'] += 1
+        return self._index.search(query, limit)
+
+    def get_many(self, ids: List[int]) -> Optional[List[Dict[str, Any]]]:
+        """Registros locales por id, en el orden pedido (None si la réplica no está fresca)."""
+        if not self.is_fresh():
+            return None
+        return [dict(self._records[i]) for i in ids if i in self._records]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = dict(self._stats)
+        snapshot['model'] = self.MODEL
+        snapshot['records'] = len(self._records)
+        snapshot['fresh'] = self.is_fresh()
+        snapshot['last_write_date'] = self._last_write_date
+        snapshot['sync_age_s'] = round(time.monotonic() - self._last_sync, 1) if self._loaded else None
+        snapshot['index'] = self._index.stats()
+        return snapshot
+
+
+class ProductCatalogMirror(OdooModelMirror):
+    """
+    Réplica local de `product.product` (id, nombre, código, precio, vendible, tipo y stock).
+
+    El nombre y el precio viven en `product.template`: editarlos desde la ficha del producto
+    no cambia el `write_date` de la variante, así que cada sondeo incremental también busca
+    las plantillas modificadas (con su propia marca) y relee sus variantes.
+
+    El stock (`qty_available`) no cambia el `write_date` del producto, así que se sigue
+    aparte: en cada sondeo se leen los `stock.quant` modificados desde el anterior y solo se
+    relee `qty_available` de esos productos. Si la base no expone `stock.quant` (sin módulo
+    de inventario o sin permisos), se vuelve a releer el stock de todo el catálogo cada
+    `stock_refresh_interval` segundos. `stock_age()` dice cuánto puede haber cambiado desde
+    entonces, y tras una escritura propia que mueve stock la réplica no lo sirve hasta el
+    siguiente sondeo (`mark_stock_stale`).
+    """
+
+    MODEL = 'product.product'
+    SYNC_FIELDS = ['id', 'name', 'default_code', 'list_price', 'sale_ok', 'type', 'qty_available', 'write_date', 'active']
+    INDEX_FIELDS = ['name', 'default_code']
+    LABEL = 'productos'
+
+    def __init__(self, page_size: int = 2000, poll_interval: float = 30.0, stock_refresh_interval: float = 120.0,
+                 full_resync_interval: float = 3600.0, max_staleness: float = 300.0, fuzzy_min_score: float = 0.3):
+        super().__init__(page_size=page_size, poll_interval=poll_interval, full_resync_interval=full_resync_interval,
+                         max_staleness=max_staleness, fuzzy_min_score=fuzzy_min_score)
+        self.stock_refresh_interval = stock_refresh_interval
+        self._last_stock_refresh = 0.0  # monotonic del último refresco de stock
+        self._stock_stale = False
+        self._quant_tracking = True
+        self._last_quant_write_date: Optional[str] = None
+        self._last_template_write_date: Optional[str] = None
+        self._stats['stock_refreshes'] = 0
+        self._stats['template_products_refreshed'] = 0
+        self._stats['stock_products_refreshed'] = 0
+
+    @staticmethod
+    def _sort_key(product: Dict[str, Any]):
+        # Aproxima el orden por defecto de product.product en Odoo (default_code, name, id)
+        code = product.get('default_code')
+        return (not code, code or '', product.get('name') or '', product['id'])
+
+    async def full_load(self, conn) -> None:
+        # Marca de stock.quant tomada antes de leer el stock: lo que cambie durante la carga se relee después
+        baseline = await self._quant_baseline(conn)
+        template_baseline = await self._latest_write_date(conn, 'product.template')
+        await super().full_load(conn)
+        self._last_quant_write_date = baseline
+        self._last_template_write_date = template_baseline
+        self._last_stock_refresh = self._last_sync
+        self._stock_stale = False
+
+    @staticmethod
+    async def _latest_write_date(conn, model: str) -> Optional[str]:
+        """`write_date` del último registro modificado de `model` (incluye archivados; None si no hay)."""
+        last = await conn.execute_kw(model, 'search_read', [[]], {'fields': ['write_date'], 'order': 'write_date desc',
+                                                                  'limit': 1, 'context': {'active_test': False}})
+        return last[0]['write_date'] if last else None
+
+    async def _quant_baseline(self, conn) -> Optional[str]:
+        """`write_date` del último stock.quant modificado (None si no hay o no se pueden leer)."""
+        if not self._quant_tracking:
+            return None
+        try:
+            return await self._latest_write_date(conn, 'stock.quant')
+        except xmlrpc.client.Fault as e:
+            self._quant_tracking = False
+            logger.warning("stock.quant no disponible (%s): el stock del catálogo se releerá completo cada %.0fs.",
+                           e.faultString, self.stock_refresh_interval)
+            return None
+
+    async def sync_incremental(self, conn) -> int:
+        if self._last_write_date is None:
+            return await super().sync_incremental(conn)  # Carga completa, ya con la marca de plantillas
+        changed = await super().sync_incremental(conn)
+        return changed + await self.sync_changed_templates(conn)
+
+    async def sync_changed_templates(self, conn) -> int:
+        """Relee las variantes de las `product.template` modificadas desde el último sondeo."""
+        domain = [['write_date', '>=', self._last_template_write_date]] if self._last_template_write_date else []
+        templates = set()
+        last_write_date = self._last_template_write_date
+        async for page in self._paginate(conn, domain, ['write_date'], context={'active_test': False},
+                                         model='product.template'):
+            for template in page:
+                templates.add(template['id'])
+                if template.get('write_date') and (last_write_date is None or template['write_date'] > last_write_date):
+                    last_write_date = template['write_date']
+        changed = 0
+        if templates:
+            async for page in self._paginate(conn, [['product_tmpl_id', 'in', sorted(templates)]], self.SYNC_FIELDS,
+                                             context={'active_test': False}):
+                for row in page:
+                    self._store(row)
+                changed += len(page)
+            logger.debug("Réplica de %s: %s %s releídos por cambios en %s plantilla(s).",
+                         self.MODEL, changed, self.LABEL, len(templates))
+        self._last_template_write_date = last_write_date
+        self._stats['template_products_refreshed'] += changed
+        return changed
+
+    async def refresh_stock(self, conn) -> None:
+        """Relee `qty_available` de todo el catálogo (el stock no altera write_date)."""
+        async for page in self._paginate(conn, [], ['id', 'qty_available']):
+            for row in page:
+                product = self._records.get(row['id'])
+                if product is not None:
+                    product['qty_available'] = row.get('qty_available')
+        self._last_stock_refresh = time.monotonic()
+        self._stock_stale = False
+        self._stats['stock_refreshes'] += 1
+        self._stats['stock_products_refreshed'] += len(self._records)
+
+    async def refresh_changed_stock(self, conn) -> int:
+        """Relee `qty_available` solo de los productos con `stock.quant` modificados desde el último sondeo."""
+        started = time.monotonic()
+        domain = [['write_date', '>=', self._last_quant_write_date]] if self._last_quant_write_date else []
+        changed = set()
+        last_write_date = self._last_quant_write_date
+        async for page in self._paginate(conn, domain, ['product_id', 'write_date'], model='stock.quant'):
+            for quant in page:
+                if quant.get('product_id'):
+                    changed.add(quant['product_id'][0])
+                if quant.get('write_date') and (last_write_date is None or quant['write_date'] > last_write_date):
+                    last_write_date = quant['write_date']
+        ids = sorted(pid for pid in changed if pid in self._records)
+        for start in range(0, len(ids), self.page_size):
+            rows = await conn.execute_kw(self.MODEL, 'search_read', [[['id', 'in', ids[start:start + self.page_size]]]],
+                                         {'fields': ['qty_available'], 'context': {'active_test': False}})
+            for row in rows:
+                product = self._records.get(row['id'])
+                if product is not None:
+                    product['qty_available'] = row.get('qty_available')
+        self._last_quant_write_date = last_write_date
+        self._last_stock_refresh = started
+        self._stock_stale = False
+        self._stats['stock_refreshes'] += 1
+        self._stats['stock_products_refreshed'] += len(ids)
+        if ids:
+            logger.debug("Réplica de %s: stock releído de %s producto(s).", self.MODEL, len(ids))
+        return len(ids)
+
+    async def _after_sync(self, conn, now: float) -> None:
+        if self._quant_tracking:
+            try:
+                await self.refresh_changed_stock(conn)
+                return
+            except xmlrpc.client.Fault as e:
+                self._quant_tracking = False
+                logger.warning("stock.quant no disponible (%s): se pasa a releer todo el stock cada %.0fs.",
+                               e.faultString, self.stock_refresh_interval)
+        if self._stock_stale or now - self._last_stock_refresh >= self.stock_refresh_interval:
+            await self.refresh_stock(conn)
+
+    def mark_stock_stale(self) -> None:
+        """Tras una escritura que mueve stock: la réplica deja de servir stock hasta refrescarlo."""
+        self._stock_stale = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def is_fresh(self) -> bool:
+        return (super().is_fresh() and not self._stock_stale
+                and time.monotonic() - self._last_stock_refresh <= self.max_staleness)
+
+    def stock_age(self) -> Optional[float]:
+        """Segundos desde el último refresco del stock de la réplica (None si no se ha cargado)."""
+        return time.monotonic() - self._last_stock_refresh if self._loaded else None
+
+    def list_saleable(self, limit: int = 20, after_id: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """
+        Equivalente local de `[['sale_ok', '=', True], ['id', '>', after_id]]` ordenado por id
+        (una página por keyset). None si la réplica no está fresca.
+        """
+        if not self.is_fresh():
+            self._stats['fallbacks'] += 1
+            return None
+        self._stats['local_searches'] += 1
+        saleable = (p for pid, p in self._records.items() if pid > after_id and p.get('sale_ok'))
+        return [dict(p) for p in heapq.nsmallest(limit, saleable, key=lambda p: p['id'])]
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = super().stats()
+        snapshot['products'] = snapshot['records']
+        age = self.stock_age()
+        snapshot['stock_age_s'] = round(age, 1) if age is not None else None
+        snapshot['stock_tracking'] = 'stock.quant' if self._quant_tracking else 'full'
+        return snapshot
+
+
+class PartnerDirectoryMirror(OdooModelMirror):
+    """Réplica local de `res.partner` (id, nombre, email y teléfono) para búsquedas de clientes."""
+
+    MODEL = 'res.partner'
+    SYNC_FIELDS = ['id', 'name', 'email', 'phone', 'write_date', 'active']
+    INDEX_FIELDS = ['name', 'email']
+    LABEL = 'contactos'
+
+    @staticmethod
+    def _sort_key(partner: Dict[str, Any]):
+        # Aproxima el orden por defecto de res.partner en Odoo (complete_name, id desc)
+        return (partner.get('name') or '', -partner['id'])
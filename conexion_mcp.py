@@ -0,0 +1,154 @@
+# conexion_mcp.py
+#
+# Conexión persistente del agente con el servidor MCP de Odoo. Importa el SDK de
+# openai-agents, así que solo se carga al crear el agente (agente_quindicolor_openai.startup).
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict
+
+import anyio
+from agents.mcp import MCPServerSse, MCPServerStdio
+
+agent_logger = logging.getLogger('openai_agent_logic')
+
+# Herramientas que solo leen de Odoo: las de un mismo paso del modelo se ejecutan a la vez.
+# Cualquier otra (crear_*, confirmar_* o una nueva sin clasificar) se trata como escritura.
+READ_ONLY_TOOLS = frozenset({
+    'buscar_cliente', 'buscar_producto', 'buscar_varios_clientes', 'buscar_varios_productos',
+    'listar_productos', 'exportar_productos',
+})
+
+class _SupervisedMCPServerMixin:
+    """
+    Conexión MCP de larga vida compartida por todas las sesiones de la app, en lugar de
+    abrir una nueva (y, en stdio, lanzar un subproceso nuevo) en cada turno.
+
+    - Una tarea supervisora es dueña de la conexión (entra y sale del contexto de
+      transporte en la misma tarea, como exige anyio) y la mantiene abierta entre turnos.
+    - Hace ping periódico al servidor; si no responde, cierra y vuelve a conectar.
+    - La lista de herramientas se cachea: solo hay handshake `initialize`/`list_tools`
+      al arrancar o reconectar.
+    - El SDK lanza a la vez todas las llamadas de un paso del modelo. Las de solo lectura
+      (`read_only_tools`) se ejecutan en paralelo, como mucho `max_parallel_reads` a la vez;
+      las escrituras, una detrás de otra y en el orden en que el modelo las pidió.
+    """
+
+    def __init__(self, *args, health_check_interval: float = 15.0, ping_timeout: float = 5.0,
+                 startup_timeout: float = 30.0, max_parallel_reads: int = 4,
+                 read_only_tools: frozenset = READ_ONLY_TOOLS, **kwargs):
+        super().__init__(*args, cache_tools_list=True, **kwargs)
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self.startup_timeout = startup_timeout
+        self.max_parallel_reads = max(1, max_parallel_reads)
+        self.read_only_tools = read_only_tools
+        self._read_slots: asyncio.Semaphore | None = None
+        self._write_lock: asyncio.Lock | None = None
+        self.restarts = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._supervisor_task: asyncio.Task | None = None
+        self._ready: asyncio.Event | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._restart_requested = False
+
+    async def ensure_connected(self) -> None:
+        """Arranca el supervisor si hace falta y espera a que el servidor esté listo."""
+        loop = asyncio.get_running_loop()
+        if self._supervisor_task is None or self._supervisor_task.done() or self._loop is not loop:
+            self._loop = loop
+            self._ready = asyncio.Event()
+            self._wakeup = asyncio.Event()
+            self._read_slots = asyncio.Semaphore(self.max_parallel_reads)
+            self._write_lock = asyncio.Lock()  # FIFO: las escrituras conservan su orden
+            self._stopping = False
+            self._supervisor_task = loop.create_task(self._supervise(), name="mcp-odoo-supervisor")
+        await asyncio.wait_for(self._ready.wait(), timeout=self.startup_timeout)
+
+    def request_restart(self) -> None:
+        """Pide al supervisor que reinicie la conexión (y el subproceso, en stdio) en cuanto pueda."""
+        self._restart_requested = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _ping(self) -> bool:
+        if self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout=self.ping_timeout)
+            return True
+        except Exception as e:
+            agent_logger.warning(f"Health-check MCP fallido: {type(e).__name__} - {e}")
+            return False
+
+    async def _supervise(self) -> None:
+        backoff = 1.0
+        while not self._stopping:
+            try:
+                started = time.perf_counter()
+                await super().connect()
+                await super().list_tools()  # Calienta la caché de herramientas
+                agent_logger.info(f"Servidor MCP Odoo listo en {time.perf_counter() - started:.2f}s (reinicios: {self.restarts}).")
+                backoff = 1.0
+                self._ready.set()
+                while not self._stopping:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.health_check_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    if self._stopping:
+                        break
+                    if self._restart_requested or not await self._ping():
+                        agent_logger.warning("Servidor MCP Odoo no responde. Reiniciando conexión...")
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                agent_logger.error(f"Error en el supervisor MCP: {type(e).__name__} - {e}", exc_info=True)
+            finally:
+                self._ready.clear()
+                self._restart_requested = False
+                await super().cleanup()
+            if not self._stopping:
+                self.restarts += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def list_tools(self):
+        await self.ensure_connected()
+        return await super().list_tools()
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any] | None):
+        await self.ensure_connected()
+        gate = self._read_slots if tool_name in self.read_only_tools else self._write_lock
+        try:
+            async with gate:
+                return await super().call_tool(tool_name, arguments)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream) as e:
+            # El servidor cayó: se reconecta, pero la llamada NO se reintenta
+            # (podría ser una escritura como crear_cotizacion ya aplicada en Odoo).
+            agent_logger.error(f"Conexión MCP rota durante '{tool_name}': {type(e).__name__}. Se reiniciará el servidor.")
+            self.request_restart()
+            raise
+
+    async def shutdown(self) -> None:
+        """Detiene el supervisor y cierra la conexión (al cerrar la app)."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._supervisor_task is not None:
+            try:
+                await asyncio.wait_for(self._supervisor_task, timeout=10)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._supervisor_task.cancel()
+            self._supervisor_task = None
+
+class SupervisedMCPServerStdio(_SupervisedMCPServerMixin, MCPServerStdio):
+    """Un único subproceso `mcp_odoo_server.py` por app, reiniciado si cae."""
+
+
+class SupervisedMCPServerSse(_SupervisedMCPServerMixin, MCPServerSse):
+    """Conexión persistente a un `mcp_odoo_server.py` en modo red (`--transport sse`)."""
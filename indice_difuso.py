@@ -0,0 +1,197 @@
+# indice_difuso.py
+
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Set
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+def normalize(text: Optional[str]) -> str:
+    """Minúsculas, sin tildes/diacríticos y con la puntuación reducida a espacios simples."""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', stripped.casefold()).strip()
+
+def trigrams(word: str) -> Set[str]:
+    """Trigramas de una palabra con relleno ('  p', ' pi', 'pin', ..., 'ra ')."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice en memoria para búsqueda aproximada (erratas de transcripción, tildes, palabras
+    a medio escribir). Cada documento puede tener varios textos (p. ej. nombre y código);
+    su puntuación es la del texto que mejor coincide.
+
+    Funciona en dos niveles para no recorrer listas enormes en catálogos con vocabulario
+    repetitivo ("Pintura", "Galón"...):
+      1. Cada palabra de la consulta se compara con el vocabulario, no con los documentos:
+         igualdad exacta, prefijo (búsqueda binaria sobre el vocabulario ordenado) y, en
+         palabras alfabéticas, similitud de Dice entre trigramas.
+      2. Los candidatos salen de la palabra de la consulta con menos documentos y se
+         intersecan con las siguientes mientras sigan siendo demasiados; solo esos se puntúan.
+
+    Puntuación (0-1): cobertura media de las palabras de la consulta, con una ligera
+    preferencia por textos cortos. Si la consulta normalizada aparece literalmente (lo que
+    encontraría un `ilike`) se sube al tramo [SUBSTRING_FLOOR, 1].
+    """
+
+    SUBSTRING_FLOOR = 0.5
+    WORD_MIN_SIMILARITY = 0.45
+    PREFIX_LIMIT = 50
+    CANDIDATE_LIMIT = 64
+    FIELD_BITS = 3  # clave de cada texto = doc_id << FIELD_BITS | campo (enteros: hash inmediato)
+
+    def __init__(self, min_score: float = 0.3):
+        self.min_score = min_score
+        self._keys: Dict[int, Tuple[str, Tuple[str, ...]]] = {}  # clave -> (texto, palabras)
+        self._docs: Dict[int, int] = {}                                        # doc -> nº de textos indexados
+        self._word_postings: Dict[str, Set[int]] = {}
+        self._vocabulary: List[str] = []                                       # ordenado, para prefijos
+        self._gram_words: Dict[str, Set[str]] = {}                             # trigrama -> palabras alfabéticas
+        self._gram_counts: Dict[str, int] = {}                                 # palabra alfabética -> nº trigramas
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # -- Mantenimiento --
+    def _add_word(self, word: str, key: int) -> None:
+        posting = self._word_postings.get(word)
+        if posting is None:
+            posting = self._word_postings[word] = set()
+            bisect.insort(self._vocabulary, word)
+            if word.isalpha():
+                grams = trigrams(word)
+                self._gram_counts[word] = len(grams)
+                for gram in grams:
+                    self._gram_words.setdefault(gram, set()).add(word)
+        posting.add(key)
+
+    def _remove_word(self, word: str, key: int) -> None:
+        posting = self._word_postings.get(word)
+        if posting is None:
+            return
+        posting.discard(key)
+        if posting:
+            return
+        del self._word_postings[word]
+        pos = bisect.bisect_left(self._vocabulary, word)
+        if pos < len(self._vocabulary) and self._vocabulary[pos] == word:
+            del self._vocabulary[pos]
+        if self._gram_counts.pop(word, None) is not None:
+            for gram in trigrams(word):
+                words = self._gram_words.get(gram)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self._gram_words[gram]
+
+    def add(self, doc_id: int, texts: Iterable[Optional[str]]) -> None:
+        """Indexa (o reindexa) un documento."""
+        self.remove(doc_id)
+        count = 0
+        for field_idx, text in enumerate(texts):
+            if field_idx >= 1 << self.FIELD_BITS:
+                raise ValueError(f"Como máximo {1 << self.FIELD_BITS} textos por documento")
+            normalized = normalize(text)
+            if not normalized:
+                continue
+            key = doc_id << self.FIELD_BITS | field_idx
+            words = tuple(dict.fromkeys(normalized.split()))
+            self._keys[key] = (normalized, words)
+            for word in words:
+                self._add_word(word, key)
+            count = field_idx + 1
+        if count:
+            self._docs[doc_id] = count
+
+    def remove(self, doc_id: int) -> None:
+        count = self._docs.pop(doc_id, 0)
+        for field_idx in range(count):
+            key = doc_id << self.FIELD_BITS | field_idx
+            entry = self._keys.pop(key, None)
+            if entry is None:
+                continue
+            for word in entry[1]:
+                self._remove_word(word, key)
+
+    # -- Consultas --
+    def _similar_words(self, qword: str) -> Dict[str, float]:
+        """Palabras del vocabulario parecidas a `qword`, con su similitud (0-1)."""
+        similar: Dict[str, float] = {}
+        if qword in self._word_postings:
+            similar[qword] = 1.0
+        if len(qword) >= 3 or qword.isdigit():
+            pos = bisect.bisect_right(self._vocabulary, qword)
+            for word in self._vocabulary[pos:pos + self.PREFIX_LIMIT]:
+                if not word.startswith(qword):
+                    break
+                similar[word] = 0.6 + 0.4 * len(qword) / len(word)
+        if qword.isalpha() and len(qword) >= 3:
+            qgrams = trigrams(qword)
+            shared: Counter = Counter()
+            for gram in qgrams:
+                words = self._gram_words.get(gram)
+                if words:
+                    shared.update(words)
+            for word, common in shared.items():
+                sim = 2.0 * common / (len(qgrams) + self._gram_counts[word])
+                if sim >= self.WORD_MIN_SIMILARITY and sim > similar.get(word, 0.0):
+                    similar[word] = sim
+        return similar
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[int, float]]:
+        """
+        Devuelve hasta `limit` pares (doc_id, puntuación) ordenados de mejor a peor.
+        """
+        normalized = normalize(query)
+        qwords = list(dict.fromkeys(normalized.split()))
+        if not qwords:
+            return []
+        matched = []
+        for qword in qwords:
+            similar = self._similar_words(qword)
+            if similar:
+                size = sum(len(self._word_postings[w]) for w in similar)
+                matched.append((size, similar))
+        if not matched:
+            return []
+        matched.sort(key=lambda item: item[0])
+
+        candidates: Set[int] = set().union(*(self._word_postings[w] for w in matched[0][1]))
+        for _, similar in matched[1:]:
+            if len(candidates) <= self.CANDIDATE_LIMIT:
+                break
+            # `a & b` recorre el menor de los dos: no se materializa la unión de listas grandes
+            narrowed: Set[int] = set()
+            for word in similar:
+                narrowed |= candidates & self._word_postings[word]
+            if not narrowed:
+                break
+            candidates = narrowed
+
+        similars = [similar for _, similar in matched]
+        n_qwords = len(qwords)
+        best: Dict[int, float] = {}
+        for key in candidates:
+            text, words = self._keys[key]
+            total = 0.0
+            for similar in similars:
+                total += max([similar.get(w, 0.0) for w in words])
+            score = (total / n_qwords) * (0.85 + 0.15 * n_qwords / max(n_qwords, len(words)))
+            if normalized in text:
+                score = self.SUBSTRING_FLOOR + (1.0 - self.SUBSTRING_FLOOR) * score
+            doc_id = key >> self.FIELD_BITS
+            if score >= self.min_score and score > best.get(doc_id, 0.0):
+                best[doc_id] = score
+        return heapq.nlargest(limit, best.items(), key=lambda item: (item[1], -item[0]))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'documents': len(self._docs), 'texts': len(self._keys), 'words': len(self._word_postings),
+                'trigrams': len(self._gram_words)}
@@ -1,335 +1,1176 @@
 # mcp_odoo_server.py
 
 import os
+import json
+import math
+import asyncio
+import sys
+import argparse
 import xmlrpc.client
 import logging
+import anyio
+import httpx
+import uvicorn
 from dotenv import load_dotenv
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 # Import principal de MCP (verificado que el paquete se llama 'mcp')
-from mcp.server.fastmcp import FastMCP
-from typing import Dict, Any, Optional, List
+from mcp.server.fastmcp import FastMCP, Context
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
+
+from odoo_rpc import AsyncOdooSession
+from odoo_cache import OdooReadCache, SingleFlight, STOCK_FIELDS
+from catalogo_local import ProductCatalogMirror, PartnerDirectoryMirror
+from metricas import MetricsRegistry
+from registro import rotating_file_handler, start_queue_logging
+
+# El .env se carga antes del logging para que también pueda configurarlo (MCP_LOG_*)
+env_path = os.path.join(os.path.dirname(__file__), '.env')
+env_loaded = load_dotenv(dotenv_path=env_path)
 
 # --- 1. Configuración del Logging ---
+# Las herramientas solo encolan los registros; el formateo y la escritura en disco/consola
+# ocurren en un hilo aparte (registro.start_queue_logging), con rotación del archivo.
 log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 # Asegura que el log se cree en el directorio actual
-log_file_path = os.path.join(os.path.dirname(__file__), 'mcp_odoo_debug.log')
-log_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+log_file_path = os.getenv('MCP_LOG_ARCHIVO') or os.path.join(os.path.dirname(__file__), 'mcp_odoo_debug.log')
+if os.getenv('MCP_LOG_POR_PROCESO') == '1':
+    # Worker de red (lo marca run_network_server): archivo propio, la rotación no se coordina entre procesos
+    base, ext = os.path.splitext(log_file_path)
+    log_file_path = f"{base}.{os.getpid()}{ext}"
+log_handler = rotating_file_handler(log_file_path, max_bytes=int(float(os.getenv('MCP_LOG_MAX_MB', '10')) * 1024 * 1024),
+                                    backups=int(os.getenv('MCP_LOG_COPIAS', '5')), when=os.getenv('MCP_LOG_ROTACION') or None)
 log_handler.setFormatter(log_formatter)
+log_handler.setLevel(os.getenv('MCP_LOG_NIVEL', 'DEBUG').upper()) # DEBUG por defecto; INFO en producción
 
 logger = logging.getLogger('mcp_odoo_server')
-logger.setLevel(logging.DEBUG) # Captura todo desde DEBUG hacia arriba
 # Limpia handlers previos si se re-ejecuta en algunos entornos interactivos
 if logger.hasHandlers():
     logger.handlers.clear()
-logger.addHandler(log_handler)
 
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(log_formatter)
 console_handler.setLevel(logging.INFO) # Muestra INFO y superior en consola
-logger.addHandler(console_handler)
+log_listener = start_queue_logging(logger, [log_handler, console_handler],
+                                   debug_sample_rate=float(os.getenv('MCP_LOG_MUESTREO_DEBUG', '1')))
+# httpx registra una línea INFO por petición (cada RPC a Odoo) en la raíz, fuera de la cola
+for ruidoso in ('httpx', 'httpcore'):
+    logging.getLogger(ruidoso).setLevel(logging.WARNING)
 
 logger.info("Iniciando el servidor MCP para Odoo...")
 
 # --- 2. Carga de Variables de Entorno ---
-env_path = os.path.join(os.path.dirname(__file__), '.env')
-if load_dotenv(dotenv_path=env_path):
-    logger.info(f"Archivo .env cargado desde: {env_path}")
+if env_loaded:
+    logger.info("Archivo .env cargado desde: %s", env_path)
 else:
-    logger.warning(f"Archivo .env no encontrado en {env_path}. Usando variables de entorno del sistema si existen.")
+    logger.warning("Archivo .env no encontrado en %s. Usando variables de entorno del sistema si existen.", env_path)
 
 ODOO_URL = os.getenv('ODOO_URL')
 ODOO_DB = os.getenv('ODOO_DB')
 ODOO_USER = os.getenv('ODOO_USER')
 ODOO_PASSWORD = os.getenv('ODOO_PASSWORD') # Clave API
 
-required_vars = {'ODOO_URL': ODOO_URL, 'ODOO_DB': ODOO_DB, 'ODOO_USER': ODOO_USER, 'ODOO_PASSWORD': ODOO_PASSWORD}
-missing_vars = [k for k, v in required_vars.items() if not v] # Verifica que no estén vacíos
+def missing_config() -> List[str]:
+    """Variables Odoo obligatorias que faltan o están vacías (`main` no arranca sin ellas)."""
+    required_vars = {'ODOO_URL': ODOO_URL, 'ODOO_DB': ODOO_DB, 'ODOO_USER': ODOO_USER, 'ODOO_PASSWORD': ODOO_PASSWORD}
+    return [k for k, v in required_vars.items() if not v]
 
-if missing_vars:
-    error_msg = f"Error Crítico: Faltan variables de entorno o están vacías: {', '.join(missing_vars)}. Revisa tu archivo .env o el entorno."
-    logger.critical(error_msg)
-    exit(1) # Salir si faltan variables críticas
-else:
-    logger.info("Variables de entorno de Odoo cargadas y validadas.")
-    logger.debug(f"Configuración Odoo -> URL: {ODOO_URL}, DB: {ODOO_DB}, User: {ODOO_USER}")
+# Importar el módulo no valida ni conecta nada: lo hace `main` al arrancar, y la conexión
+# con Odoo se prepara en segundo plano cuando se abre la primera sesión MCP (`lifespan`).
+if not missing_config():
+    logger.info("Variables de entorno de Odoo cargadas.")
+    logger.debug("Configuración Odoo -> URL: %s, DB: %s, User: %s", ODOO_URL, ODOO_DB, ODOO_USER)
 
 # --- 3. Instanciación de FastMCP ---
-try:
-    app = FastMCP(name="quindicolor-odoo-agent")
-    logger.info("Instancia de FastMCP<'quindicolor-odoo-agent'> creada.")
-except Exception as e:
-    logger.critical(f"Error inesperado al instanciar FastMCP: {e}", exc_info=True)
-    exit(1)
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Cada sesión MCP: la primera del proceso lanza `warm_up_odoo` sin esperar a que termine."""
+    start_warm_up()
+    yield
+
+app = FastMCP(name="quindicolor-odoo-agent", lifespan=lifespan)
+logger.info("Instancia de FastMCP<'quindicolor-odoo-agent'> creada.")
+
+# --- 3b. Métricas (latencia por herramienta y por método de Odoo) ---
+metrics = MetricsRegistry()
+
+def herramienta(*args: Any, **kwargs: Any):
+    """`@app.tool()` que además registra la duración y el resultado de cada llamada en `metrics`."""
+    registrar = app.tool(*args, **kwargs)
+    return lambda fn: registrar(metrics.instrument_tool(fn))
+
+@app.resource("odoo://metricas", mime_type="text/plain")
+def metricas_prometheus() -> str:
+    """Métricas en formato de texto de Prometheus (histogramas de herramientas, RPCs, autenticación y conexión)."""
+    return metrics.render_prometheus()
+
+@app.resource("odoo://metricas/resumen", mime_type="application/json")
+def metricas_resumen() -> str:
+    """Herramientas y métodos de Odoo ordenados por tiempo total, con p50/p95/p99 y Faults."""
+    return json.dumps(metrics.summary())
+
+# --- 4. Sesión Odoo Persistente (autentica una vez, pool de conexiones keep-alive) ---
+ODOO_POOL_SIZE = int(os.getenv('ODOO_POOL_SIZE', '4'))
+ODOO_TIMEOUT = float(os.getenv('ODOO_TIMEOUT', '30'))
+ODOO_PROTOCOL = os.getenv('ODOO_PROTOCOL', 'xmlrpc')  # 'xmlrpc' o 'jsonrpc' (herramientas MCP)
 
-# --- 4. Función de Conexión a Odoo (Versión simple: siempre reconecta) ---
-def get_odoo_connection_details() -> Optional[Dict[str, Any]]:
+_async_odoo_session: Optional[AsyncOdooSession] = None
+
+async def get_async_odoo_session() -> Optional[AsyncOdooSession]:
     """
-    Establece una conexión con Odoo usando XML-RPC y autentica al usuario.
-    Utiliza las credenciales cargadas desde el entorno. Reconecta en cada llamada.
+    Devuelve la sesión Odoo compartida por todo el proceso, creándola y autenticándola en
+    el primer uso. Las llamadas a Odoo no bloquean el event loop, así que varias
+    herramientas concurrentes solapan sus esperas de red.
 
     Returns:
-        Dict con detalles ('url', 'db', 'uid', 'password', 'models') o None si falla.
+        AsyncOdooSession autenticada o None si falla la conexión/autenticación.
     """
+    global _async_odoo_session
     if not all([ODOO_URL, ODOO_DB, ODOO_USER, ODOO_PASSWORD]):
-        logger.error("get_odoo_connection_details: Faltan variables de entorno Odoo.")
+        logger.error("get_async_odoo_session: Faltan variables de entorno Odoo.")
         return None
 
-    common_url = f"{ODOO_URL.rstrip('/')}/xmlrpc/2/common"
-    object_url = f"{ODOO_URL.rstrip('/')}/xmlrpc/2/object"
-
+    if _async_odoo_session is None:
+        logger.debug("Creando sesión Odoo asíncrona para %s (protocolo=%s, pool=%s, timeout=%ss)", ODOO_URL, ODOO_PROTOCOL, ODOO_POOL_SIZE, ODOO_TIMEOUT)
+        try:
+            _async_odoo_session = AsyncOdooSession(ODOO_URL, ODOO_DB, ODOO_USER, ODOO_PASSWORD, pool_size=ODOO_POOL_SIZE,
+                                                   timeout=ODOO_TIMEOUT, protocol=ODOO_PROTOCOL, metrics=metrics)
+        except ValueError as e:
+            logger.error("Configuración Odoo inválida: %s", e)
+            return None
     try:
-        logger.debug(f"Intentando conectar a common: {common_url}")
-        common = xmlrpc.client.ServerProxy(common_url)
-        common.version()
-        logger.debug("Conexión a 'common' exitosa.")
+        if await _async_odoo_session.authenticate() is None:
+            return None
+        return _async_odoo_session
+    except xmlrpc.client.Fault as e:
+        logger.error("Error XML-RPC Odoo: Fault %s - %s", e.faultCode, e.faultString, exc_info=True)
+        return None
+    except (ConnectionRefusedError, httpx.ConnectError):
+        logger.error("Error de conexión Odoo: No se pudo conectar a %s. ¿Servidor Odoo activo y accesible?", ODOO_URL, exc_info=True)
+        return None
+    except Exception as e:
+        logger.error("Error inesperado durante conexión/autenticación Odoo: %s - %s", type(e).__name__, e, exc_info=True)
+        return None
 
-        logger.debug(f"Autenticando usuario '{ODOO_USER}' en DB '{ODOO_DB}'...")
-        uid = common.authenticate(ODOO_DB, ODOO_USER, ODOO_PASSWORD, {})
+@app.resource("odoo://sesion/estadisticas", mime_type="application/json")
+def estadisticas_sesion() -> str:
+    """Contadores de las sesiones Odoo: aciertos/fallos de UID, re-autenticaciones y uso del pool."""
+    stats: Dict[str, Any] = {}
+    if _async_odoo_session is not None:
+        stats['async'] = _async_odoo_session.stats()
+    return json.dumps(stats or {'authenticated': False})
 
-        if not uid:
-            logger.error(f"Fallo la autenticación Odoo para usuario '{ODOO_USER}' en DB '{ODOO_DB}'. Verifica credenciales.")
-            return None
-        logger.debug(f"Autenticación Odoo exitosa. UID: {uid}")
+# --- 5. Caché de Lecturas (TTL por modelo + LRU, single-flight) y Catálogo Local ---
+# Solo se cachean los modelos con TTL > 0; el resto (p. ej. 'sale.order') siempre va a Odoo.
+read_cache = OdooReadCache(
+    ttls={
+        'product.product': float(os.getenv('ODOO_CACHE_TTL_PRODUCTOS', '30')),
+        'res.partner': float(os.getenv('ODOO_CACHE_TTL_CLIENTES', '300')),
+    },
+    default_ttl=0,
+    max_entries=int(os.getenv('ODOO_CACHE_MAX_ENTRIES', '512')),
+    max_bytes=int(float(os.getenv('ODOO_CACHE_MAX_MB', '16')) * 1024 * 1024),
+)
+# Lecturas idénticas simultáneas (caché vacía o modelo sin TTL) comparten un único RPC
+read_flights = SingleFlight()
 
-        logger.debug(f"Creando proxy para object: {object_url}")
-        models = xmlrpc.client.ServerProxy(object_url)
+async def odoo_read(conn: AsyncOdooSession, model: str, method: str, args: List[Any],
+                    kwargs: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Lectura de Odoo (`search_read`/`read`) servida desde la caché si hay una entrada vigente
+    con el mismo modelo, dominio, campos y opciones. Si no la hay y otra llamada idéntica ya
+    está en vuelo, se espera su resultado en lugar de repetir el RPC. El resultado no debe mutarse.
+    """
+    key = read_cache.make_key(model, method, args, kwargs)
+    hit, value = read_cache.get(key)
+    if hit:
+        logger.debug("Caché HIT: %s.%s %s", model, method, args)
+        return value
 
-        logger.info(f"Conexión Odoo preparada (UID: {uid}).")
-        return {
-            'url': ODOO_URL,
-            'db': ODOO_DB,
-            'uid': uid,
-            'password': ODOO_PASSWORD,
-            'models': models
-        }
+    # Tomada antes del RPC: si una escritura invalida el modelo mientras tanto, no se guarda
+    generation = read_cache.generation(model)
 
-    except xmlrpc.client.Fault as e:
-        logger.error(f"Error XML-RPC Odoo: Fault {e.faultCode} - {e.faultString}", exc_info=True)
-        return None
-    except ConnectionRefusedError:
-        logger.error(f"Error de conexión Odoo: No se pudo conectar a {ODOO_URL}. ¿Servidor Odoo activo y accesible?", exc_info=True)
-        return None
+    def store(result: Any) -> None:
+        read_cache.put(key, model, (kwargs or {}).get('fields'), result, generation=generation)
+    return await read_flights.do(key, model, method, lambda: conn.execute_kw(model, method, args, kwargs), store=store)
+
+def invalidar_lecturas(model: str, fields: Optional[Any] = None, ids: Optional[Any] = None) -> None:
+    """Tras escribir en `model`: invalida la caché y desliga las lecturas en vuelo anteriores."""
+    read_cache.invalidate(model, fields, ids=ids)
+    read_flights.forget(model)
+
+@app.resource("odoo://cache/estadisticas", mime_type="application/json")
+def estadisticas_cache() -> str:
+    """
+    Tasa de aciertos, entradas, memoria aproximada y expulsiones de la caché de lecturas, y
+    RPCs ahorrados al agrupar lecturas idénticas simultáneas (`single_flight.coalesced`).
+    """
+    return json.dumps({**read_cache.stats(), 'single_flight': read_flights.stats()})
+
+# Réplica local de product.product: carga masiva inicial + sondeo incremental por write_date
+CATALOGO_LOCAL = os.getenv('ODOO_CATALOGO_LOCAL', '1').lower() not in ('0', 'false', 'no')
+catalog_mirror = ProductCatalogMirror(
+    page_size=int(os.getenv('ODOO_CATALOGO_PAGE', '2000')),
+    poll_interval=float(os.getenv('ODOO_CATALOGO_POLL', '30')),
+    stock_refresh_interval=float(os.getenv('ODOO_CATALOGO_STOCK_REFRESH', '120')),
+    max_staleness=float(os.getenv('ODOO_CATALOGO_MAX_STALENESS', '300')),
+    fuzzy_min_score=float(os.getenv('ODOO_BUSQUEDA_DIFUSA_MIN', '0.3')),
+)
+
+# Réplica local de res.partner: sirve las búsquedas de clientes y su índice aproximado
+CLIENTES_LOCAL = os.getenv('ODOO_CLIENTES_LOCAL', '1').lower() not in ('0', 'false', 'no')
+partner_mirror = PartnerDirectoryMirror(
+    page_size=int(os.getenv('ODOO_CATALOGO_PAGE', '2000')),
+    poll_interval=float(os.getenv('ODOO_CLIENTES_POLL', '60')),
+    max_staleness=float(os.getenv('ODOO_CATALOGO_MAX_STALENESS', '300')),
+    fuzzy_min_score=float(os.getenv('ODOO_BUSQUEDA_DIFUSA_MIN', '0.3')),
+)
+
+# Búsquedas de varios nombres: cuántos se combinan con OR en un mismo search_read
+BUSQUEDA_LOTE = max(1, int(os.getenv('ODOO_BUSQUEDA_LOTE', '20')))
+MAX_NOMBRES_POR_BUSQUEDA = 50
+
+_warm_up_task: Optional[asyncio.Task] = None
+
+def start_warm_up() -> None:
+    """Lanza (una vez por proceso) la preparación de la conexión Odoo en el event loop actual."""
+    global _warm_up_task
+    if _warm_up_task is None:
+        _warm_up_task = asyncio.get_running_loop().create_task(warm_up_odoo(), name='odoo-warm-up')
+
+async def warm_up_odoo() -> None:
+    """
+    Autentica la sesión asíncrona, abre su pool con una llamada de verificación y arranca
+    las réplicas locales, mientras el cliente MCP hace `initialize`/`list_tools`. Antes esto
+    se hacía (con la sesión síncrona) antes de atender el handshake; si falla, las
+    herramientas lo reintentan en cada llamada.
+    """
+    started = asyncio.get_running_loop().time()
+    conn = await get_async_odoo_session()
+    if conn is None:
+        logger.error("Verificación inicial de conexión Odoo: FALLÓ. Revisa logs y configuración.")
+        return
+    try:
+        access_check = await conn.execute_kw('res.users', 'check_access_rights', ['read'], {'raise_exception': False})
+        logger.info("Verificación de acceso ('res.users', 'read'): %s", access_check)
     except Exception as e:
-        logger.error(f"Error inesperado durante conexión/autenticación Odoo: {type(e).__name__} - {e}", exc_info=True)
+        logger.warning("Fallo en llamada de verificación de acceso post-conexión: %s", e, exc_info=True)
+    catalogo_local_activo()
+    clientes_local_activo()
+    logger.info("Conexión Odoo preparada en %.2fs.", asyncio.get_running_loop().time() - started)
+
+def catalogo_local_activo() -> bool:
+    """Arranca (si hace falta) la sincronización del catálogo y dice si puede usarse."""
+    if not CATALOGO_LOCAL:
+        return False
+    catalog_mirror.ensure_started(get_async_odoo_session)
+    return True
+
+def clientes_local_activo() -> bool:
+    """Arranca (si hace falta) la sincronización de clientes y dice si puede usarse."""
+    if not CLIENTES_LOCAL:
+        return False
+    partner_mirror.ensure_started(get_async_odoo_session)
+    return True
+
+async def sugerencias_difusas(conn: AsyncOdooSession, mirror, queries: List[str], fields: List[str],
+                              limit: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Registros parecidos a cada consulta según el índice de trigramas de la réplica (sin
+    tildes, tolerante a erratas de transcripción). Si la réplica no está fresca, los datos de
+    todas las consultas se releen de Odoo con un único `read`. Cada fila lleva su `score`.
+    """
+    ranked = {query: mirror.fuzzy_search(query, limit) for query in queries}
+    ids = list(dict.fromkeys(rid for pairs in ranked.values() for rid, _ in pairs))
+    if not ids:
+        return {query: [] for query in queries}
+    rows = mirror.get_many(ids)
+    if rows is None:
+        rows = await odoo_read(conn, mirror.MODEL, 'read', [ids], {'fields': fields})
+    by_id = {r['id']: r for r in rows}
+    sugerencias: Dict[str, List[Dict[str, Any]]] = {}
+    for query, pairs in ranked.items():
+        sugerencias[query] = [dict(by_id[rid], score=round(score, 2)) for rid, score in pairs if rid in by_id]
+        logger.info("Índice difuso de %s: %s sugerencia(s) para '%s'.", mirror.MODEL, len(sugerencias[query]), query)
+    return sugerencias
+
+def _dominio_nombres(nombres: List[str]) -> List[Any]:
+    """Dominio `name ilike n1 OR name ilike n2 ...` en notación polaca de Odoo."""
+    return ['|'] * (len(nombres) - 1) + [['name', 'ilike', nombre] for nombre in nombres]
+
+async def buscar_por_nombres(conn: AsyncOdooSession, mirror, usar_local: bool, nombres: List[str],
+                             fields: List[str], limit: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Resuelve varias búsquedas `name ilike` a la vez y agrupa los resultados por nombre.
+
+    Primero en la réplica local (si está fresca); el resto con un único `search_read` por
+    lote de ODOO_BUSQUEDA_LOTE nombres combinados con OR. Si un lote llega al límite de
+    filas, los nombres que se quedaron cortos se completan con búsquedas individuales
+    concurrentes, así cada grupo coincide con lo que devolvería la búsqueda por separado.
+    """
+    resultados: Dict[str, List[Dict[str, Any]]] = {}
+    pendientes: List[str] = []
+    for nombre in nombres:
+        filas = mirror.search(nombre, limit) if usar_local else None
+        if filas is None:
+            pendientes.append(nombre)
+        else:
+            resultados[nombre] = filas
+    for start in range(0, len(pendientes), BUSQUEDA_LOTE):
+        lote = pendientes[start:start + BUSQUEDA_LOTE]
+        lote_limit = limit * len(lote) * 4
+        logger.debug("Odoo Call: model='%s', method='search_read' combinado para %s nombre(s), limit=%s", mirror.MODEL, len(lote), lote_limit)
+        filas = await odoo_read(conn, mirror.MODEL, 'search_read', [_dominio_nombres(lote)],
+                                {'fields': fields, 'limit': lote_limit})
+        for nombre in lote:
+            needle = nombre.casefold()
+            resultados[nombre] = [f for f in filas if needle in (f.get('name') or '').casefold()][:limit]
+        if len(filas) >= lote_limit:
+            cortos = [n for n in lote if len(resultados[n]) < limit]
+            completos = await asyncio.gather(*(
+                odoo_read(conn, mirror.MODEL, 'search_read', [[['name', 'ilike', n]]], {'fields': fields, 'limit': limit})
+                for n in cortos))
+            resultados.update(zip(cortos, completos))
+    return resultados
+
+def _normalizar_nombres(nombres: Any) -> Optional[List[str]]:
+    """Lista de nombres sin vacíos ni duplicados (ignorando mayúsculas); None si no es válida."""
+    if not isinstance(nombres, list) or not all(isinstance(n, str) for n in nombres):
         return None
+    vistos = set()
+    limpios = []
+    for nombre in (n.strip() for n in nombres):
+        if nombre and nombre.casefold() not in vistos:
+            vistos.add(nombre.casefold())
+            limpios.append(nombre)
+    return limpios
+
+# Validación previa de líneas de cotización: una sola lectura masiva de productos
+PRODUCT_CHECK_FIELDS = ['id', 'name', 'sale_ok', 'type', 'qty_available', 'active']
+_tiene_is_storable: Optional[bool] = None  # Odoo 18+: se averigua una vez con fields_get
 
-# --- 5. Herramientas MCP ---
-@app.tool()
-def buscar_cliente(nombre_cliente: str) -> str:
+async def campo_is_storable(conn: AsyncOdooSession) -> bool:
+    """Si `product.product` tiene `is_storable` (Odoo 18+, donde los almacenables son `type == 'consu'`)."""
+    global _tiene_is_storable
+    if _tiene_is_storable is None:
+        try:
+            campos = await conn.execute_kw('product.product', 'fields_get', [['is_storable']], {'attributes': ['type']})
+            _tiene_is_storable = 'is_storable' in campos
+        except xmlrpc.client.Fault as e:
+            logger.warning("fields_get de product.product no disponible (%s): se asume Odoo anterior a 18.", e.faultString)
+            _tiene_is_storable = False
+    return _tiene_is_storable
+
+def es_almacenable(producto: Dict[str, Any]) -> bool:
+    """Producto con stock controlado: `type == 'product'` hasta Odoo 17, `is_storable` desde Odoo 18.
+    Los consumibles y servicios no tienen stock (su `qty_available` es 0) y no se comprueban."""
+    return producto.get('type') == 'product' or bool(producto.get('is_storable'))
+
+def validar_formato_lineas(lineas: Any) -> Tuple[List[str], Dict[int, float]]:
+    """
+    Comprueba la forma de las líneas sin tocar Odoo.
+
+    Returns:
+        (errores, cantidad total pedida por product_id)
+    """
+    if not isinstance(lineas, list) or not lineas:
+        return ["Se requiere al menos una línea de producto."], {}
+    errores: List[str] = []
+    pedidas: Dict[int, float] = {}
+    for linea in lineas:
+        if not isinstance(linea, dict) or 'product_id' not in linea or 'product_uom_qty' not in linea:
+            errores.append(f"Formato de línea inválido: {linea}. Se requiere 'product_id' y 'product_uom_qty'.")
+            continue
+        product_id = linea['product_id']
+        if isinstance(product_id, bool) or not isinstance(product_id, int) or product_id <= 0:
+            errores.append(f"ID de producto inválido en línea: {linea}")
+            continue
+        try:
+            qty = float(linea['product_uom_qty'])
+        except (ValueError, TypeError):
+            errores.append(f"Cantidad no numérica en línea: {linea}")
+            continue
+        if qty <= 0:
+            errores.append(f"Cantidad debe ser positiva en línea: {linea}")
+            continue
+        pedidas[product_id] = pedidas.get(product_id, 0.0) + qty
+    return errores, pedidas
+
+async def leer_productos(conn: AsyncOdooSession, product_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Datos de validación de varios productos. El stock de lo que se va a cotizar se lee en
+    vivo (sin réplica ni caché) con un único `search_read` por id, que incluye archivados y
+    no falla por ids inexistentes, a diferencia de `read`; solo se ahorra si la réplica
+    fresca ya tiene todos los productos y ninguno es almacenable (en Odoo 18+ la réplica no
+    lo sabe de los consumibles, así que esos también se leen).
+    """
+    productos: Dict[int, Dict[str, Any]] = {}
+    locales = catalog_mirror.get_many(product_ids) if catalogo_local_activo() else None
+    for p in locales or []:
+        productos[p['id']] = dict(p, active=True)
+    is_storable = await campo_is_storable(conn)
+    sin_stock = ('service',) if is_storable else ('service', 'consu')
+    en_vivo = [pid for pid in product_ids if productos.get(pid, {}).get('type') not in sin_stock]
+    if en_vivo:
+        domain = [['id', 'in', en_vivo]]
+        campos = PRODUCT_CHECK_FIELDS + ['is_storable'] if is_storable else PRODUCT_CHECK_FIELDS
+        logger.debug("Odoo Call: model='product.product', method='search_read', domain=%s (validación, stock en vivo)", domain)
+        filas = await conn.execute_kw('product.product', 'search_read', [domain],
+                                      {'fields': campos, 'context': {'active_test': False}})
+        productos.update((p['id'], p) for p in filas)
+    return productos
+
+async def leer_clientes(conn: AsyncOdooSession, partner_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Como `leer_productos`, para clientes (`res.partner`): réplica local y un único `search_read`."""
+    clientes: Dict[int, Dict[str, Any]] = {}
+    locales = partner_mirror.get_many(partner_ids) if clientes_local_activo() else None
+    for c in locales or []:
+        clientes[c['id']] = dict(c, active=True)
+    faltan = [pid for pid in partner_ids if pid not in clientes]
+    if faltan:
+        filas = await odoo_read(conn, 'res.partner', 'search_read', [[['id', 'in', faltan]]],
+                                {'fields': ['id', 'name', 'active'], 'context': {'active_test': False}})
+        clientes.update((c['id'], c) for c in filas)
+    return clientes
+
+def comprobar_productos(pedidas: Dict[int, float], productos: Dict[int, Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """
+    Reglas previas al `create`: el producto existe, está activo y es vendible (errores) y
+    hay stock suficiente para lo pedido (advertencia; solo para productos almacenables).
+
+    Returns:
+        (errores, advertencias)
+    """
+    errores: List[str] = []
+    advertencias: List[str] = []
+    for product_id, qty in pedidas.items():
+        p = productos.get(product_id)
+        if p is None:
+            errores.append(f"El producto ID {product_id} no existe.")
+        elif not p.get('active', True):
+            errores.append(f"El producto '{p.get('name')}' (ID {product_id}) está archivado.")
+        elif not p.get('sale_ok'):
+            errores.append(f"El producto '{p.get('name')}' (ID {product_id}) no se puede vender.")
+        elif es_almacenable(p) and (p.get('qty_available') or 0) < qty:
+            advertencias.append(f"Stock insuficiente de '{p.get('name')}' (ID {product_id}): se piden {qty:g}, disponibles {p.get('qty_available') or 0:g}.")
+    return errores, advertencias
+
+# Resultados de herramientas: JSON compacto con las filas en columnas (los nombres de campo
+# una sola vez) y un resumen breve opcional, en lugar de prosa que el LLM tiene que re-leer.
+RESUMEN_RESULTADOS = os.getenv('MCP_RESUMEN_RESULTADOS', '1').lower() not in ('0', 'false', 'no')
+CAMPOS_CLIENTE = ['id', 'name', 'email', 'phone']
+CAMPOS_PRODUCTO = ['id', 'name', 'default_code', 'list_price', 'qty_available']
+
+def edad_stock_max(desde_replica: bool) -> int:
+    """
+    Antigüedad máxima, en segundos, del `qty_available` de una respuesta: desde la réplica,
+    el tiempo desde su último refresco de stock; desde Odoo, el TTL de la caché de productos.
+    """
+    edad = catalog_mirror.stock_age() if desde_replica else None
+    return math.ceil(edad if edad is not None else read_cache.ttl_for('product.product'))
+
+def filas(registros: List[Dict[str, Any]], columnas: List[str]) -> List[List[Any]]:
+    """Registros de Odoo como listas de valores en el orden de `columnas` (`False` de Odoo -> null)."""
+    return [[None if r.get(c) is False else r.get(c) for c in columnas] for r in registros]
+
+def resultado(resumen: Optional[str] = None, **datos: Any) -> str:
+    """Serializa el resultado de una herramienta en JSON compacto (sin espacios ni claves nulas)."""
+    payload: Dict[str, Any] = {'resumen': resumen} if resumen and RESUMEN_RESULTADOS else {}
+    payload.update((k, v) for k, v in datos.items() if v is not None)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str)
+
+@app.resource("odoo://catalogo/estadisticas", mime_type="application/json")
+def estadisticas_catalogo() -> str:
+    """Tamaño, frescura y uso de las réplicas locales (catálogo de productos y clientes)."""
+    return json.dumps({'enabled': CATALOGO_LOCAL, **catalog_mirror.stats(),
+                       'clientes': {'enabled': CLIENTES_LOCAL, **partner_mirror.stats()}})
+
+# --- 6. Herramientas MCP ---
+@herramienta()
+async def buscar_cliente(nombre_cliente: str) -> str:
     """
     Busca clientes en Odoo cuyos nombres coincidan (parcialmente, sin importar mayúsculas/minúsculas)
-    con el nombre proporcionado. Devuelve ID, Nombre, Email, Teléfono (máx 5).
+    con el nombre proporcionado. Devuelve JSON con `columnas` (id, name, email, phone) y `filas` (máx 5).
+    Si no hay coincidencias exactas, sugiere clientes con nombre o email parecido (sin tildes,
+    tolerante a erratas) indicando su similitud.
     """
-    logger.info(f"Ejecutando herramienta 'buscar_cliente' con nombre: '{nombre_cliente}'")
+    logger.info("Ejecutando herramienta 'buscar_cliente' con nombre: '%s'", nombre_cliente)
     if not nombre_cliente: return "Por favor, proporciona un nombre de cliente para buscar."
-    conn = get_odoo_connection_details()
+    conn = await get_async_odoo_session()
     if not conn: return "Error: No se pudo conectar con Odoo para buscar el cliente."
     try:
         domain = [['name', 'ilike', nombre_cliente]]
-        fields = ['id', 'name', 'email', 'phone']
+        fields = CAMPOS_CLIENTE
         limit = 5
-        logger.debug(f"Odoo Call: model='res.partner', method='search_read', domain={domain}, fields={fields}, limit={limit}")
-        clientes = conn['models'].execute_kw(conn['db'], conn['uid'], conn['password'],'res.partner','search_read',[domain],{'fields': fields, 'limit': limit})
-        logger.info(f"Odoo devolvió {len(clientes)} cliente(s) para '{nombre_cliente}'.")
-        if not clientes: return f"No se encontraron clientes que coincidan con '{nombre_cliente}'."
-        respuesta = f"Clientes encontrados para '{nombre_cliente}':\n"
-        for c in clientes:
-            respuesta += f"  - ID: {c.get('id', 'N/A')}, Nombre: {c.get('name', 'N/A')}, Email: {c.get('email', 'N/A')}, Teléfono: {c.get('phone', 'N/A')}\n"
-        return respuesta.strip()
+        local = clientes_local_activo()
+        clientes = partner_mirror.search(nombre_cliente, limit) if local else None
+        if clientes is not None:
+            logger.info("Réplica local devolvió %s cliente(s) para '%s'.", len(clientes), nombre_cliente)
+        else:
+            logger.debug("Odoo Call: model='res.partner', method='search_read', domain=%s, fields=%s, limit=%s", domain, fields, limit)
+            clientes = await odoo_read(conn, 'res.partner','search_read',[domain],{'fields': fields, 'limit': limit})
+            logger.info("Odoo devolvió %s cliente(s) para '%s'.", len(clientes), nombre_cliente)
+        if not clientes:
+            similares = (await sugerencias_difusas(conn, partner_mirror, [nombre_cliente], fields, limit))[nombre_cliente] if local else []
+            if not similares: return resultado(f"No se encontraron clientes que coincidan con '{nombre_cliente}'.", filas=[])
+            return resultado(f"Sin coincidencias exactas para '{nombre_cliente}'; clientes parecidos.", aproximado=True,
+                             columnas=CAMPOS_CLIENTE, filas=filas(similares, CAMPOS_CLIENTE), similitud=[c['score'] for c in similares])
+        return resultado(f"{len(clientes)} cliente(s) para '{nombre_cliente}'.", columnas=CAMPOS_CLIENTE, filas=filas(clientes, CAMPOS_CLIENTE))
     except xmlrpc.client.Fault as e:
-        logger.error(f"Error XML-RPC Odoo en buscar_cliente: {e.faultCode} - {e.faultString}", exc_info=True)
+        logger.error("Error XML-RPC Odoo en buscar_cliente: %s - %s", e.faultCode, e.faultString, exc_info=True)
         return f"Error de Odoo al buscar cliente: {e.faultString}"
     except Exception as e:
-        logger.error(f"Error inesperado en buscar_cliente: {type(e).__name__} - {e}", exc_info=True)
+        logger.error("Error inesperado en buscar_cliente: %s - %s", type(e).__name__, e, exc_info=True)
         return f"Error inesperado del servidor al buscar cliente: {type(e).__name__}"
 
-@app.tool()
-def buscar_producto(nombre_producto: str) -> str:
+@herramienta()
+async def buscar_producto(nombre_producto: str) -> str:
     """
     Busca productos en Odoo cuyos nombres coincidan (parcialmente, sin importar mayúsculas/minúsculas)
-    con el nombre proporcionado. Devuelve ID, Nombre, Código, Precio, Cant. Disponible (máx 5).
+    con el nombre proporcionado. Devuelve JSON con `columnas` (id, name, default_code, list_price,
+    qty_available), `filas` (máx 5) y `stock_edad_max_s` (segundos que puede tener el stock mostrado).
+    Si no hay coincidencias exactas, sugiere productos con nombre o código parecido (sin tildes,
+    tolerante a erratas) indicando su similitud.
     """
-    logger.info(f"Ejecutando herramienta 'buscar_producto' con nombre: '{nombre_producto}'")
+    logger.info("Ejecutando herramienta 'buscar_producto' con nombre: '%s'", nombre_producto)
     if not nombre_producto: return "Por favor, proporciona un nombre de producto para buscar."
-    conn = get_odoo_connection_details()
+    conn = await get_async_odoo_session()
     if not conn: return "Error: No se pudo conectar con Odoo para buscar el producto."
     try:
         domain = [['name', 'ilike', nombre_producto]]
-        fields = ['id', 'name', 'default_code', 'list_price', 'qty_available']
+        fields = CAMPOS_PRODUCTO
         limit = 5
-        logger.debug(f"Odoo Call: model='product.product', method='search_read', domain={domain}, fields={fields}, limit={limit}")
-        productos = conn['models'].execute_kw(conn['db'], conn['uid'], conn['password'],'product.product','search_read',[domain],{'fields': fields, 'limit': limit})
-        logger.info(f"Odoo devolvió {len(productos)} producto(s) para '{nombre_producto}'.")
-        if not productos: return f"No se encontraron productos que coincidan con '{nombre_producto}'."
-        respuesta = f"Productos encontrados para '{nombre_producto}':\n"
-        for p in productos:
-            respuesta += f"  - ID: {p.get('id', 'N/A')}, Nombre: {p.get('name', 'N/A')}, Código: {p.get('default_code', 'N/A')}, Precio: {p.get('list_price', 'N/A')}, Disp: {p.get('qty_available', 'N/A')}\n"
-        return respuesta.strip()
+        productos = catalog_mirror.search(nombre_producto, limit) if catalogo_local_activo() else None
+        desde_replica = productos is not None
+        if productos is not None:
+            logger.info("Catálogo local devolvió %s producto(s) para '%s'.", len(productos), nombre_producto)
+        else:
+            logger.debug("Odoo Call: model='product.product', method='search_read', domain=%s, fields=%s, limit=%s", domain, fields, limit)
+            productos = await odoo_read(conn, 'product.product','search_read',[domain],{'fields': fields, 'limit': limit})
+            logger.info("Odoo devolvió %s producto(s) para '%s'.", len(productos), nombre_producto)
+        if not productos:
+            desde_replica = catalog_mirror.is_fresh()  # sugerencias_difusas lee de la réplica si está fresca
+            similares = (await sugerencias_difusas(conn, catalog_mirror, [nombre_producto], fields, limit))[nombre_producto] if CATALOGO_LOCAL else []
+            if not similares: return resultado(f"No se encontraron productos que coincidan con '{nombre_producto}'.", filas=[])
+            return resultado(f"Sin coincidencias exactas para '{nombre_producto}'; productos parecidos.", aproximado=True,
+                             columnas=CAMPOS_PRODUCTO, filas=filas(similares, CAMPOS_PRODUCTO), similitud=[p['score'] for p in similares],
+                             stock_edad_max_s=edad_stock_max(desde_replica))
+        return resultado(f"{len(productos)} producto(s) para '{nombre_producto}'.", columnas=CAMPOS_PRODUCTO, filas=filas(productos, CAMPOS_PRODUCTO),
+                         stock_edad_max_s=edad_stock_max(desde_replica))
     except xmlrpc.client.Fault as e:
-        logger.error(f"Error XML-RPC Odoo en buscar_producto: {e.faultCode} - {e.faultString}", exc_info=True)
+        logger.error("Error XML-RPC Odoo en buscar_producto: %s - %s", e.faultCode, e.faultString, exc_info=True)
         return f"Error de Odoo al buscar producto: {e.faultString}"
     except Exception as e:
-        logger.error(f"Error inesperado en buscar_producto: {type(e).__name__} - {e}", exc_info=True)
+        logger.error("Error inesperado en buscar_producto: %s - %s", type(e).__name__, e, exc_info=True)
         return f"Error inesperado del servidor al buscar producto: {type(e).__name__}"
 
-@app.tool()
-def crear_cotizacion(cliente_id: int, lineas: List[Dict[str, Any]]) -> str:
+@herramienta()
+async def buscar_varios_productos(nombres_productos: List[str]) -> str:
+    """
+    Busca varios productos a la vez (p. ej. todas las líneas de una cotización) en una sola llamada.
+    Args: nombres_productos (Lista de nombres o fragmentos de nombre, máx 50).
+    Devuelve JSON con `columnas` (id, name, default_code, list_price, qty_available), `stock_edad_max_s`
+    (segundos que puede tener el stock mostrado) y, por nombre buscado, sus `filas` (máx 5) o
+    productos parecidos si un nombre no tiene coincidencias exactas.
+    """
+    logger.info("Ejecutando herramienta 'buscar_varios_productos' con nombres: %s", nombres_productos)
+    nombres = _normalizar_nombres(nombres_productos)
+    if not nombres: return "Por favor, proporciona una lista con al menos un nombre de producto para buscar."
+    if len(nombres) > MAX_NOMBRES_POR_BUSQUEDA: return f"Error: Se pueden buscar como máximo {MAX_NOMBRES_POR_BUSQUEDA} productos por llamada."
+    conn = await get_async_odoo_session()
+    if not conn: return "Error: No se pudo conectar con Odoo para buscar los productos."
+    try:
+        fields = CAMPOS_PRODUCTO
+        limit = 5
+        # Con la réplica fresca, tanto las búsquedas como las sugerencias se sirven de ella
+        desde_replica = catalogo_local_activo() and catalog_mirror.is_fresh()
+        resultados = await buscar_por_nombres(conn, catalog_mirror, catalogo_local_activo(), nombres, fields, limit)
+        sin_resultado = [n for n in nombres if not resultados[n]]
+        similares = await sugerencias_difusas(conn, catalog_mirror, sin_resultado, fields, limit) if CATALOGO_LOCAL and sin_resultado else {}
+        logger.info("buscar_varios_productos: %s/%s nombre(s) con coincidencias exactas.", len(nombres) - len(sin_resultado), len(nombres))
+        grupos: List[Dict[str, Any]] = []
+        for nombre in nombres:
+            if resultados[nombre]:
+                grupos.append({'nombre': nombre, 'filas': filas(resultados[nombre], CAMPOS_PRODUCTO)})
+            elif similares.get(nombre):
+                grupos.append({'nombre': nombre, 'aproximado': True, 'filas': filas(similares[nombre], CAMPOS_PRODUCTO),
+                               'similitud': [r['score'] for r in similares[nombre]]})
+            else:
+                grupos.append({'nombre': nombre, 'filas': []})
+        return resultado(f"{len(nombres) - len(sin_resultado)} de {len(nombres)} nombre(s) con coincidencias exactas.",
+                         columnas=CAMPOS_PRODUCTO, resultados=grupos, stock_edad_max_s=edad_stock_max(desde_replica))
+    except xmlrpc.client.Fault as e:
+        logger.error("Error XML-RPC Odoo en buscar_varios_productos: %s - %s", e.faultCode, e.faultString, exc_info=True)
+        return f"Error de Odoo al buscar productos: {e.faultString}"
+    except Exception as e:
+        logger.error("Error inesperado en buscar_varios_productos: %s - %s", type(e).__name__, e, exc_info=True)
+        return f"Error inesperado del servidor al buscar productos: {type(e).__name__}"
+
+@herramienta()
+async def buscar_varios_clientes(nombres_clientes: List[str]) -> str:
+    """
+    Busca varios clientes a la vez en una sola llamada.
+    Args: nombres_clientes (Lista de nombres o fragmentos de nombre, máx 50).
+    Devuelve JSON con `columnas` (id, name, email, phone) y, por nombre buscado, sus `filas` (máx 5)
+    o clientes parecidos si un nombre no tiene coincidencias exactas.
+    """
+    logger.info("Ejecutando herramienta 'buscar_varios_clientes' con nombres: %s", nombres_clientes)
+    nombres = _normalizar_nombres(nombres_clientes)
+    if not nombres: return "Por favor, proporciona una lista con al menos un nombre de cliente para buscar."
+    if len(nombres) > MAX_NOMBRES_POR_BUSQUEDA: return f"Error: Se pueden buscar como máximo {MAX_NOMBRES_POR_BUSQUEDA} clientes por llamada."
+    conn = await get_async_odoo_session()
+    if not conn: return "Error: No se pudo conectar con Odoo para buscar los clientes."
+    try:
+        fields = CAMPOS_CLIENTE
+        limit = 5
+        local = clientes_local_activo()
+        resultados = await buscar_por_nombres(conn, partner_mirror, local, nombres, fields, limit)
+        sin_resultado = [n for n in nombres if not resultados[n]]
+        similares = await sugerencias_difusas(conn, partner_mirror, sin_resultado, fields, limit) if local and sin_resultado else {}
+        logger.info("buscar_varios_clientes: %s/%s nombre(s) con coincidencias exactas.", len(nombres) - len(sin_resultado), len(nombres))
+        grupos: List[Dict[str, Any]] = []
+        for nombre in nombres:
+            if resultados[nombre]:
+                grupos.append({'nombre': nombre, 'filas': filas(resultados[nombre], CAMPOS_CLIENTE)})
+            elif similares.get(nombre):
+                grupos.append({'nombre': nombre, 'aproximado': True, 'filas': filas(similares[nombre], CAMPOS_CLIENTE),
+                               'similitud': [r['score'] for r in similares[nombre]]})
+            else:
+                grupos.append({'nombre': nombre, 'filas': []})
+        return resultado(f"{len(nombres) - len(sin_resultado)} de {len(nombres)} nombre(s) con coincidencias exactas.",
+                         columnas=CAMPOS_CLIENTE, resultados=grupos)
+    except xmlrpc.client.Fault as e:
+        logger.error("Error XML-RPC Odoo en buscar_varios_clientes: %s - %s", e.faultCode, e.faultString, exc_info=True)
+        return f"Error de Odoo al buscar clientes: {e.faultString}"
+    except Exception as e:
+        logger.error("Error inesperado en buscar_varios_clientes: %s - %s", type(e).__name__, e, exc_info=True)
+        return f"Error inesperado del servidor al buscar clientes: {type(e).__name__}"
+
+@herramienta()
+async def crear_cotizacion(cliente_id: int, lineas: List[Dict[str, Any]]) -> str:
     """
     Crea una nueva cotización (Orden de Venta) en Odoo para un cliente específico con las líneas de producto dadas.
     Args: cliente_id (ID del cliente), lineas (Lista de dicts {'product_id': ID_PROD, 'product_uom_qty': CANTIDAD}).
-    Returns: ID de la cotización creada o mensaje de error.
+    Antes de crear comprueba que todos los productos existen y son vendibles (si alguno falla no se crea nada)
+    y advierte si no hay stock suficiente.
+    Returns: JSON con `cotizacion_id` (y `advertencias` de stock si las hay) o mensaje de error.
     Ejemplo lineas: [{'product_id': 40, 'product_uom_qty': 2}, {'product_id': 35, 'product_uom_qty': 1}]
     """
-    logger.info(f"Ejecutando herramienta 'crear_cotizacion' para cliente ID: {cliente_id}")
-    logger.debug(f"Líneas recibidas: {lineas}")
-    # (Validaciones de entrada omitidas por brevedad, pero presentes en la versión anterior)
+    logger.info("Ejecutando herramienta 'crear_cotizacion' para cliente ID: %s", cliente_id)
+    logger.debug("Líneas recibidas: %s", lineas)
     if not isinstance(cliente_id, int) or cliente_id <= 0: return "Error: Se requiere un ID de cliente válido."
-    if not isinstance(lineas, list) or not lineas: return "Error: Se requiere al menos una línea de producto."
-    # Aquí irían las validaciones detalladas de cada línea como antes...
+    errores, pedidas = validar_formato_lineas(lineas)
+    if errores: return "Error: " + " ".join(errores)
 
-    conn = get_odoo_connection_details()
+    conn = await get_async_odoo_session()
     if not conn: return "Error: No se pudo conectar con Odoo para crear la cotización."
     try:
-        order_lines_commands = []
-        for linea in lineas:
-             # Validar formato de línea aquí también es buena idea
-             if not isinstance(linea, dict) or 'product_id' not in linea or 'product_uom_qty' not in linea:
-                 return f"Error: Formato de línea inválido: {linea}. Se requiere 'product_id' y 'product_uom_qty'."
-             try:
-                qty = float(linea['product_uom_qty'])
-                if qty <= 0: return f"Error: Cantidad debe ser positiva en línea: {linea}"
-             except (ValueError, TypeError):
-                 return f"Error: Cantidad no numérica en línea: {linea}"
-
-             linea_vals = {'product_id': linea['product_id'],'product_uom_qty': linea['product_uom_qty'],}
-             order_lines_commands.append((0, 0, linea_vals))
+        # Validación previa: una lectura masiva (o la réplica local) en lugar de un create fallido
+        errores, advertencias = comprobar_productos(pedidas, await leer_productos(conn, list(pedidas)))
+        if errores:
+            logger.info("Cotización rechazada antes de crear: %s", errores)
+            return "Error: No se creó la cotización.\n" + "\n".join(f"  - {e}" for e in errores)
+
+        order_lines_commands = [(0, 0, {'product_id': linea['product_id'], 'product_uom_qty': linea['product_uom_qty']})
+                                for linea in lineas]
 
         valores_cotizacion = {'partner_id': cliente_id,'order_line': order_lines_commands,}
-        logger.debug(f"Odoo Call: model='sale.order', method='create', values={valores_cotizacion}")
-        cotizacion_id = conn['models'].execute_kw(conn['db'], conn['uid'], conn['password'],'sale.order','create',[valores_cotizacion])
-        logger.info(f"Cotización creada exitosamente en Odoo con ID: {cotizacion_id}")
-        return f"Cotización creada exitosamente con ID: {cotizacion_id}"
+        logger.debug("Odoo Call: model='sale.order', method='create', values=%s", valores_cotizacion)
+        cotizacion_id = await conn.execute_kw('sale.order','create',[valores_cotizacion])
+        logger.info("Cotización creada exitosamente en Odoo con ID: %s", cotizacion_id)
+        invalidar_lecturas('sale.order')
+        invalidar_lecturas('product.product', STOCK_FIELDS, ids=[l['product_id'] for l in lineas])
+        return resultado(f"Cotización creada con ID {cotizacion_id}.", cotizacion_id=cotizacion_id,
+                         advertencias=advertencias or None)
     except xmlrpc.client.Fault as e:
-        logger.error(f"Error XML-RPC Odoo en crear_cotizacion: {e.faultCode} - {e.faultString}", exc_info=True)
+        logger.error("Error XML-RPC Odoo en crear_cotizacion: %s - %s", e.faultCode, e.faultString, exc_info=True)
         error_msg = f"Error de Odoo al crear cotización: {e.faultString}"
         if "Missing required fields" in e.faultString: error_msg += ". Posiblemente falten campos obligatorios."
         elif "Not possible to determine the pricelist" in e.faultString: error_msg += ". Cliente sin tarifa?"
         return error_msg
     except Exception as e:
-        logger.error(f"Error inesperado en crear_cotizacion: {type(e).__name__} - {e}", exc_info=True)
+        logger.error("Error inesperado en crear_cotizacion: %s - %s", type(e).__name__, e, exc_info=True)
         return f"Error inesperado del servidor al crear cotización: {type(e).__name__}"
 
-@app.tool()
-def confirmar_cotizacion(cotizacion_id: int) -> str:
+# Creación masiva: cotizaciones por llamada a `create` y máximo por invocación
+LOTE_COTIZACIONES = max(1, int(os.getenv('ODOO_LOTE_COTIZACIONES', '50')))
+MAX_COTIZACIONES_POR_LLAMADA = 1000
+
+@herramienta()
+async def crear_cotizaciones(cotizaciones: List[Dict[str, Any]]) -> str:
+    """
+    Crea muchas cotizaciones de una vez (importación de hojas de cálculo, pedidos de voz en cola).
+    Args: cotizaciones (Lista de dicts {'cliente_id': ID_CLIENTE, 'lineas': [{'product_id': ID_PROD, 'product_uom_qty': CANTIDAD}, ...]}).
+    Todos los clientes y productos se validan antes de crear nada; las cotizaciones inválidas se
+    informan y el resto se crea igualmente. Devuelve JSON con `creadas` ([posición, ID]), `fallidas`
+    y `advertencias` ([posición, mensaje]); las posiciones empiezan en 1.
+    """
+    logger.info("Ejecutando herramienta 'crear_cotizaciones' con %s cotización(es)", len(cotizaciones) if isinstance(cotizaciones, list) else '?')
+    if not isinstance(cotizaciones, list) or not cotizaciones: return "Error: Se requiere una lista con al menos una cotización."
+    if len(cotizaciones) > MAX_COTIZACIONES_POR_LLAMADA: return f"Error: Se pueden crear como máximo {MAX_COTIZACIONES_POR_LLAMADA} cotizaciones por llamada."
+
+    # 1. Forma de cada cotización (sin Odoo)
+    errores: Dict[int, List[str]] = {}
+    pedidas: Dict[int, Dict[int, float]] = {}
+    for pos, cot in enumerate(cotizaciones):
+        if not isinstance(cot, dict):
+            errores[pos] = [f"Formato inválido: {cot}. Se requiere {{'cliente_id', 'lineas'}}."]
+            continue
+        cliente_id = cot.get('cliente_id')
+        if isinstance(cliente_id, bool) or not isinstance(cliente_id, int) or cliente_id <= 0:
+            errores[pos] = ["Se requiere un ID de cliente válido."]
+            continue
+        errores_lineas, pedidas[pos] = validar_formato_lineas(cot.get('lineas'))
+        if errores_lineas:
+            errores[pos] = errores_lineas
+
+    conn = await get_async_odoo_session()
+    if not conn: return "Error: No se pudo conectar con Odoo para crear las cotizaciones."
+    try:
+        # 2. Validación por conjuntos: una lectura de todos los clientes y otra de todos los productos
+        validas = [pos for pos in range(len(cotizaciones)) if pos not in errores]
+        partner_ids = sorted({cotizaciones[pos]['cliente_id'] for pos in validas})
+        product_ids = sorted({pid for pos in validas for pid in pedidas[pos]})
+        clientes = await leer_clientes(conn, partner_ids) if partner_ids else {}
+        productos = await leer_productos(conn, product_ids) if product_ids else {}
+        advertencias: Dict[int, List[str]] = {}
+        for pos in validas:
+            cliente = clientes.get(cotizaciones[pos]['cliente_id'])
+            errores_cot, advertencias[pos] = comprobar_productos(pedidas[pos], productos)
+            if cliente is None:
+                errores_cot.insert(0, f"El cliente ID {cotizaciones[pos]['cliente_id']} no existe.")
+            elif not cliente.get('active', True):
+                errores_cot.insert(0, f"El cliente '{cliente.get('name')}' (ID {cliente['id']}) está archivado.")
+            if errores_cot:
+                errores[pos] = errores_cot
+
+        # 3. Creación en lotes; si un lote falla en Odoo, se aíslan las cotizaciones culpables
+        a_crear = [pos for pos in validas if pos not in errores]
+        creadas: Dict[int, int] = {}
+        for start in range(0, len(a_crear), LOTE_COTIZACIONES):
+            lote = a_crear[start:start + LOTE_COTIZACIONES]
+            valores = [{'partner_id': cotizaciones[pos]['cliente_id'],
+                        'order_line': [(0, 0, {'product_id': l['product_id'], 'product_uom_qty': l['product_uom_qty']})
+                                       for l in cotizaciones[pos]['lineas']]} for pos in lote]
+            logger.debug("Odoo Call: model='sale.order', method='create' con %s cotización(es)", len(valores))
+            try:
+                resultados = await llamar_aislando(conn, 'sale.order', 'create', valores)
+            except Exception as e:
+                # Sin respuesta válida de Odoo (conexión caída, 502 de un proxy, cuerpo ilegible) no se
+                # sabe si el lote llegó a crearse: no se reintenta y lo ya creado se informa igual
+                logger.error("Error de comunicación creando un lote de %s cotización(es): %s - %s", len(lote), type(e).__name__, e)
+                for pos in lote:
+                    errores[pos] = [f"Error de comunicación con Odoo ({type(e).__name__}): no se sabe si se creó, revisa Odoo antes de reintentar."]
+                continue
+            for pos, (ok, salida) in zip(lote, resultados):
+                if ok:
+                    creadas[pos] = salida
+                else:
+                    errores[pos] = [salida]
+        if creadas:
+            invalidar_lecturas('sale.order')
+            invalidar_lecturas('product.product', STOCK_FIELDS, ids={pid for pos in creadas for pid in pedidas[pos]})
+        logger.info("crear_cotizaciones: %s/%s creadas.", len(creadas), len(cotizaciones))
+
+        # Posiciones 1-based, en el mismo orden de la lista recibida
+        return resultado(f"Creadas {len(creadas)} de {len(cotizaciones)} cotizaciones.",
+                         creadas=[[pos + 1, creadas[pos]] for pos in sorted(creadas)],
+                         fallidas=[[pos + 1, " ".join(errores[pos])] for pos in sorted(errores)],
+                         advertencias=[[pos + 1, " ".join(advertencias[pos])] for pos in sorted(creadas) if advertencias.get(pos)] or None)
+    except xmlrpc.client.Fault as e:
+        logger.error("Error XML-RPC Odoo en crear_cotizaciones: %s - %s", e.faultCode, e.faultString, exc_info=True)
+        return f"Error de Odoo al crear cotizaciones: {e.faultString}"
+    except Exception as e:
+        logger.error("Error inesperado en crear_cotizaciones: %s - %s", type(e).__name__, e, exc_info=True)
+        return f"Error inesperado del servidor al crear cotizaciones: {type(e).__name__}"
+
+# Estados de sale.order desde los que `action_confirm` es válido
+ESTADOS_CONFIRMABLES = ('draft', 'sent')
+
+async def leer_estados(conn: AsyncOdooSession, cotizacion_ids: List[int]) -> Dict[int, str]:
+    """Estado de varias cotizaciones en un único `search_read` (los ids inexistentes no fallan)."""
+    filas = await odoo_read(conn, 'sale.order', 'search_read', [[['id', 'in', cotizacion_ids]]], {'fields': ['state']})
+    return {f['id']: f.get('state') for f in filas}
+
+def _tras_confirmar(cotizacion_ids: List[int]) -> None:
+    # Confirmar genera entregas/reservas: el stock cacheado de cualquier producto deja de ser fiable;
+    # la réplica no lo sirve hasta su siguiente sondeo de stock.quant, que se adelanta
+    invalidar_lecturas('sale.order', ids=cotizacion_ids)
+    invalidar_lecturas('product.product', STOCK_FIELDS)
+    catalog_mirror.mark_stock_stale()
+
+@herramienta()
+async def confirmar_cotizacion(cotizacion_id: int) -> str:
     """
     Confirma una cotización (Orden de Venta) en Odoo usando su ID.
-    Verifica el estado antes y después. La cotización debe estar en 'draft' o 'sent'.
+    La cotización debe estar en 'draft' o 'sent'; si no, se indica su estado actual.
     """
-    logger.info(f"Ejecutando herramienta 'confirmar_cotizacion' para ID: {cotizacion_id}")
+    logger.info("Ejecutando herramienta 'confirmar_cotizacion' para ID: %s", cotizacion_id)
     if not isinstance(cotizacion_id, int) or cotizacion_id <= 0: return "Error: ID de cotización inválido."
-    conn = get_odoo_connection_details()
+    conn = await get_async_odoo_session()
     if not conn: return "Error: No se pudo conectar con Odoo."
     try:
-        # Verificar estado previo
-        read_result = conn['models'].execute_kw(conn['db'], conn['uid'], conn['password'],'sale.order', 'read', [[cotizacion_id]], {'fields': ['state']})
-        if not read_result: return f"Error: No se encontró cotización con ID {cotizacion_id}."
-        estado_previo = read_result[0].get('state')
-        logger.info(f"Estado cotización {cotizacion_id} ANTES: '{estado_previo}'")
-        if estado_previo not in ['draft', 'sent']: return f"Error: Cotización {cotizacion_id} en estado '{estado_previo}', no se puede confirmar."
-
-        # Confirmar
-        logger.debug(f"Odoo Call: model='sale.order', method='action_confirm', args=[[{cotizacion_id}]]")
-        conn['models'].execute_kw(conn['db'], conn['uid'], conn['password'],'sale.order','action_confirm',[[cotizacion_id]])
-        logger.info(f"'action_confirm' llamado para cotización {cotizacion_id}.")
-
-        # Verificar estado posterior
-        read_result_after = conn['models'].execute_kw(conn['db'], conn['uid'], conn['password'],'sale.order', 'read', [[cotizacion_id]], {'fields': ['state']})
-        if not read_result_after: return f"Error inesperado: Cotización {cotizacion_id} no encontrada después de confirmar."
-        estado_posterior = read_result_after[0].get('state')
-        logger.info(f"Estado cotización {cotizacion_id} DESPUÉS: '{estado_posterior}'")
-
-        if estado_posterior == 'sale': return f"Cotización {cotizacion_id} confirmada. Nuevo estado: Pedido de Venta (sale)."
-        elif estado_posterior == estado_previo: return f"Se intentó confirmar cotización {cotizacion_id}, pero sigue en '{estado_posterior}'. Revisa Odoo."
-        else: return f"Cotización {cotizacion_id} procesada. Estado actual: '{estado_posterior}'."
+        # Camino optimista: Odoo ya rechaza (UserError) las órdenes que no están en draft/sent,
+        # así que la lectura previa de `state` sobra. El estado se lee después de confirmar:
+        # según la configuración puede ser 'sale' o 'done' (bloqueo automático de pedidos).
+        logger.debug("Odoo Call: model='sale.order', method='action_confirm', args=[[%s]]", cotizacion_id)
+        try:
+            await conn.execute_kw('sale.order','action_confirm',[[cotizacion_id]])
+        except xmlrpc.client.Fault:
+            # Solo al fallar se lee el estado, para explicar el motivo
+            estado = (await leer_estados(conn, [cotizacion_id])).get(cotizacion_id)
+            if estado is None: return f"Error: No se encontró cotización con ID {cotizacion_id}."
+            if estado not in ESTADOS_CONFIRMABLES: return f"Error: Cotización {cotizacion_id} en estado '{estado}', no se puede confirmar."
+            raise
+        logger.info("'action_confirm' completado para cotización %s.", cotizacion_id)
+        _tras_confirmar([cotizacion_id])
+        try:
+            estado = (await leer_estados(conn, [cotizacion_id])).get(cotizacion_id)
+        except Exception as e:
+            # La confirmación ya está hecha: no se convierte en error por no poder releer el estado
+            logger.warning("confirmar_cotizacion: no se pudo leer el estado de %s tras confirmar: %s - %s", cotizacion_id, type(e).__name__, e)
+            estado = None
+        return resultado(f"Cotización {cotizacion_id} confirmada (Pedido de Venta).", cotizacion_id=cotizacion_id, state=estado)
     except xmlrpc.client.Fault as e:
-        logger.error(f"Error XML-RPC Odoo en confirmar_cotizacion: {e.faultCode} - {e.faultString}", exc_info=True)
+        logger.error("Error XML-RPC Odoo en confirmar_cotizacion: %s - %s", e.faultCode, e.faultString, exc_info=True)
         error_msg = f"Error de Odoo al confirmar cotización {cotizacion_id}: {e.faultString}"
         if "You can not confirm a sales order which is empty." in e.faultString: error_msg += " La cotización no tiene líneas."
         return error_msg
     except Exception as e:
-        logger.error(f"Error inesperado en confirmar_cotizacion: {type(e).__name__} - {e}", exc_info=True)
+        logger.error("Error inesperado en confirmar_cotizacion: %s - %s", type(e).__name__, e, exc_info=True)
         return f"Error inesperado del servidor al confirmar cotización: {type(e).__name__}"
-@app.tool()
-def listar_productos() -> str:
+
+async def llamar_aislando(conn: AsyncOdooSession, model: str, method: str, items: List[Any]) -> List[Tuple[bool, Any]]:
+    """
+    `model.method(items)` en una sola llamada. Si Odoo la rechaza (la transacción completa
+    se deshace), se parte el lote en dos y se reintenta cada mitad para aislar los elementos
+    que fallan sin repetir una llamada por elemento.
+
+    Las mitades corren a la vez y cada una informa por su cuenta: si una pierde la conexión,
+    sus elementos se marcan como dudosos y lo que la otra ya creó o confirmó se devuelve igual.
+    Solo se propaga el error de conexión de la primera llamada, en la que no se aplicó nada más.
+
+    Returns:
+        Un (ok, resultado o mensaje de error) por elemento, en el mismo orden. Si el método
+        devuelve una lista del mismo tamaño (p. ej. `create`), cada elemento recibe el suyo.
+    """
+    try:
+        result = await conn.execute_kw(model, method, [items])
+    except xmlrpc.client.Fault as e:
+        if len(items) == 1:
+            return [(False, f"Error de Odoo: {e.faultString}")]
+        mitad = len(items) // 2
+        mitades = (items[:mitad], items[mitad:])
+        salidas = await asyncio.gather(*(llamar_aislando(conn, model, method, parte) for parte in mitades),
+                                       return_exceptions=True)
+        resultados: List[Tuple[bool, Any]] = []
+        for parte, salida in zip(mitades, salidas):
+            if isinstance(salida, list):
+                resultados += salida
+                continue
+            if not isinstance(salida, Exception):
+                raise salida  # Cancelación
+            # Sin respuesta de Odoo no se sabe si esta mitad llegó a aplicarse: no se reintenta
+            logger.error("llamar_aislando: %s.%s sin respuesta para %s elemento(s): %s - %s",
+                         model, method, len(parte), type(salida).__name__, salida)
+            resultados += [(False, f"Error de comunicación con Odoo ({type(salida).__name__}): no se sabe si se aplicó, "
+                                   "revisa Odoo antes de reintentar.")] * len(parte)
+        return resultados
+    if isinstance(result, list) and len(result) == len(items):
+        return [(True, r) for r in result]
+    return [(True, result)] * len(items)
+
+@herramienta()
+async def confirmar_cotizaciones(cotizacion_ids: List[int]) -> str:
+    """
+    Confirma varias cotizaciones (p. ej. el cierre del día) en una sola llamada.
+    Args: cotizacion_ids (Lista de IDs de cotizaciones en 'draft' o 'sent').
+    Devuelve JSON con `confirmadas`, `no_encontradas`, `no_confirmables` ([ID, estado]) y `errores` ([ID, mensaje]).
+    """
+    logger.info("Ejecutando herramienta 'confirmar_cotizaciones' para IDs: %s", cotizacion_ids)
+    if (not isinstance(cotizacion_ids, list) or not cotizacion_ids
+            or not all(isinstance(i, int) and not isinstance(i, bool) and i > 0 for i in cotizacion_ids)):
+        return "Error: Se requiere una lista de IDs de cotización válidos."
+    ids = list(dict.fromkeys(cotizacion_ids))
+    conn = await get_async_odoo_session()
+    if not conn: return "Error: No se pudo conectar con Odoo."
+    try:
+        estados = await leer_estados(conn, ids)
+        confirmables = [i for i in ids if estados.get(i) in ESTADOS_CONFIRMABLES]
+        try:
+            salidas = await llamar_aislando(conn, 'sale.order', 'action_confirm', confirmables) if confirmables else []
+        except Exception as e:
+            # Sin respuesta válida a la primera llamada la confirmación puede haberse aplicado entera
+            logger.error("confirmar_cotizaciones: sin respuesta de Odoo para %s cotización(es): %s - %s", len(confirmables), type(e).__name__, e)
+            salidas = [(False, f"Error de comunicación con Odoo ({type(e).__name__}): no se sabe si se aplicó, "
+                               "revisa Odoo antes de reintentar.")] * len(confirmables)
+        resultados = {i: (None if ok else error) for i, (ok, error) in zip(confirmables, salidas)}
+        confirmadas = [i for i, error in resultados.items() if error is None]
+        # Las dudosas también invalidan: si llegaron a confirmarse, su stock ya cambió
+        afectadas = [i for i, error in resultados.items() if error is None or not error.startswith("Error de Odoo")]
+        if afectadas:
+            _tras_confirmar(afectadas)
+        logger.info("confirmar_cotizaciones: %s/%s confirmadas.", len(confirmadas), len(ids))
+        return resultado(f"Confirmadas {len(confirmadas)} de {len(ids)} cotizaciones.",
+                         confirmadas=confirmadas,
+                         no_encontradas=[i for i in ids if i not in estados] or None,
+                         no_confirmables=[[i, estados[i]] for i in ids if i in estados and i not in resultados] or None,
+                         errores=[[i, error] for i, error in resultados.items() if error is not None] or None)
+    except xmlrpc.client.Fault as e:
+        logger.error("Error XML-RPC Odoo en confirmar_cotizaciones: %s - %s", e.faultCode, e.faultString, exc_info=True)
+        return f"Error de Odoo al confirmar cotizaciones: {e.faultString}"
+    except Exception as e:
+        logger.error("Error inesperado en confirmar_cotizaciones: %s - %s", type(e).__name__, e, exc_info=True)
+        return f"Error inesperado del servidor al confirmar cotizaciones: {type(e).__name__}"
+
+# Listados del catálogo: paginación por keyset de id (sin OFFSET)
+MAX_LIMITE_LISTADO = 100
+MAX_PAGINA_EXPORTACION = 2000
+CAMPOS_LISTADO = ['id', 'name', 'default_code', 'list_price']
+
+async def pagina_productos_vendibles(conn: AsyncOdooSession, despues_de: int, limite: int) -> List[Dict[str, Any]]:
+    """Una página de productos vendibles con `id > despues_de`, ordenada por id."""
+    productos = catalog_mirror.list_saleable(limite, after_id=despues_de) if catalogo_local_activo() else None
+    if productos is not None:
+        return productos
+    domain = [['sale_ok', '=', True], ['id', '>', despues_de]]
+    logger.debug("Odoo Call: product.product.search_read, domain=%s, fields=%s, limit=%s", domain, CAMPOS_LISTADO, limite)
+    return await odoo_read(conn, 'product.product', 'search_read', [domain],
+                           {'fields': CAMPOS_LISTADO, 'limit': limite, 'order': 'id'})
+
+async def iterar_productos_vendibles(conn: AsyncOdooSession, tamano_pagina: int, despues_de: int = 0):
+    """Generador asíncrono de páginas: cada una se pide a Odoo solo cuando se consume la anterior."""
+    while True:
+        pagina = await pagina_productos_vendibles(conn, despues_de, tamano_pagina)
+        if not pagina:
+            return
+        yield pagina
+        if len(pagina) < tamano_pagina:
+            return
+        despues_de = pagina[-1]['id']
+
+@herramienta()
+async def listar_productos(cursor: int = 0, limite: int = 20) -> str:
     """
-    Lista los primeros 20 productos vendibles disponibles en Odoo.
+    Lista productos vendibles de Odoo por páginas, ordenados por ID.
 
     Args:
-        None
+        cursor: Devuelve los productos con ID mayor que este valor (0 = primera página).
+                Usa el `siguiente_cursor` de la respuesta para pedir la página siguiente.
+        limite: Productos por página (máx 100, por defecto 20).
 
     Returns:
-        Una cadena de texto formateada con la lista de productos (ID, Nombre, Código, Precio)
-        o un mensaje de error.
+        JSON con `columnas`/`filas` (id, name, default_code, list_price) y `siguiente_cursor`
+        si hay más páginas, o un mensaje de error.
     """
-    logger.info(f"Tool: listar_productos ejecutado.")
-    conn = get_odoo_connection_details()
+    logger.info("Tool: listar_productos ejecutado (cursor=%s, limite=%s).", cursor, limite)
+    if not isinstance(cursor, int) or cursor < 0: return "Error: El cursor debe ser un entero >= 0."
+    if not isinstance(limite, int) or not 0 < limite <= MAX_LIMITE_LISTADO: return f"Error: El límite debe estar entre 1 y {MAX_LIMITE_LISTADO}."
+    conn = await get_async_odoo_session()
     if not conn: return "Error: No se pudo conectar con Odoo."
     try:
-        # Dominio para buscar solo productos que se pueden vender
-        domain = [['sale_ok', '=', True]]
-        # Campos útiles (quitamos qty_available para que sea más rápido)
-        fields = ['id', 'name', 'default_code', 'list_price']
-        limit = 20 # Límite para no sobrecargar
-
-        logger.debug(f"Odoo Call: product.product.search_read, domain={domain}, fields={fields}, limit={limit}")
-        productos = conn['models'].execute_kw(
-            conn['db'], conn['uid'], conn['password'],
-            'product.product','search_read',
-            [domain],
-            {'fields': fields, 'limit': limit}
-        )
-        logger.info(f"Odoo devolvió {len(productos)} producto(s) (límite {limit}).")
-
-        if not productos: return "No se encontraron productos vendibles."
-
-        respuesta = f"Mostrando los primeros {len(productos)} productos vendibles:\n"
-        for p in productos:
-            respuesta += f"  - ID:{p.get('id')} Nom:{p.get('name')} Cod:{p.get('default_code','-')} P:{p.get('list_price',0)}\n"
-        return respuesta.strip()
+        # Se pide uno de más para saber si existe una página siguiente sin otra llamada
+        productos = await pagina_productos_vendibles(conn, cursor, limite + 1)
+        hay_mas = len(productos) > limite
+        productos = productos[:limite]
+        logger.info("listar_productos devolvió %s producto(s) (cursor %s, límite %s).", len(productos), cursor, limite)
+
+        if not productos:
+            return resultado("No se encontraron productos vendibles." if cursor == 0 else f"No hay más productos vendibles después del ID {cursor}.", filas=[])
+        # `siguiente_cursor` solo aparece si hay más páginas
+        return resultado(f"{len(productos)} producto(s) vendibles" + (f" con ID mayor que {cursor}." if cursor else "."),
+                         columnas=CAMPOS_LISTADO, filas=filas(productos, CAMPOS_LISTADO),
+                         siguiente_cursor=productos[-1]['id'] if hay_mas else None)
 
     except xmlrpc.client.Fault as e:
-        logger.error(f"Error Odoo en listar_productos: {e.faultString}")
+        logger.error("Error Odoo en listar_productos: %s", e.faultString)
         return f"Error Odoo al listar productos: {e.faultString}"
     except Exception as e:
-        logger.error(f"Error inesperado en listar_productos: {e}", exc_info=True)
+        logger.error("Error inesperado en listar_productos: %s", e, exc_info=True)
         return f"Error servidor al listar productos: {type(e).__name__}"
 
+@herramienta()
+async def exportar_productos(ctx: Context, tamano_pagina: int = 200) -> str:
+    """
+    Exporta todo el catálogo de productos vendibles en modo streaming, página a página.
+    Cada página se emite en cuanto llega de Odoo como notificación MCP de log (JSON con `columnas`
+    id, name, default_code, list_price y `filas`) y el avance como notificación de progreso. La respuesta
+    final es solo un resumen (páginas, productos, último ID), así que el tamaño del catálogo no
+    afecta a la memoria ni al tamaño del resultado.
+
+    Args:
+        tamano_pagina: Productos por página (máx 2000, por defecto 200).
+    """
+    logger.info("Tool: exportar_productos ejecutado (tamano_pagina=%s).", tamano_pagina)
+    if not isinstance(tamano_pagina, int) or not 0 < tamano_pagina <= MAX_PAGINA_EXPORTACION:
+        return f"Error: El tamaño de página debe estar entre 1 y {MAX_PAGINA_EXPORTACION}."
+    conn = await get_async_odoo_session()
+    if not conn: return "Error: No se pudo conectar con Odoo."
+    total_task = asyncio.ensure_future(conn.execute_kw('product.product', 'search_count', [[['sale_ok', '=', True]]]))
+    try:
+        paginas = enviados = ultimo_id = 0
+        total: Optional[int] = None
+        async for pagina in iterar_productos_vendibles(conn, tamano_pagina):
+            if total is None:
+                # El conteo viaja en paralelo con la primera página: no retrasa el primer envío
+                total = await total_task
+            paginas += 1
+            enviados += len(pagina)
+            ultimo_id = pagina[-1]['id']
+            await ctx.log('info', resultado(pagina=paginas, columnas=CAMPOS_LISTADO, filas=filas(pagina, CAMPOS_LISTADO)),
+                          logger_name='odoo.exportar_productos')
+            await ctx.report_progress(enviados, total)
+        logger.info("exportar_productos: %s producto(s) en %s página(s).", enviados, paginas)
+        if not enviados: return resultado("No se encontraron productos vendibles.", productos=0)
+        return resultado("Exportación completada.", productos=enviados, paginas=paginas, ultimo_id=ultimo_id)
+    except xmlrpc.client.Fault as e:
+        logger.error("Error Odoo en exportar_productos: %s", e.faultString)
+        return f"Error Odoo al exportar productos: {e.faultString}"
+    except Exception as e:
+        logger.error("Error inesperado en exportar_productos: %s", e, exc_info=True)
+        return f"Error servidor al exportar productos: {type(e).__name__}"
+    finally:
+        if not total_task.done():
+            total_task.cancel()
+        elif not total_task.cancelled():
+            total_task.exception()  # marca el error (si lo hubo) como recogido
+
 # --- HERRAMIENTA ELIMINADA ---
 # La función crear_factura_desde_pedido(pedido_id: int) -> str fue eliminada
 # debido a la complejidad y restricciones de tiempo, y al error de método privado.
 
-# --- 6. Bloque Principal ---
-if __name__ == "__main__":
-    logger.info("Ejecutando bloque principal (__name__ == '__main__').")
-    logger.info("Realizando verificación inicial de conexión a Odoo...")
-    initial_conn = get_odoo_connection_details()
-    if initial_conn:
-        logger.info("Verificación inicial de conexión Odoo: ÉXITO.")
+# --- 7. Transportes de Red (SSE / streamable-http) con Varios Workers ---
+NETWORK_TRANSPORTS = ('sse', 'streamable-http')
+METRICS_PATH = os.getenv('MCP_METRICS_PATH', '/metrics')  # Vacío = sin endpoint de scrape
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.render_prometheus(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+def with_metrics_route(starlette_app):
+    """Añade `GET METRICS_PATH` (Prometheus) a la app ASGI de FastMCP."""
+    if METRICS_PATH:
+        starlette_app.add_route(METRICS_PATH, metrics_endpoint, methods=['GET'])
+    return starlette_app
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Opciones de arranque. Cada flag puede fijarse también por variable de entorno."""
+    parser = argparse.ArgumentParser(description="Servidor MCP para Odoo (QuindíColor).")
+    parser.add_argument('--transport', choices=('stdio',) + NETWORK_TRANSPORTS,
+                        default=os.getenv('MCP_TRANSPORT', 'stdio'),
+                        help="Transporte MCP (env MCP_TRANSPORT). Por defecto: stdio.")
+    parser.add_argument('--host', default=os.getenv('MCP_HOST', '127.0.0.1'),
+                        help="Interfaz de escucha en modo red (env MCP_HOST).")
+    parser.add_argument('--port', type=int, default=int(os.getenv('MCP_PORT', '8000')),
+                        help="Puerto base en modo red (env MCP_PORT).")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MCP_WORKERS', '1')),
+                        help="Procesos worker en modo red (env MCP_WORKERS).")
+    parser.add_argument('--proxy-sse', action='store_true',
+                        default=os.getenv('MCP_SSE_PROXY', '').lower() in ('1', 'true', 'yes'),
+                        help="Con sse y varios workers: hay un proxy delante que fija cada cliente a un worker (env MCP_SSE_PROXY).")
+    return parser.parse_args(argv)
+
+def create_streamable_http_app():
+    """Factory ASGI para uvicorn (un worker por proceso, sesión Odoo propia por worker)."""
+    app.settings.stateless_http = True  # Cualquier worker puede atender cualquier petición
+    return with_metrics_route(app.streamable_http_app())
+
+def _serve_network_worker(transport: str, host: str, port: int, worker_index: int) -> None:
+    """
+    Punto de entrada de un worker de red. Las sesiones Odoo (UID + pool keep-alive) son
+    globales al proceso, así que todas las peticiones que atiende el worker las comparten.
+    """
+    app.settings.host = host
+    app.settings.port = port
+    logger.info("Worker %s (PID %s) sirviendo MCP/%s en http://%s:%s", worker_index, os.getpid(), transport, host, port)
+    anyio.run(_run_sse_async)
+
+async def _run_sse_async() -> None:
+    """Como `app.run_sse_async()`, con el endpoint de métricas en el mismo puerto."""
+    config = uvicorn.Config(with_metrics_route(app.sse_app()), host=app.settings.host, port=app.settings.port,
+                            log_level=app.settings.log_level.lower())
+    start_warm_up()  # El worker prepara Odoo mientras empieza a escuchar, sin esperar al primer cliente
+    await uvicorn.Server(config).serve()
+
+def run_network_server(transport: str, host: str, port: int, workers: int, behind_proxy: bool = False) -> None:
+    """
+    Sirve MCP por red a muchos clientes concurrentes.
+
+    - streamable-http: modo sin estado, así que los N workers comparten un único puerto
+      (uvicorn reparte las conexiones entre procesos).
+    - sse: cada sesión SSE vive en la memoria del proceso que la abrió, así que no se puede
+      repartir un mismo puerto entre workers. Con varios, el worker i escucha en `port + i`
+      y hace falta un proxy delante que fije cada cliente a un worker (`behind_proxy`);
+      sin él se rechaza el arranque.
+
+    Con varios workers cada proceso escribe su propio archivo de log (`<log>.<pid>.log`) y
+    mantiene sus propias réplicas de catálogo y clientes.
+    """
+    workers = max(1, workers)
+    if transport == 'sse' and workers > 1 and not behind_proxy:
+        raise RuntimeError("Con --transport sse cada worker es un servidor aparte en su propio puerto (port+i), sin "
+                           "punto de entrada común. Usa --transport streamable-http (un puerto para todos los workers) "
+                           "o pon delante un proxy con afinidad por cliente y arranca con --proxy-sse (MCP_SSE_PROXY=1).")
+    if workers > 1:
+        os.environ['MCP_LOG_POR_PROCESO'] = '1'  # Lo heredan los workers al arrancar
+    if transport == 'streamable-http':
+        logger.info("Sirviendo MCP/streamable-http en http://%s:%s/mcp con %s worker(s)...", host, port, workers)
+        uvicorn.run("mcp_odoo_server:create_streamable_http_app", factory=True, host=host, port=port,
+                    workers=workers, log_level=app.settings.log_level.lower())
+        return
+
+    if workers == 1:
+        _serve_network_worker(transport, host, port, 0)
+        return
+
+    import multiprocessing  # Solo en modo red con varios workers
+    ctx = multiprocessing.get_context('spawn')  # Sin heredar sockets/conexiones Odoo del padre
+    processes = [ctx.Process(target=_serve_network_worker, args=(transport, host, port + i, i),
+                             name=f"mcp-odoo-worker-{i}") for i in range(workers)]
+    for process in processes:
+        process.start()
+    logger.info("%s workers SSE activos en los puertos %s-%s; el proxy debe fijar cada cliente a uno de ellos.",
+                workers, port, port + workers - 1)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Deteniendo workers MCP...")
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+# --- 8. Arranque ---
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Arranque por línea de comandos: valida la configuración y sirve MCP por stdio o por red.
+    La conexión con Odoo no se espera aquí (ver `warm_up_odoo`). Devuelve el código de salida.
+    """
+    args = parse_args(argv)
+    missing_vars = missing_config()
+    if missing_vars:
+        logger.critical("Error Crítico: Faltan variables de entorno o están vacías: %s. Revisa tu archivo .env o el entorno.",
+                        ', '.join(missing_vars))
+        return 1
+
+    if args.transport in NETWORK_TRANSPORTS:
         try:
-             access_check = initial_conn['models'].execute_kw(
-                 initial_conn['db'], initial_conn['uid'], initial_conn['password'],
-                 'res.users', 'check_access_rights', ['read'], {'raise_exception': False}
-             )
-             logger.info(f"Verificación de acceso ('res.users', 'read'): {access_check}")
+            run_network_server(args.transport, args.host, args.port, args.workers, behind_proxy=args.proxy_sse)
+            logger.info("Servidor MCP detenido.")
         except Exception as e:
-             logger.warning(f"Fallo en llamada de verificación de acceso post-conexión: {e}", exc_info=True)
-    else:
-        logger.error("Verificación inicial de conexión Odoo: FALLÓ. Revisa logs y configuración.")
-        # exit(1) # Descomentar si es crítico que la conexión inicial funcione
+            logger.critical("Error fatal al ejecutar el servidor MCP en modo %s: %s", args.transport, e, exc_info=True)
+            return 1
+        return 0
 
     logger.info("Iniciando el servidor MCP FastMCP en modo stdio...")
     try:
         app.run(transport='stdio')
         logger.info("Servidor MCP detenido.")
     except Exception as e:
-        logger.critical(f"Error fatal al ejecutar el servidor MCP app.run(): {e}", exc_info=True)
-        exit(1)
\ No newline at end of file
+        logger.critical("Error fatal al ejecutar el servidor MCP app.run(): %s", e, exc_info=True)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
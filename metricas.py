@@ -0,0 +1,187 @@
+# metricas.py
+
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Límites (segundos) de los histogramas: de una lectura en caché a un create masivo lento
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Histograma de duraciones con límites fijos (acumulables como en Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # El último es +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Cuantil aproximado por interpolación dentro del bucket (como histogram_quantile), sin superar el máximo."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return self.max  # Por encima del último límite
+                return min(self.max, lower + (self.buckets[i] - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class MetricsRegistry:
+    """
+    Métricas del servidor MCP: latencia por herramienta y por método de Odoo, RPCs y Faults
+    por modelo/método, y tiempo de conexión y autenticación aparte.
+
+    Thread-safe (un lock sin contención: en el servidor todo se observa desde el event loop).
+    Se exporta en formato de texto de Prometheus (`render_prometheus`) o como resumen JSON
+    ordenado por tiempo total (`summary`), para ver qué herramienta y qué método de Odoo
+    dominan la latencia.
+    """
+
+    def __init__(self, prefix: str = 'quindicolor', buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._tools: Dict[str, Histogram] = {}
+        self._tool_outcomes: Dict[Tuple[str, str], int] = {}
+        self._rpcs: Dict[Tuple[str, str], Histogram] = {}
+        self._faults: Dict[Tuple[str, str, str], int] = {}
+        self._auth = Histogram(self.buckets)
+        self._auth_failures = 0
+        self._connect = Histogram(self.buckets)
+
+    # -- Registro --
+    def observe_tool(self, tool: str, seconds: float, outcome: str) -> None:
+        """`outcome`: 'ok', 'error' (la herramienta devolvió un mensaje de error) o 'exception'."""
+        with self._lock:
+            if tool not in self._tools:
+                self._tools[tool] = Histogram(self.buckets)
+            self._tools[tool].observe(seconds)
+            self._tool_outcomes[(tool, outcome)] = self._tool_outcomes.get((tool, outcome), 0) + 1
+
+    def observe_rpc(self, model: str, method: str, seconds: float, fault: Optional[str] = None) -> None:
+        """Una llamada `execute_kw`; `fault` es el tipo de error si falló (Fault de Odoo o de red)."""
+        key = (model, method)
+        with self._lock:
+            if key not in self._rpcs:
+                self._rpcs[key] = Histogram(self.buckets)
+            self._rpcs[key].observe(seconds)
+            if fault is not None:
+                self._faults[key + (fault,)] = self._faults.get(key + (fault,), 0) + 1
+
+    def observe_auth(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._auth.observe(seconds)
+            self._auth_failures += 0 if ok else 1
+
+    def observe_connect(self, seconds: float) -> None:
+        """Establecimiento de una conexión nueva con Odoo (TCP + TLS)."""
+        with self._lock:
+            self._connect.observe(seconds)
+
+    def instrument_tool(self, fn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """
+        Envuelve una herramienta async y registra su duración y resultado. Conserva la firma
+        (`functools.wraps`), así FastMCP sigue generando el mismo esquema de argumentos.
+        """
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            outcome = 'exception'
+            try:
+                result = await fn(*args, **kwargs)
+                outcome = 'error' if isinstance(result, str) and result.startswith('Error') else 'ok'
+                return result
+            finally:
+                self.observe_tool(name, time.perf_counter() - started, outcome)
+        return wrapper
+
+    # -- Exportación --
+    @staticmethod
+    def _labels(**labels: str) -> str:
+        escaped = (f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+                   for k, v in labels.items())
+        return '{' + ','.join(escaped) + '}' if labels else ''
+
+    def _histogram_lines(self, name: str, histogram: Histogram, **labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float('inf'),), histogram.counts):
+            cumulative += n
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f"{name}_bucket{self._labels(**labels, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{self._labels(**labels)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{self._labels(**labels)} {histogram.count}")
+        return lines
+
+    def render_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (0.0.4)."""
+        p = self.prefix
+        with self._lock:
+            lines = [f"# HELP {p}_tool_duration_seconds Duración de las herramientas MCP.",
+                     f"# TYPE {p}_tool_duration_seconds histogram"]
+            for tool, histogram in sorted(self._tools.items()):
+                lines += self._histogram_lines(f"{p}_tool_duration_seconds", histogram, tool=tool)
+            lines += [f"# HELP {p}_tool_calls_total Llamadas a herramientas MCP por resultado.",
+                      f"# TYPE {p}_tool_calls_total counter"]
+            lines += [f"{p}_tool_calls_total{self._labels(tool=t, outcome=o)} {n}"
+                      for (t, o), n in sorted(self._tool_outcomes.items())]
+            lines += [f"# HELP {p}_odoo_rpc_duration_seconds Duración de las llamadas execute_kw a Odoo.",
+                      f"# TYPE {p}_odoo_rpc_duration_seconds histogram"]
+            for (model, method), histogram in sorted(self._rpcs.items()):
+                lines += self._histogram_lines(f"{p}_odoo_rpc_duration_seconds", histogram, model=model, method=method)
+            lines += [f"# HELP {p}_odoo_rpc_faults_total Llamadas a Odoo fallidas por tipo de error.",
+                      f"# TYPE {p}_odoo_rpc_faults_total counter"]
+            lines += [f"{p}_odoo_rpc_faults_total{self._labels(model=m, method=me, fault=f)} {n}"
+                      for (m, me, f), n in sorted(self._faults.items())]
+            lines += [f"# HELP {p}_odoo_auth_duration_seconds Duración de las autenticaciones en Odoo.",
+                      f"# TYPE {p}_odoo_auth_duration_seconds histogram"]
+            lines += self._histogram_lines(f"{p}_odoo_auth_duration_seconds", self._auth)
+            lines += [f"# HELP {p}_odoo_auth_failures_total Autenticaciones rechazadas por Odoo.",
+                      f"# TYPE {p}_odoo_auth_failures_total counter",
+                      f"{p}_odoo_auth_failures_total {self._auth_failures}",
+                      f"# HELP {p}_odoo_connect_duration_seconds Apertura de conexiones nuevas con Odoo (TCP+TLS).",
+                      f"# TYPE {p}_odoo_connect_duration_seconds histogram"]
+            lines += self._histogram_lines(f"{p}_odoo_connect_duration_seconds", self._connect)
+            lines += [f"# HELP {p}_start_time_seconds Arranque del proceso (epoch).",
+                      f"# TYPE {p}_start_time_seconds gauge",
+                      f"{p}_start_time_seconds {self._started:.3f}"]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _describe(histogram: Histogram) -> Dict[str, Any]:
+        ms = lambda v: round(v * 1000, 1) if v is not None else None
+        return {'count': histogram.count, 'total_s': round(histogram.sum, 3),
+                'avg_ms': ms(histogram.sum / histogram.count) if histogram.count else None,
+                'p50_ms': ms(histogram.quantile(0.5)), 'p95_ms': ms(histogram.quantile(0.95)),
+                'p99_ms': ms(histogram.quantile(0.99)), 'max_ms': ms(histogram.max) if histogram.count else None}
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumen legible: herramientas y métodos de Odoo ordenados por tiempo total."""
+        with self._lock:
+            tools = {tool: {**self._describe(h), **{o: n for (t, o), n in self._tool_outcomes.items() if t == tool}}
+                     for tool, h in sorted(self._tools.items(), key=lambda kv: -kv[1].sum)}
+            rpcs = {f"{model}.{method}": {**self._describe(h),
+                                          'faults': {f: n for (m, me, f), n in self._faults.items() if (m, me) == (model, method)}}
+                    for (model, method), h in sorted(self._rpcs.items(), key=lambda kv: -kv[1].sum)}
+            return {'uptime_s': round(time.time() - self._started, 1), 'tools': tools, 'odoo_rpc': rpcs,
+                    'odoo_auth': {**self._describe(self._auth), 'failures': self._auth_failures},
+                    'odoo_connect': self._describe(self._connect)}
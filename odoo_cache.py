@@ -0,0 +1,250 @@
+# odoo_cache.py
+
+import asyncio
+import json
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Iterable, Callable, Awaitable
+
+logger = logging.getLogger('mcp_odoo_server.cache')
+
+# Campos de stock que cambian al confirmar pedidos (entregas/reservas)
+STOCK_FIELDS = frozenset({'qty_available', 'virtual_available', 'free_qty', 'incoming_qty', 'outgoing_qty'})
+
+# Métodos de solo lectura: son los únicos que SingleFlight comparte entre llamadas
+COALESCIBLE_METHODS = frozenset({'search_read', 'read', 'search', 'search_count', 'name_search', 'fields_get', 'read_group'})
+
+def approx_size(value: Any) -> int:
+    """Tamaño aproximado en bytes de un resultado de Odoo (listas/dicts de escalares)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k) + approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(approx_size(v) for v in value)
+    return size
+
+
+class _Entry:
+    __slots__ = ('model', 'fields', 'ids', 'value', 'expires_at', 'size')
+
+    def __init__(self, model: str, fields: frozenset, ids: frozenset, value: Any, expires_at: float, size: int):
+        self.model = model
+        self.fields = fields
+        self.ids = ids
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
+
+class OdooReadCache:
+    """
+    Caché en proceso para lecturas de Odoo (`search_read`, `read`), con TTL por modelo y
+    expulsión LRU acotada por número de entradas y por memoria aproximada.
+
+    La clave incluye modelo, método, dominio, campos (ordenados) y opciones (limit, offset,
+    order), así que dos búsquedas solo comparten entrada si piden exactamente lo mismo.
+    Los valores se devuelven tal cual: quien los use no debe mutarlos.
+
+    Cada modelo lleva un contador de generación que sube con cada `invalidate`. Quien lee
+    toma `generation(model)` antes del RPC y se lo pasa a `put`: si entre medias hubo una
+    escritura, el resultado (anterior a ella) no se guarda.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 30.0,
+                 max_entries: int = 512, max_bytes: int = 16 * 1024 * 1024):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0,
+                                       'stale_puts': 0}
+
+    @staticmethod
+    def make_key(model: str, method: str, args: list, kwargs: Optional[Dict[str, Any]] = None) -> str:
+        """Clave canónica de una lectura: los campos se ordenan para que el orden no importe."""
+        options = dict(kwargs or {})
+        if 'fields' in options:
+            options['fields'] = sorted(options['fields'])
+        return json.dumps([model, method, args, options], sort_keys=True, separators=(',', ':'), default=str)
+
+    def ttl_for(self, model: str) -> float:
+        return self.ttls.get(model, self.default_ttl)
+
+    def generation(self, model: str) -> int:
+        """Generación actual de `model`; se toma antes de lanzar la lectura y se pasa a `put`."""
+        with self._lock:
+            return self._generations.get(model, 0)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Devuelve (hit, valor). Las entradas caducadas cuentan como fallo y se eliminan."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return False, None
+            if entry.expires_at <= now:
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry.value
+
+    def put(self, key: str, model: str, fields: Optional[Iterable[str]], value: Any,
+            generation: Optional[int] = None) -> bool:
+        """
+        Guarda un resultado. `fields=None` significa "todos los campos". Con `generation`, el
+        resultado se descarta si `model` se invalidó después de tomarla.
+
+        Returns:
+            True si el resultado quedó en la caché.
+        """
+        ttl = self.ttl_for(model)
+        if ttl <= 0:
+            return False
+        ids = frozenset(row['id'] for row in value if isinstance(row, dict) and 'id' in row) if isinstance(value, list) else frozenset()
+        entry = _Entry(model, frozenset(fields) if fields is not None else frozenset(), ids, value,
+                       time.monotonic() + ttl, approx_size(value))
+        if entry.size > self.max_bytes:
+            return False
+        with self._lock:
+            if generation is not None and generation != self._generations.get(model, 0):
+                self._stats['stale_puts'] += 1
+                logger.debug("Caché: descartada lectura de %s anterior a una escritura", model)
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._stats['evictions'] += 1
+        return True
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def invalidate(self, model: str, fields: Optional[Iterable[str]] = None, ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Elimina entradas de `model`. Si se indican `fields`, solo las que incluyen alguno de
+        ellos (o todos los campos); si se indican `ids`, solo las que contienen esos registros.
+        En todo caso sube la generación del modelo, así que ninguna lectura que ya estuviera
+        en curso llega a guardarse.
+
+        Returns:
+            Número de entradas eliminadas.
+        """
+        fields = frozenset(fields) if fields is not None else None
+        ids = frozenset(ids) if ids is not None else None
+        with self._lock:
+            self._generations[model] = self._generations.get(model, 0) + 1
+            doomed = [key for key, entry in self._entries.items()
+                      if entry.model == model
+                      and (fields is None or not entry.fields or entry.fields & fields)
+                      and (ids is None or entry.ids & ids)]
+            for key in doomed:
+                self._remove(key)
+            self._stats['invalidations'] += len(doomed)
+        if doomed:
+            logger.debug("Caché: invalidadas %s entrada(s) de %s", len(doomed), model)
+        return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot: Dict[str, Any] = dict(self._stats)
+            snapshot['entries'] = len(self._entries)
+            snapshot['bytes'] = self._bytes
+        lookups = snapshot['hits'] + snapshot['misses']
+        snapshot['hit_rate'] = round(snapshot['hits'] / lookups, 4) if lookups else 0.0
+        snapshot['max_entries'] = self.max_entries
+        snapshot['max_bytes'] = self.max_bytes
+        return snapshot
+
+
+class SingleFlight:
+    """
+    Agrupa lecturas idénticas simultáneas: mientras una llamada con la misma clave (modelo,
+    método, argumentos normalizados con `OdooReadCache.make_key`) esté en vuelo, las demás
+    esperan su resultado en lugar de lanzar otro RPC a Odoo.
+
+    - Solo se agrupan métodos de `COALESCIBLE_METHODS`; cualquier otro (create, write,
+      action_confirm...) se ejecuta siempre por separado.
+    - El RPC corre en su propia tarea: si uno de los que esperan se cancela, los demás
+      siguen recibiendo el resultado. Los errores se propagan a todos.
+    - `forget(model)` (tras escribir en el modelo) hace que las lecturas siguientes no se
+      unan a las que ya estaban en vuelo y podrían no reflejar la escritura. El RPC olvidado
+      sigue entregando su resultado a quien lo esperaba, pero no llama a `store`.
+    - `store(result)` se llama una sola vez por RPC terminado con éxito y no olvidado: es
+      el sitio para guardar en la caché.
+    Como en la caché, el resultado es compartido y no debe mutarse.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Tuple[str, asyncio.Task]] = {}
+        self._stats: Dict[str, int] = {'rpcs': 0, 'coalesced': 0, 'bypassed': 0, 'forgotten': 0,
+                                       'forgotten_stores': 0}
+
+    async def do(self, key: str, model: str, method: str, call: Callable[[], Awaitable[Any]],
+                 store: Optional[Callable[[Any], Any]] = None) -> Any:
+        if method not in COALESCIBLE_METHODS:
+            self._stats['bypassed'] += 1
+            result = await call()
+            if store is not None:
+                store(result)
+            return result
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(flight[1])
+        task = asyncio.ensure_future(call())
+        self._flights[key] = (model, task)
+        self._stats['rpcs'] += 1
+        task.add_done_callback(lambda done: self._land(key, done, store))
+        return await asyncio.shield(task)
+
+    def _land(self, key: str, task: asyncio.Task, store: Optional[Callable[[Any], Any]]) -> None:
+        flight = self._flights.get(key)
+        current = flight is not None and flight[1] is task
+        if current:
+            del self._flights[key]
+        if task.cancelled() or task.exception() is not None:  # Marcada como leída aunque ya no quede nadie esperando
+            return
+        if store is None:
+            return
+        if not current:
+            self._stats['forgotten_stores'] += 1
+            return
+        try:
+            store(task.result())
+        except Exception:
+            logger.exception("SingleFlight: error guardando el resultado de %s", key)
+
+    def forget(self, model: str) -> int:
+        doomed = [key for key, (flight_model, _) in self._flights.items() if flight_model == model]
+        for key in doomed:
+            del self._flights[key]
+        self._stats['forgotten'] += len(doomed)
+        return len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = dict(self._stats)
+        snapshot['in_flight'] = len(self._flights)
+        shared = snapshot['rpcs'] + snapshot['coalesced']
+        snapshot['saved_ratio'] = round(snapshot['coalesced'] / shared, 4) if shared else 0.0
+        return snapshot
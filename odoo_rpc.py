@@ -0,0 +1,267 @@
+# odoo_rpc.py
+
+import asyncio
+import itertools
+import json
+import xmlrpc.client
+import logging
+import time
+from typing import Dict, Any, Optional, List
+
+import httpx
+
+from metricas import MetricsRegistry
+
+# Logger hijo de 'mcp_odoo_server': hereda sus handlers (archivo + consola)
+logger = logging.getLogger('mcp_odoo_server.rpc')
+
+# Códigos/mensajes con los que Odoo señala credenciales o sesión inválidas
+ACCESS_FAULT_CODES = (3, 'AccessDenied')
+ACCESS_FAULT_MARKERS = ('AccessDenied', 'Access Denied', 'Session expired', 'SessionExpiredException')
+
+def is_access_fault(fault: xmlrpc.client.Fault) -> bool:
+    """Indica si un Fault de Odoo corresponde a un problema de autenticación/sesión."""
+    if fault.faultCode in ACCESS_FAULT_CODES:
+        return True
+    # En JSON-RPC el faultCode es el nombre de la excepción (p. ej. 'odoo.exceptions.AccessDenied')
+    fault_text = f"{fault.faultCode} {fault.faultString or ''}"
+    return any(marker in fault_text for marker in ACCESS_FAULT_MARKERS)
+
+def fault_label(error: BaseException) -> str:
+    """Tipo de error para las métricas (pocas etiquetas distintas): AccessDenied, clase de Odoo o de red."""
+    if isinstance(error, xmlrpc.client.Fault):
+        if is_access_fault(error):
+            return 'AccessDenied'
+        # JSON-RPC trae la clase ('odoo.exceptions.UserError'); XML-RPC solo un código
+        return str(error.faultCode).rsplit('.', 1)[-1] if isinstance(error.faultCode, str) else 'Fault'
+    return type(error).__name__
+
+
+# --- 1. Protocolos de cable (XML-RPC / JSON-RPC) ---
+class XmlRpcProtocol:
+    """Codificación XML-RPC clásica: '/xmlrpc/2/common' y '/xmlrpc/2/object'."""
+    name = 'xmlrpc'
+    content_type = 'text/xml'
+
+    def path(self, service: str) -> str:
+        return f"/xmlrpc/2/{service}"
+
+    def encode(self, service: str, method: str, params: tuple) -> bytes:
+        return xmlrpc.client.dumps(params, methodname=method, allow_none=True).encode('utf-8')
+
+    def decode(self, content: bytes) -> Any:
+        # loads() lanza xmlrpc.client.Fault si Odoo devolvió un fault
+        result, _ = xmlrpc.client.loads(content, use_builtin_types=True)
+        return result[0]
+
+
+class JsonRpcProtocol:
+    """
+    Endpoint '/jsonrpc' de Odoo (mismos servicios y métodos que XML-RPC). El JSON es más
+    compacto y mucho más barato de (de)serializar que XML para resultados grandes de
+    `search_read`. Los errores se traducen a xmlrpc.client.Fault para que las herramientas
+    los manejen igual que con XML-RPC.
+    """
+    name = 'jsonrpc'
+    content_type = 'application/json'
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+
+    def path(self, service: str) -> str:
+        return '/jsonrpc'
+
+    def encode(self, service: str, method: str, params: tuple) -> bytes:
+        payload = {'jsonrpc': '2.0', 'method': 'call', 'id': next(self._ids),
+                   'params': {'service': service, 'method': method, 'args': list(params)}}
+        return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, content: bytes) -> Any:
+        data = json.loads(content)
+        error = data.get('error')
+        if error:
+            details = error.get('data') or {}
+            raise xmlrpc.client.Fault(details.get('name') or error.get('code', 0),
+                                      details.get('message') or error.get('message', ''))
+        return data.get('result')
+
+
+PROTOCOLS = {'xmlrpc': XmlRpcProtocol, 'jsonrpc': JsonRpcProtocol}
+
+def get_protocol(name: str):
+    """Instancia el protocolo por nombre ('xmlrpc' o 'jsonrpc')."""
+    try:
+        return PROTOCOLS[name.lower()]()
+    except KeyError:
+        raise ValueError(f"Protocolo Odoo desconocido: '{name}'. Opciones: {', '.join(PROTOCOLS)}") from None
+
+
+# --- 2. Sesión Odoo asíncrona (XML-RPC o JSON-RPC sobre httpx.AsyncClient) ---
+class AsyncOdooSession:
+    """
+    Sesión Odoo compartida por las herramientas `async def` de FastMCP: autentica una vez,
+    reutiliza el UID y solo se re-autentica si Odoo devuelve un Fault de acceso.
+
+    Serializa las llamadas con el protocolo configurado (XML-RPC por defecto, o JSON-RPC)
+    y las envía por un `httpx.AsyncClient` con pool acotado de conexiones keep-alive. Mientras una
+    llamada espera a Odoo, el event loop sigue atendiendo otras peticiones MCP, de modo
+    que varias herramientas concurrentes solapan sus esperas de red.
+
+    Con un `MetricsRegistry` registra la duración de cada llamada, de las autenticaciones y
+    de la apertura de conexiones nuevas (extensión `trace` de httpx), por separado.
+    """
+
+    def __init__(self, url: str, db: str, user: str, password: str,
+                 pool_size: int = 4, timeout: float = 30.0, protocol: str = 'xmlrpc',
+                 metrics: Optional[MetricsRegistry] = None):
+        self.url = url.rstrip('/')
+        self.db = db
+        self.user = user
+        self.password = password
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.protocol = get_protocol(protocol)
+        self.metrics = metrics
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._uid: Optional[int] = None
+        self._auth_generation = 0
+        self._auth_lock = asyncio.Lock()
+        self._in_flight = 0
+        self._stats: Dict[str, int] = {
+            'uid_hits': 0,
+            'uid_misses': 0,
+            'reauths': 0,
+            'auth_failures': 0,
+            'rpc_calls': 0,
+            'max_in_flight': 0,     # Máximo de llamadas a Odoo solapadas observado
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            self._client = httpx.AsyncClient(base_url=self.url, timeout=self.timeout, limits=limits,
+                                             headers={'Content-Type': self.protocol.content_type})
+        return self._client
+
+    async def _rpc(self, service: str, method: str, *params: Any) -> Any:
+        """Envía `service.method(*params)` con el protocolo configurado y devuelve el resultado."""
+        path = self.protocol.path(service)
+        body = self.protocol.encode(service, method, params)
+        self._in_flight += 1
+        self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._in_flight)
+        try:
+            extensions = {'trace': self._trace_connect()} if self.metrics is not None else None
+            response = await self._get_client().post(path, content=body, extensions=extensions)
+        finally:
+            self._in_flight -= 1
+        if response.status_code != 200:
+            raise xmlrpc.client.ProtocolError(f"{self.url}{path}", response.status_code,
+                                              response.reason_phrase, dict(response.headers))
+        return self.protocol.decode(response.content)
+
+    def _trace_connect(self):
+        """Callback `trace` de httpcore que mide TCP + TLS cuando la petición abre una conexión nueva."""
+        started: Dict[str, float] = {}
+        connected = 'connection.start_tls.complete' if self.url.startswith('https://') else 'connection.connect_tcp.complete'
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            if event == 'connection.connect_tcp.started':
+                started['t'] = time.perf_counter()
+            elif event == connected and 't' in started:
+                self.metrics.observe_connect(time.perf_counter() - started['t'])
+        return trace
+
+    async def authenticate(self, force: bool = False) -> Optional[int]:
+        """Devuelve el UID cacheado o autentica (una sola corrutina a la vez)."""
+        if self._uid is not None and not force:
+            self._stats['uid_hits'] += 1
+            return self._uid
+        async with self._auth_lock:
+            if self._uid is not None and not force:
+                self._stats['uid_hits'] += 1
+                return self._uid
+            self._stats['uid_misses'] += 1
+            logger.debug("Autenticando (async) usuario '%s' en DB '%s'...", self.user, self.db)
+            started = time.perf_counter()
+            uid = None
+            try:
+                uid = await self._rpc('common', 'authenticate', self.db, self.user, self.password, {})
+            finally:
+                if self.metrics is not None:
+                    self.metrics.observe_auth(time.perf_counter() - started, ok=bool(uid))
+            if not uid:
+                self._stats['auth_failures'] += 1
+                self._uid = None
+                logger.error("Fallo la autenticación Odoo para usuario '%s' en DB '%s'. Verifica credenciales.", self.user, self.db)
+                return None
+            self._uid = uid
+            self._auth_generation += 1
+            logger.info("Sesión Odoo asíncrona autenticada (UID: %s).", uid)
+            return uid
+
+    async def _reauthenticate(self, stale_generation: int) -> Optional[int]:
+        async with self._auth_lock:
+            if self._uid is not None and self._auth_generation != stale_generation:
+                return self._uid
+            self._uid = None
+        self._stats['reauths'] += 1
+        return await self.authenticate()
+
+    @property
+    def uid(self) -> Optional[int]:
+        return self._uid
+
+    async def execute_kw(self, model: str, method: str, args: List[Any], kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        `model.method(*args, **kwargs)` con el UID cacheado. Ante un Fault de acceso se
+        re-autentica una sola vez (aunque fallen varias llamadas a la vez) y se reintenta.
+
+        Raises:
+            xmlrpc.client.Fault: Errores de negocio de Odoo.
+            ConnectionError: Si no es posible autenticar.
+        """
+        uid = await self.authenticate()
+        generation = self._auth_generation
+        if uid is None:
+            raise ConnectionError(f"No se pudo autenticar en Odoo ({self.url}, DB '{self.db}').")
+        try:
+            return await self._call(uid, model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            if not is_access_fault(e):
+                raise
+            logger.warning("Fault de acceso en %s.%s (%s). Re-autenticando...", model, method, e.faultCode)
+            uid = await self._reauthenticate(stale_generation=generation)
+            if uid is None:
+                raise ConnectionError(f"Re-autenticación Odoo fallida para '{self.user}'.") from e
+            return await self._call(uid, model, method, args, kwargs)
+
+    async def _call(self, uid: int, model: str, method: str, args: List[Any], kwargs: Optional[Dict[str, Any]]) -> Any:
+        self._stats['rpc_calls'] += 1
+        started = time.perf_counter()
+        fault = None
+        try:
+            return await self._rpc('object', 'execute_kw', self.db, uid, self.password, model, method, args, kwargs or {})
+        except asyncio.CancelledError:
+            fault = 'Cancelled'
+            raise
+        except Exception as e:
+            fault = fault_label(e)
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_rpc(model, method, time.perf_counter() - started, fault)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = dict(self._stats)
+        snapshot['pool_size'] = self.pool_size
+        snapshot['protocol'] = self.protocol.name
+        snapshot['in_flight'] = self._in_flight
+        snapshot['authenticated'] = self._uid is not None
+        return snapshot
+
+    async def aclose(self) -> None:
+        """Cierra el cliente HTTP y sus conexiones keep-alive."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
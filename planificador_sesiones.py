@@ -0,0 +1,156 @@
+# planificador_sesiones.py
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict
+
+logger = logging.getLogger('openai_agent_logic')
+
+
+class SchedulerSaturated(Exception):
+    """No se admite el turno (cola llena o espera agotada). El mensaje es apto para el usuario."""
+
+
+class SessionScheduler:
+    """
+    Control de admisión de turnos del agente para las apps Gradio, que comparten un único
+    servidor MCP y agente entre todos los usuarios.
+
+    - Como máximo `max_in_flight` turnos en curso en total y `max_per_session` por sesión.
+    - Los turnos que no caben esperan en una cola por sesión; al liberarse un hueco se
+      atiende a las sesiones por turno rotatorio (round-robin), así una sesión con varias
+      peticiones no retrasa a las demás.
+    - Se rechaza (SchedulerSaturated) si la cola total llega a `max_queue`, si la sesión ya
+      tiene `max_queue_per_session` peticiones esperando o si la espera supera `max_wait`.
+    - `stats()` expone turnos en curso, profundidad de cola, rechazos y tiempos de espera.
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_per_session: int = 1, max_queue: int = 16,
+                 max_queue_per_session: int = 2, max_wait: float = 30.0):
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_per_session = max(1, max_per_session)
+        self.max_queue = max_queue
+        self.max_queue_per_session = max_queue_per_session
+        self.max_wait = max_wait
+        self._in_flight = 0
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {}  # Orden de inserción = turno rotatorio
+        self._queued = 0
+        self._waits: Deque[float] = deque(maxlen=500)
+        self._stats: Dict[str, Any] = {'admitted': 0, 'queued': 0, 'shed_queue_full': 0,
+                                       'shed_session_queue': 0, 'shed_timeout': 0}
+
+    # -- Estado interno --
+    def _eligible(self, session_id: str) -> bool:
+        return self._in_flight < self.max_in_flight and self._running.get(session_id, 0) < self.max_per_session
+
+    def _start(self, session_id: str) -> None:
+        self._in_flight += 1
+        self._running[session_id] = self._running.get(session_id, 0) + 1
+        self._stats['admitted'] += 1
+
+    def _finish(self, session_id: str) -> None:
+        self._in_flight -= 1
+        remaining = self._running.get(session_id, 0) - 1
+        if remaining > 0:
+            self._running[session_id] = remaining
+        else:
+            self._running.pop(session_id, None)
+        self._dispatch()
+
+    def _discard(self, session_id: str, future: asyncio.Future) -> None:
+        queue = self._waiting.get(session_id)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._queued -= 1
+            if not queue:
+                del self._waiting[session_id]
+
+    def _dispatch(self) -> None:
+        """Despierta a los siguientes en espera mientras haya huecos (una sesión por ronda)."""
+        progressed = True
+        while progressed and self._in_flight < self.max_in_flight:
+            progressed = False
+            for session_id in list(self._waiting):
+                if not self._eligible(session_id):
+                    continue
+                queue = self._waiting.pop(session_id)
+                future = queue.popleft()
+                self._queued -= 1
+                if queue:
+                    self._waiting[session_id] = queue  # Al final de la ronda
+                if future.done():  # Cancelado mientras esperaba
+                    progressed = True
+                    break
+                self._start(session_id)
+                future.set_result(None)
+                progressed = True
+                break
+
+    # -- API --
+    @asynccontextmanager
+    async def slot(self, session_id: str) -> AsyncIterator[float]:
+        """
+        Reserva un hueco para un turno de `session_id` durante el bloque `async with`.
+        Devuelve los segundos que esperó en cola; lanza SchedulerSaturated si no se admite.
+        """
+        started = time.monotonic()
+        if not self._eligible(session_id):
+            if self._queued >= self.max_queue:
+                self._stats['shed_queue_full'] += 1
+                logger.warning(f"Turno rechazado para la sesión {session_id[:8]}: cola llena ({self._queued}).")
+                raise SchedulerSaturated("El asistente está atendiendo a muchas personas en este momento. "
+                                         "Inténtalo de nuevo en unos segundos.")
+            if len(self._waiting.get(session_id, ())) >= self.max_queue_per_session:
+                self._stats['shed_session_queue'] += 1
+                raise SchedulerSaturated("Ya tienes peticiones en espera; espera a que termine la respuesta en curso.")
+            future = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(session_id, deque()).append(future)
+            self._queued += 1
+            self._stats['queued'] += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                if not future.done():
+                    self._discard(session_id, future)
+                    future.cancel()
+                    self._stats['shed_timeout'] += 1
+                    logger.warning(f"Turno rechazado para la sesión {session_id[:8]}: {self.max_wait:.0f}s en cola.")
+                    raise SchedulerSaturated(f"No se pudo atender tu petición tras {self.max_wait:.0f} s de espera. "
+                                             "Inténtalo de nuevo en unos momentos.")
+            except BaseException:
+                # Cancelado por el llamador: si ya se le había concedido el hueco, se libera
+                if future.done() and not future.cancelled():
+                    self._finish(session_id)
+                else:
+                    self._discard(session_id, future)
+                    future.cancel()
+                raise
+        else:
+            self._start(session_id)
+        waited = time.monotonic() - started
+        self._waits.append(waited)
+        try:
+            yield waited
+        finally:
+            self._finish(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            'in_flight': self._in_flight,
+            'queue_depth': self._queued,
+            'sessions_running': len(self._running),
+            'sessions_waiting': len(self._waiting),
+            'limits': {'in_flight': self.max_in_flight, 'per_session': self.max_per_session,
+                       'queue': self.max_queue, 'queue_per_session': self.max_queue_per_session,
+                       'max_wait_s': self.max_wait},
+            'wait_s': {'avg': round(statistics.fmean(waits), 3) if waits else None,
+                       'p95': round(waits[int(len(waits) * 0.95) - 1], 3) if len(waits) >= 20 else None,
+                       'max': round(waits[-1], 3) if waits else None},
+            **self._stats,
+        }
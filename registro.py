@@ -0,0 +1,100 @@
+# registro.py
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class DebugSampler(logging.Filter):
+    """
+    Muestreo de los registros DEBUG: deja pasar uno de cada `1 / rate` por plantilla de
+    mensaje (logger + texto sin formatear), así un evento muy frecuente ("Caché HIT ...")
+    se reduce sin perder los DEBUG raros. INFO y superiores pasan siempre.
+    Con `rate=1` no se descarta nada; con `rate=0`, todos los DEBUG.
+    """
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.every = 0 if rate <= 0 else max(1, round(1 / min(rate, 1.0)))
+        self._seen: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        if self.every == 0:
+            self.dropped += 1
+            return False
+        key = (record.name, str(record.msg))
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+            if seen % self.every == 0:
+                return True
+            self.dropped += 1
+            return False
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que encola el registro sin formatearlo: `msg % args` y el Formatter se
+    aplican en el hilo del QueueListener. La cola es del propio proceso, así que no hace
+    falta convertir el registro en texto para serializarlo (lo que hace `QueueHandler.prepare`).
+
+    Solo la traza de una excepción se convierte a texto aquí, porque depende de frames que
+    dejan de existir al volver. Los argumentos se formatean más tarde: deben ser valores que
+    no se modifiquen después de registrarlos.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_EXC_FORMATTER = logging.Formatter()
+
+
+def rotating_file_handler(path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                          when: Optional[str] = None) -> logging.Handler:
+    """Archivo con rotación por tamaño o, si se indica `when` ('midnight', 'H', ...), por tiempo."""
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=when, backupCount=backups,
+                                                         encoding='utf-8', delay=True)
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                encoding='utf-8', delay=True)
+
+
+def start_queue_logging(logger: logging.Logger, handlers: List[logging.Handler],
+                        debug_sample_rate: float = 1.0) -> logging.handlers.QueueListener:
+    """
+    Conecta `logger` a `handlers` a través de una cola: quien registra solo filtra y encola,
+    y un hilo en segundo plano formatea y escribe (disco, consola). El nivel del logger se
+    ajusta al del handler más detallado, así los `logger.debug` desactivados no crean registros.
+    El logger deja de propagar a la raíz: si no, los handlers que otros instalen ahí (p. ej.
+    el RichHandler de FastMCP) volverían a escribir cada registro, de forma síncrona.
+
+    Devuelve el QueueListener ya arrancado; se detiene (vaciando la cola) al salir del proceso
+    o con `stop_queue_logging`.
+    """
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(debug_sample_rate))
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    logger.setLevel(min(h.level or logging.DEBUG for h in handlers))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_queue_logging, listener)
+    return listener
+
+
+def stop_queue_logging(listener: logging.handlers.QueueListener) -> None:
+    """Vacía la cola y detiene el hilo escritor (idempotente)."""
+    if getattr(listener, '_thread', None) is not None:
+        listener.stop()
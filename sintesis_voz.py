@@ -0,0 +1,197 @@
+# sintesis_voz.py
+
+import asyncio
+import logging
+import re
+import time
+from typing import Any, AsyncIterator, List, Optional, Protocol, Tuple
+
+logger = logging.getLogger('openai_agent_logic')
+
+# Fin de frase: puntuación seguida de espacio, o salto de línea
+_SENTENCE_END = re.compile(r'(?<=[.!?…;:])\s+|\n+')
+_MARKDOWN = re.compile(r'[*_#`>|]+|\[(?P<label>[^\]]*)\]\([^)]*\)')
+
+def speakable(text: str) -> str:
+    """Quita la sintaxis Markdown (negritas, viñetas, enlaces) que el TTS leería en voz alta."""
+    cleaned = _MARKDOWN.sub(lambda m: m.group('label') or ' ', text)
+    cleaned = re.sub(r'^\s*[-•]\s+', '', cleaned, flags=re.MULTILINE)
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+class SentenceSplitter:
+    """
+    Corta en frases el texto que llega por fragmentos (deltas del agente). Las frases muy
+    cortas se juntan con la siguiente (menos peticiones de TTS y entonación más natural) y
+    un texto sin puntuación se corta igualmente al superar `max_chars`.
+    """
+
+    def __init__(self, min_chars: int = 25, max_chars: int = 300):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ''
+
+    def feed(self, delta: str) -> List[str]:
+        """Añade un fragmento y devuelve las frases completas que ya se pueden sintetizar."""
+        self._buffer += delta
+        sentences: List[str] = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if match.start() - start >= self.min_chars:
+                sentences.append(self._buffer[start:match.start()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        while len(self._buffer) > self.max_chars:
+            cut = max(self._buffer.rfind(', ', 0, self.max_chars), self._buffer.rfind(' ', 0, self.max_chars))
+            cut = cut if cut > 0 else self.max_chars
+            sentences.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:].lstrip(', ')
+        return [s for s in sentences if s]
+
+    def flush(self) -> List[str]:
+        """Devuelve lo que quede en el búfer (al terminar la respuesta)."""
+        rest, self._buffer = self._buffer.strip(), ''
+        return [rest] if rest else []
+
+
+# --- Clientes TTS (intercambiables) ---
+class TTSClient(Protocol):
+    async def synthesize(self, text: str) -> bytes: ...
+
+
+class OpenAITTSClient:
+    """TTS de OpenAI (`audio.speech`); devuelve el audio completo de un texto corto."""
+
+    def __init__(self, client: Any, model: str = "tts-1", voice: str = "nova", response_format: str = "mp3"):
+        self.client = client
+        self.model = model
+        self.voice = voice
+        self.response_format = response_format
+
+    async def synthesize(self, text: str) -> bytes:
+        response = await self.client.audio.speech.create(model=self.model, voice=self.voice, input=text,
+                                                         response_format=self.response_format)
+        return response.content
+
+
+class StubTTSClient:
+    """
+    TTS local para pruebas y benchmarks sin red: simula la latencia de un servicio remoto
+    (`base_latency` + `per_char_latency` por carácter) y devuelve bytes de relleno.
+    """
+
+    def __init__(self, base_latency: float = 0.35, per_char_latency: float = 0.004):
+        self.base_latency = base_latency
+        self.per_char_latency = per_char_latency
+        self.calls = 0
+
+    async def synthesize(self, text: str) -> bytes:
+        self.calls += 1
+        await asyncio.sleep(self.base_latency + self.per_char_latency * len(text))
+        return b'\xff\xfb' + text.encode('utf-8')
+
+
+# --- Pipeline ---
+class SpeechPipeline:
+    """
+    Síntesis de voz frase a frase mientras el agente sigue generando texto.
+
+    - `feed(delta)` corta el texto en frases y lanza su síntesis en cuanto están completas,
+      con como máximo `max_parallel` peticiones simultáneas al cliente TTS.
+    - `audio_chunks()` entrega el audio de cada frase en el orden del texto, en cuanto está
+      listo (la primera frase puede sonar mientras se sintetizan las siguientes).
+    - `finish()` sintetiza el resto del texto y cierra el flujo; `aclose()` cancela lo pendiente.
+    Una frase cuya síntesis falla se omite (se registra el error) sin cortar el resto.
+    """
+
+    def __init__(self, client: TTSClient, max_parallel: int = 3, splitter: Optional[SentenceSplitter] = None):
+        self.client = client
+        self.splitter = splitter or SentenceSplitter()
+        self._semaphore = asyncio.Semaphore(max(1, max_parallel))
+        self._pending: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._started = time.perf_counter()
+        self._finished = False
+        self.sentences = 0
+        self.first_audio_latency: Optional[float] = None
+
+    async def _synthesize(self, text: str) -> Optional[bytes]:
+        async with self._semaphore:
+            try:
+                return await self.client.synthesize(text)
+            except Exception as e:
+                logger.error(f"Error TTS en la frase '{text[:40]}...': {type(e).__name__} - {e}")
+                return None
+
+    def _submit(self, sentence: str) -> None:
+        text = speakable(sentence)
+        if not any(ch.isalnum() for ch in text):
+            return
+        task = asyncio.get_running_loop().create_task(self._synthesize(text))
+        self._tasks.append(task)
+        self._pending.put_nowait(task)
+        self.sentences += 1
+
+    def feed(self, delta: str) -> None:
+        for sentence in self.splitter.feed(delta):
+            self._submit(sentence)
+
+    def finish(self) -> None:
+        if self._finished:
+            return
+        for sentence in self.splitter.flush():
+            self._submit(sentence)
+        self._finished = True
+        self._pending.put_nowait(None)
+
+    async def audio_chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            task = await self._pending.get()
+            if task is None:
+                return
+            audio = await task
+            if audio:
+                if self.first_audio_latency is None:
+                    self.first_audio_latency = time.perf_counter() - self._started
+                yield audio
+
+    async def aclose(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def merge_streams(*streams: AsyncIterator[Any]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Combina varios iteradores asíncronos y emite (índice del iterador, elemento) en el orden
+    en que llegan. Cada iterador se consume entero dentro de una única tarea: el SDK de
+    agentes guarda su traza en contextvars y no admite avanzar el generador desde tareas
+    distintas. Termina cuando se agotan todos; si el consumidor se detiene, cancela el resto.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done_marker = object()
+
+    async def pump(idx: int, stream: AsyncIterator[Any]) -> None:
+        try:
+            async for item in stream:
+                await queue.put((idx, item, None))
+        except Exception as e:
+            await queue.put((idx, done_marker, e))
+            return
+        await queue.put((idx, done_marker, None))
+
+    tasks = [asyncio.get_running_loop().create_task(pump(idx, stream)) for idx, stream in enumerate(streams)]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            idx, item, error = await queue.get()
+            if item is done_marker:
+                remaining -= 1
+                if error is not None:
+                    raise error
+                continue
+            yield idx, item
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,10 @@
+# tests/conftest.py
+#
+# Los módulos del proyecto están en la raíz (sin paquete) y el Odoo falso en benchmarks/.
+# Las pruebas asíncronas usan asyncio.run: no hace falta ningún plugin de pytest.
+
+import os
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, 'benchmarks')]
@@ -0,0 +1,102 @@
+# tests/test_catalogo_local.py
+#
+# Réplica de productos contra el Odoo falso de benchmarks/odoo_falso.py (sin latencia).
+
+import asyncio
+
+import pytest
+
+from catalogo_local import ProductCatalogMirror
+from odoo_falso import CLAVE, DB, USUARIO, FakeOdoo, serve
+from odoo_rpc import AsyncOdooSession
+
+
+@pytest.fixture
+def odoo():
+    fake = FakeOdoo(clientes=20, productos=300, cotizaciones=0)
+    servidor, url = serve(fake)
+    yield fake, url
+    servidor.shutdown()
+
+
+def _en_sesion(url: str, escenario):
+    async def ejecutar():
+        conn = AsyncOdooSession(url, DB, USUARIO, CLAVE)
+        try:
+            return await escenario(conn)
+        finally:
+            await conn.aclose()
+    return asyncio.run(ejecutar())
+
+
+def test_carga_y_busqueda_local(odoo):
+    fake, url = odoo
+
+    async def escenario(conn):
+        mirror = ProductCatalogMirror(page_size=100)
+        await mirror.full_load(conn)
+        return mirror
+
+    mirror = _en_sesion(url, escenario)
+    activos = [p for p in fake.products if p['active']]
+    assert mirror.stats()['products'] == len(activos)
+    assert mirror.is_fresh()
+    nombre = activos[0]['name']
+    assert activos[0]['id'] in [p['id'] for p in mirror.search(nombre, limit=50)]
+
+
+def test_solo_relee_el_stock_de_productos_con_movimientos(odoo):
+    fake, url = odoo
+    movido = next(p for p in fake.products if p['active'] and p['type'] == 'product')
+
+    async def escenario(conn):
+        mirror = ProductCatalogMirror(page_size=100)
+        await mirror.full_load(conn)
+        fake.move_stock(movido['id'], 7)
+        fake.reset_stats()
+        releidos = await mirror.refresh_changed_stock(conn)
+        return mirror, releidos, fake.stats()
+
+    mirror, releidos, stats = _en_sesion(url, escenario)
+    assert 1 <= releidos <= 2  # '>=' vuelve a leer los quants del mismo segundo que la última marca
+    assert mirror.get_many([movido['id']])[0]['qty_available'] == movido['qty_available']
+    # Un search_read de stock.quant y otro de product.product solo para los productos movidos
+    assert stats == {'rpcs': 2, 'stock.quant.search_read': 1, 'product.product.search_read': 1}
+    assert mirror.stats()['stock_tracking'] == 'stock.quant'
+    assert mirror.stock_age() < 5
+
+
+def test_escritura_propia_deja_de_servir_stock_hasta_el_siguiente_sondeo(odoo):
+    fake, url = odoo
+
+    async def escenario(conn):
+        mirror = ProductCatalogMirror(page_size=100)
+        await mirror.full_load(conn)
+        mirror.mark_stock_stale()
+        antes = mirror.search('Pintura')
+        await mirror.refresh_changed_stock(conn)
+        return antes, mirror.search('Pintura')
+
+    antes, despues = _en_sesion(url, escenario)
+    assert antes is None  # El llamador consulta a Odoo
+    assert despues
+
+
+def test_edicion_de_la_plantilla_llega_en_el_sondeo_incremental(odoo):
+    fake, url = odoo
+    editado = next(p for p in fake.products if p['active'] and p['sale_ok'])
+    write_date_variante = editado['write_date']
+
+    async def escenario(conn):
+        mirror = ProductCatalogMirror(page_size=100)
+        await mirror.full_load(conn)
+        fake.edit_template(editado['product_tmpl_id'][0], name='Vinilo Renombrado Único', list_price=12345.0)
+        await mirror.sync_incremental(conn)
+        return mirror
+
+    mirror = _en_sesion(url, escenario)
+    assert editado['write_date'] == write_date_variante  # La variante no cambia su write_date
+    local = mirror.get_many([editado['id']])[0]
+    assert (local['name'], local['list_price']) == ('Vinilo Renombrado Único', 12345.0)
+    assert [p['id'] for p in mirror.search('Renombrado Único')] == [editado['id']]
+    assert 1 <= mirror.stats()['template_products_refreshed'] <= 2  # Más las del mismo segundo que la marca
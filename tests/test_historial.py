@@ -0,0 +1,85 @@
+# tests/test_historial.py
+
+import copy
+import json
+
+from agente_quindicolor_openai import HistoryManager
+
+
+def _salida_mcp(payload: dict) -> str:
+    """Salida de herramienta tal como la entrega el SDK (contenido MCP serializado)."""
+    return json.dumps({'type': 'text', 'text': json.dumps(payload, ensure_ascii=False), 'annotations': None})
+
+
+def _turno(n: int, herramienta: str, payload: dict, relleno: int = 0) -> list:
+    call_id = f"call_{n}"
+    return [{'role': 'user', 'content': f"pregunta {n}"},
+            {'type': 'function_call', 'call_id': call_id, 'name': herramienta, 'arguments': '{}'},
+            {'type': 'function_call_output', 'call_id': call_id, 'output': _salida_mcp(payload)},
+            {'role': 'assistant', 'content': f"respuesta {n}" + " bla" * relleno}]
+
+
+def _clientes(cid: int) -> dict:
+    return {'columnas': ['id', 'name', 'email', 'phone'], 'filas': [[cid, f"Cliente {cid}", None, None]]}
+
+
+def _herramientas(items: list) -> list:
+    return [i for i in items if i.get('type') in ('function_call', 'function_call_output')]
+
+
+def test_compact_anota_ids_y_conserva_solo_los_turnos_recientes():
+    gestor = HistoryManager(max_tokens=100_000, detail_turns=2)
+    historial = [item for n in range(1, 5) for item in _turno(n, 'buscar_cliente', _clientes(n))]
+    original = copy.deepcopy(historial)
+
+    compactado = gestor.compact(historial)
+
+    assert historial == original  # El historial de la sesión no se toca
+    assert gestor._is_scratchpad(compactado[0])
+    assert gestor.read_notes(compactado) == {'clientes': {'1': 'Cliente 1', '2': 'Cliente 2'}}
+    # Se conservan todos los mensajes, pero las herramientas solo de los 2 últimos turnos
+    assert [i['content'] for i in compactado if i.get('role') == 'user'] == [f"pregunta {n}" for n in range(1, 5)]
+    assert {i['call_id'] for i in _herramientas(compactado)} == {'call_3', 'call_4'}
+
+
+def test_compact_es_idempotente_sobre_su_propia_salida():
+    gestor = HistoryManager(max_tokens=100_000, detail_turns=1)
+    historial = [item for n in range(1, 4) for item in _turno(n, 'buscar_cliente', _clientes(n))]
+    una_vez = gestor.compact(historial)
+    assert gestor.compact(una_vez) == una_vez
+
+
+def test_compact_recorta_salidas_largas_de_turnos_recientes():
+    gestor = HistoryManager(max_tokens=100_000, detail_turns=1, max_output_tokens=100)
+    filas = [[i, f"Producto con un nombre bastante largo {i}", f"QC-{i:05d}", 1000.0, 3] for i in range(200)]
+    payload = {'columnas': ['id', 'name', 'default_code', 'list_price', 'qty_available'], 'filas': filas}
+    compactado = gestor.compact(_turno(1, 'listar_productos', payload))
+
+    salida = next(i['output'] for i in compactado if i.get('type') == 'function_call_output')
+    assert len(salida) <= 100 * HistoryManager.CHARS_PER_TOKEN + len("…(recortado)")
+    recortado = json.loads(salida)
+    assert recortado['filas_omitidas'] + len(recortado['filas']) == 200
+
+
+def test_compact_descarta_turnos_antiguos_por_presupuesto_pero_nunca_el_ultimo():
+    gestor = HistoryManager(max_tokens=300, detail_turns=5)
+    historial = [item for n in range(1, 11) for item in _turno(n, 'buscar_cliente', _clientes(n), relleno=60)]
+
+    compactado = gestor.compact(historial)
+
+    preguntas = [i['content'] for i in compactado if i.get('role') == 'user']
+    assert preguntas[-1] == "pregunta 10"
+    assert "pregunta 1" not in preguntas
+    # Los IDs de los turnos descartados quedan en el bloc de notas
+    assert '1' in gestor.read_notes(compactado)['clientes']
+
+    # Un único turno que por sí solo no cabe se envía igualmente
+    solo = _turno(1, 'buscar_cliente', _clientes(1), relleno=2000)
+    assert [i['content'] for i in gestor.compact(solo) if i.get('role') == 'user'] == ["pregunta 1"]
+
+
+def test_compact_anota_cotizaciones_con_su_estado():
+    gestor = HistoryManager(max_tokens=100_000, detail_turns=0)
+    historial = (_turno(1, 'crear_cotizacion', {'cotizacion_id': 31})
+                 + _turno(2, 'confirmar_cotizacion', {'cotizacion_id': 30, 'state': 'done'}))
+    assert gestor.read_notes(gestor.compact(historial))['cotizaciones'] == {'31': 'draft', '30': 'done'}
@@ -0,0 +1,54 @@
+# tests/test_indice_difuso.py
+
+from indice_difuso import TrigramIndex, normalize
+
+
+def _indice() -> TrigramIndex:
+    index = TrigramIndex(min_score=0.3)
+    index.add(1, ["Pintura Acrílica Mate Blanco Galón", "PI-00001"])
+    index.add(2, ["Pintura Acrílica Mate Blanco Cuñete", "PI-00002"])
+    index.add(3, ["Esmalte Sintético Brillante Rojo Óxido Galón", "ES-00003"])
+    index.add(4, ["Vinilo Tipo 1 Blanco Cuarto", "VI-00004"])
+    index.add(5, ["Barniz Marino Brillante Galón", "BA-00005"])
+    return index
+
+
+def _ids(resultados) -> list:
+    return [doc_id for doc_id, _ in resultados]
+
+
+def test_normalize_quita_tildes_y_puntuacion():
+    assert normalize("  Acrílica-MATE, Galón ") == "acrilica mate galon"
+
+
+def test_coincidencia_literal_por_delante_de_las_aproximadas():
+    resultados = _indice().search("pintura acrilica blanco galon")
+    assert _ids(resultados)[:2] == [1, 2]
+    puntuaciones = [score for _, score in resultados]
+    assert puntuaciones == sorted(puntuaciones, reverse=True)
+    assert puntuaciones[0] > puntuaciones[1]
+
+
+def test_tolera_erratas_de_transcripcion():
+    assert _ids(_indice().search("esmalte sintetico roho"))[0] == 3
+    assert _ids(_indice().search("barnis marino"))[0] == 5
+
+
+def test_prefijos_y_codigo():
+    assert _ids(_indice().search("vini"))[0] == 4
+    assert _ids(_indice().search("ES-00003"))[0] == 3
+
+
+def test_la_subcadena_literal_sube_al_tramo_alto():
+    resultados = dict(_indice().search("mate blanco"))
+    assert resultados[1] >= TrigramIndex.SUBSTRING_FLOOR
+    assert resultados[2] >= TrigramIndex.SUBSTRING_FLOOR
+
+
+def test_limite_umbral_y_borrado():
+    index = _indice()
+    assert len(index.search("galon", limit=2)) == 2
+    assert index.search("xyzzy") == []
+    index.remove(3)
+    assert 3 not in _ids(index.search("esmalte sintetico rojo"))
+    assert len(index) == 4
@@ -0,0 +1,145 @@
+# tests/test_odoo_cache.py
+
+import asyncio
+
+from odoo_cache import OdooReadCache, SingleFlight
+
+
+def _cache() -> OdooReadCache:
+    return OdooReadCache(ttls={'product.product': 30, 'res.partner': 30}, default_ttl=0)
+
+
+def _put(cache: OdooReadCache, key: str, model: str, fields, ids) -> None:
+    assert cache.put(key, model, fields, [{'id': i} for i in ids])
+
+
+def test_invalidate_filtra_por_campos_e_ids():
+    cache = _cache()
+    _put(cache, 'stock', 'product.product', ['name', 'qty_available'], [1, 2])
+    _put(cache, 'precio', 'product.product', ['name', 'list_price'], [1])
+    _put(cache, 'todos', 'product.product', None, [3])
+    _put(cache, 'otro_stock', 'product.product', ['qty_available'], [7])
+    _put(cache, 'cliente', 'res.partner', ['name'], [1])
+
+    # Solo las que leen stock (o todos los campos) y contienen alguno de los ids
+    assert cache.invalidate('product.product', ['qty_available'], ids=[1, 3]) == 2
+    assert not cache.get('stock')[0]
+    assert not cache.get('todos')[0]
+    assert cache.get('precio')[0]
+    assert cache.get('otro_stock')[0]
+    assert cache.get('cliente')[0]
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_invalidate_sin_filtros_vacia_el_modelo():
+    cache = _cache()
+    _put(cache, 'a', 'product.product', ['name'], [1])
+    _put(cache, 'b', 'product.product', ['list_price'], [2])
+    _put(cache, 'c', 'res.partner', ['name'], [1])
+    assert cache.invalidate('product.product') == 2
+    assert cache.stats()['entries'] == 1
+
+
+def test_lectura_anterior_a_invalidate_no_se_guarda():
+    cache = _cache()
+    generation = cache.generation('product.product')
+    # La escritura llega mientras la lectura está en curso, aunque no haya nada que borrar
+    assert cache.invalidate('product.product', ['qty_available'], ids=[1]) == 0
+    assert not cache.put('k', 'product.product', ['qty_available'], [{'id': 1}], generation=generation)
+    assert not cache.get('k')[0]
+    assert cache.stats()['stale_puts'] == 1
+    # Las lecturas lanzadas después sí se guardan, y otros modelos no se ven afectados
+    assert cache.put('k', 'product.product', ['qty_available'], [{'id': 1}], generation=cache.generation('product.product'))
+    assert cache.put('p', 'res.partner', ['name'], [{'id': 1}], generation=0)
+
+
+def test_single_flight_agrupa_lecturas_identicas():
+    async def escenario():
+        flights = SingleFlight()
+        llamadas = 0
+        liberar = asyncio.Event()
+
+        async def rpc():
+            nonlocal llamadas
+            llamadas += 1
+            await liberar.wait()
+            return [{'id': 1}]
+
+        tareas = [asyncio.create_task(flights.do('k', 'product.product', 'search_read', rpc)) for _ in range(5)]
+        await asyncio.sleep(0)
+        liberar.set()
+        resultados = await asyncio.gather(*tareas)
+        return llamadas, resultados, flights.stats()
+
+    llamadas, resultados, stats = asyncio.run(escenario())
+    assert llamadas == 1
+    assert all(r == [{'id': 1}] for r in resultados)
+    assert stats['rpcs'] == 1 and stats['coalesced'] == 4 and stats['in_flight'] == 0
+
+
+def test_single_flight_no_agrupa_escrituras():
+    async def escenario():
+        flights = SingleFlight()
+        llamadas = 0
+
+        async def rpc():
+            nonlocal llamadas
+            llamadas += 1
+            await asyncio.sleep(0.01)
+            return True
+
+        await asyncio.gather(*(flights.do('k', 'sale.order', 'action_confirm', rpc) for _ in range(3)))
+        return llamadas, flights.stats()
+
+    llamadas, stats = asyncio.run(escenario())
+    assert llamadas == 3
+    assert stats['bypassed'] == 3
+
+
+def test_single_flight_forget_no_guarda_el_resultado():
+    async def escenario():
+        cache = _cache()
+        flights = SingleFlight()
+        liberar = asyncio.Event()
+
+        async def rpc():
+            await liberar.wait()
+            return [{'id': 1, 'qty_available': 5}]
+
+        def store(resultado):
+            cache.put('k', 'product.product', None, resultado)
+
+        antigua = asyncio.create_task(flights.do('k', 'product.product', 'read', rpc, store=store))
+        await asyncio.sleep(0)
+        assert flights.forget('product.product') == 1
+        # Una lectura posterior no se une a la olvidada: lanza su propio RPC
+        nueva = asyncio.create_task(flights.do('k', 'product.product', 'read', rpc, store=store))
+        await asyncio.sleep(0)
+        assert flights.stats()['rpcs'] == 2
+        liberar.set()
+        # Quien esperaba la olvidada recibe su resultado, pero solo la nueva llega a la caché
+        assert await antigua == [{'id': 1, 'qty_available': 5}]
+        await nueva
+        return cache.stats(), flights.stats()
+
+    cache_stats, stats = asyncio.run(escenario())
+    assert stats['forgotten'] == 1 and stats['forgotten_stores'] == 1
+    assert cache_stats['entries'] == 1
+
+
+def test_single_flight_propaga_errores_sin_guardar():
+    async def escenario():
+        flights = SingleFlight()
+        guardados = []
+
+        async def rpc():
+            await asyncio.sleep(0)
+            raise ConnectionError("caída")
+
+        resultados = await asyncio.gather(*(flights.do('k', 'res.partner', 'search_read', rpc, store=guardados.append)
+                                            for _ in range(2)), return_exceptions=True)
+        return resultados, guardados
+
+    resultados, guardados = asyncio.run(escenario())
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    assert guardados == []
@@ -0,0 +1,116 @@
+# tests/test_planificador_sesiones.py
+
+import asyncio
+
+import pytest
+
+from planificador_sesiones import SchedulerSaturated, SessionScheduler
+
+
+async def _turno(scheduler: SessionScheduler, session_id: str, liberar: asyncio.Event, orden: list) -> float:
+    async with scheduler.slot(session_id) as waited:
+        orden.append(session_id)
+        await liberar.wait()
+        return waited
+
+
+def test_rechaza_cuando_la_cola_esta_llena():
+    async def escenario():
+        scheduler = SessionScheduler(max_in_flight=1, max_queue=1, max_queue_per_session=5, max_wait=5)
+        liberar, orden = asyncio.Event(), []
+        en_curso = asyncio.create_task(_turno(scheduler, 'a', liberar, orden))
+        await asyncio.sleep(0)
+        en_cola = asyncio.create_task(_turno(scheduler, 'b', liberar, orden))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerSaturated):
+            async with scheduler.slot('c'):
+                pass
+        stats = scheduler.stats()
+        liberar.set()
+        await asyncio.gather(en_curso, en_cola)
+        return stats, scheduler.stats(), orden
+
+    durante, despues, orden = asyncio.run(escenario())
+    assert durante['in_flight'] == 1 and durante['queue_depth'] == 1
+    assert durante['shed_queue_full'] == 1
+    assert orden == ['a', 'b']
+    assert despues['in_flight'] == 0 and despues['queue_depth'] == 0 and despues['admitted'] == 2
+
+
+def test_rechaza_peticiones_de_mas_de_una_misma_sesion():
+    async def escenario():
+        scheduler = SessionScheduler(max_in_flight=4, max_per_session=1, max_queue=10, max_queue_per_session=1, max_wait=5)
+        liberar, orden = asyncio.Event(), []
+        primera = asyncio.create_task(_turno(scheduler, 'a', liberar, orden))
+        await asyncio.sleep(0)
+        segunda = asyncio.create_task(_turno(scheduler, 'a', liberar, orden))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerSaturated):
+            async with scheduler.slot('a'):
+                pass
+        # Otra sesión no espera aunque 'a' tenga cola
+        async with scheduler.slot('b') as waited:
+            assert waited < 0.05
+        liberar.set()
+        await asyncio.gather(primera, segunda)
+        return scheduler.stats()
+
+    stats = asyncio.run(escenario())
+    assert stats['shed_session_queue'] == 1
+    assert stats['admitted'] == 3
+
+
+def test_rechaza_por_espera_agotada_y_libera_la_cola():
+    async def escenario():
+        scheduler = SessionScheduler(max_in_flight=1, max_queue=4, max_wait=0.05)
+        liberar, orden = asyncio.Event(), []
+        en_curso = asyncio.create_task(_turno(scheduler, 'a', liberar, orden))
+        await asyncio.sleep(0)
+        with pytest.raises(SchedulerSaturated):
+            async with scheduler.slot('b'):
+                pass
+        stats = scheduler.stats()
+        liberar.set()
+        await en_curso
+        return stats
+
+    stats = asyncio.run(escenario())
+    assert stats['shed_timeout'] == 1
+    assert stats['queue_depth'] == 0
+
+
+def test_turno_rotatorio_entre_sesiones():
+    async def escenario():
+        scheduler = SessionScheduler(max_in_flight=1, max_per_session=1, max_queue=10, max_queue_per_session=3, max_wait=5)
+        orden: list = []
+        liberar = asyncio.Event()
+        primera = asyncio.create_task(_turno(scheduler, 'a', liberar, orden))
+        await asyncio.sleep(0)
+        # 'a' encola dos peticiones más antes de que llegue 'b': aun así 'b' pasa en la siguiente ronda
+        resto = []
+        for sesion in ('a', 'a', 'b'):
+            resto.append(asyncio.create_task(_turno(scheduler, sesion, liberar, orden)))
+            await asyncio.sleep(0)
+        liberar.set()
+        await asyncio.gather(primera, *resto)
+        return orden
+
+    assert asyncio.run(escenario()) == ['a', 'a', 'b', 'a']
+
+
+def test_cancelar_mientras_espera_no_deja_huecos_ocupados():
+    async def escenario():
+        scheduler = SessionScheduler(max_in_flight=1, max_queue=4, max_wait=5)
+        liberar, orden = asyncio.Event(), []
+        en_curso = asyncio.create_task(_turno(scheduler, 'a', liberar, orden))
+        await asyncio.sleep(0)
+        esperando = asyncio.create_task(_turno(scheduler, 'b', liberar, orden))
+        await asyncio.sleep(0)
+        esperando.cancel()
+        await asyncio.gather(esperando, return_exceptions=True)
+        liberar.set()
+        await en_curso
+        return scheduler.stats()
+
+    stats = asyncio.run(escenario())
+    assert stats['in_flight'] == 0 and stats['queue_depth'] == 0 and stats['sessions_waiting'] == 0